@@ -0,0 +1,35 @@
+"""
+Incremental analysis: which clips of a project actually need analysing.
+
+A clip's result is reused when it was produced by the current analysis pipeline
+(ANALYSIS_VERSION) from the same source file: the sha256 fingerprint recorded on the
+videos row at upload matches the one the worker saw when it analysed the clip. Adding
+a 20th clip to a project then analyses one clip, not twenty; the reverse script and
+draft are rebuilt from the stored results of the other nineteen.
+"""
+from .utils import get_logger
+
+logger = get_logger(__name__)
+
+# Bump whenever analysis output changes (new fields, different models) to re-analyse everything once
+ANALYSIS_VERSION = 1
+
+def result_is_current(source_fingerprint: str, result_state: dict) -> bool:
+    """
+    Whether a stored result can stand for the clip as it is now.
+    Clips uploaded before fingerprints were recorded trust any current-version result.
+    """
+    if not result_state or result_state.get("analysis_version") != ANALYSIS_VERSION:
+        return False
+    return source_fingerprint is None or result_state.get("source_fingerprint") == source_fingerprint
+
+def clips_needing_analysis(db, video_ids: list) -> list:
+    """The clips (in order) without a current result. On a lookup failure, all of them."""
+    state = db.get_analysis_state(video_ids)
+    if state is None:
+        return list(video_ids)
+    fingerprints, results = state
+    stale = [video_id for video_id in video_ids if not result_is_current(fingerprints.get(video_id), results.get(video_id))]
+    if len(stale) < len(video_ids):
+        logger.info(f"Reusing analysis of {len(video_ids) - len(stale)} unchanged clip(s); {len(stale)} to analyse")
+    return stale
@@ -2,7 +2,8 @@ import os
 import json
 import threading
 from typing import Dict, Any
-from .utils import get_logger, ensure_directory, generate_unique_id
+from .utils import get_logger, ensure_directory, generate_unique_id, probe_media, file_fingerprint
+from .analysis_cache import ANALYSIS_VERSION, clips_needing_analysis
 from .frame_extractor import FrameExtractor
 from .audio_extractor import AudioExtractor
 from .speech_to_text import SpeechToText
@@ -10,9 +11,11 @@ from .scene_detector import SceneDetector
 from .emotion_detector import EmotionDetector
 from .retake_matcher import RetakeMatcher
 from .edl_generator import EDLGenerator
+from .loudness_analyzer import LoudnessAnalyzer
+from .media_cache import MediaCache
 from .video_renderer import VideoRenderer
 from .database import Database
-from .storage import Storage
+from .storage_backends import create_storage
 from enum import Enum
 
 class ProjectStatus(Enum):
@@ -44,11 +47,18 @@ class BrainController:
         self.emotion_detector = EmotionDetector() # Lazy loaded
         self.retake_matcher = RetakeMatcher()
         self.edl_generator = EDLGenerator()
-        self.video_renderer = VideoRenderer(os.path.join(self.outputs_dir, "renders"), self.uploads_dir)
+        self.loudness_analyzer = LoudnessAnalyzer()
         
-        # Persistent Storage (Supabase)
+        # Persistent Storage (Supabase by default; STORAGE_BACKEND=local|s3 for other deployments)
         self.db = Database()
-        self.storage = Storage()
+        self.storage = create_storage()
+        
+        # Render sources: local uploads plus an LRU cache of clips downloaded from storage
+        self.media_cache = MediaCache(os.path.join(self.outputs_dir, "media_cache"), uploads_dir=self.uploads_dir,
+                                      storage=self.storage, storage_path_resolver=self.db.get_video_storage_path)
+        self.video_renderer = VideoRenderer(os.path.join(self.outputs_dir, "renders"), self.uploads_dir,
+                                            cache_dir=os.path.join(self.outputs_dir, "segment_cache"),
+                                            media_cache=self.media_cache)
         
         # In-memory storage (Fallback/Cache)
         self.processing_status = {}
@@ -57,6 +67,11 @@ class BrainController:
         # PRD-MONETIZATION: Local tracking for immediate limit enforcement
         self.project_clip_counts = {}
         self.project_durations = {}
+        
+        # Opt-in: enqueue each clip's analysis as soon as it is uploaded
+        self.eager_analysis = str(os.environ.get("EAGER_ANALYSIS", "false")).lower() == "true"
+        # Encode each take's draft segments as soon as it is analysed (see process_prerender_job)
+        self.speculative_drafts = str(os.environ.get("SPECULATIVE_DRAFTS", "true")).lower() == "true"
 
     def check_role(self, user_id: str, required_roles: list) -> bool:
         """PRD 5. User Roles - Enforce roles at backend"""
@@ -97,45 +112,133 @@ class BrainController:
         storage_path = f"uploads/{video_id}{os.path.splitext(filename)[1]}"
         self.storage.upload_file("videos", storage_path, video_path)
         
-        # 4. Save to DB
-        self.db.save_video(video_id, project_id, filename, storage_path, duration=duration)
+        # 4. Save to DB (the fingerprint lets later analyses reuse this clip's result)
+        self.db.save_video(video_id, project_id, filename, storage_path, duration=duration,
+                           source_fingerprint=file_fingerprint(video_path))
+        self.media_cache.register(video_id, video_path)
         self.db.update_project_status(project_id, ProjectStatus.UPLOADED.value)
         
+        # Eager mode: analyse each clip while the rest are still uploading. The analyze
+        # call later adopts these jobs and only waits for the stragglers.
+        if self.eager_analysis:
+            self.db.enqueue_job(project_id, "analyze", {"video_id": video_id})
+        
         # Update local tracking
         self.project_clip_counts[project_id] = clip_count + 1
         self.project_durations[project_id] = total_duration + duration
         
         return video_id
 
-    def start_analysis(self, project_id: str, video_ids: list):
+    def start_analysis(self, project_id: str, video_ids: list, idempotency_key: str = None):
         """
-        Enqueue an analysis job.
+        Enqueue analysis: one job per clip, so any free worker can take any clip, plus a
+        finish_analysis join that runs once, after the last clip is done. Returns the join's
+        job_id either way, so clients poll GET /jobs/{job_id} as for any other job. Re-triggering
+        while the same analysis is still running returns the running batch.
+        Clips with a current result for an unchanged source are not analysed again; the
+        script and draft are rebuilt from their stored results (core/analysis_cache.py).
         PRD-WORKERS-01: API server MUST ONLY enqueue jobs.
         """
-        logger.info(f"Enqueuing analysis job for project {project_id}")
+        stale = clips_needing_analysis(self.db, video_ids)
+        logger.info(f"Enqueuing analysis of {len(stale)} of {len(video_ids)} clip(s) for project {project_id}")
         self.db.update_project_status(project_id, ProjectStatus.ANALYZING.value)
         
-        job_id = self.db.enqueue_job(project_id, "analyze", {"video_ids": video_ids})
-        return {"job_id": job_id, "status": "ANALYZING"}
+        if not stale:
+            # Nothing new to analyse: go straight to the script and draft
+            job_id = self.db.enqueue_job(project_id, "finish_analysis", {"video_ids": video_ids}, idempotency_key=idempotency_key)
+            return {"job_id": job_id, "batch_id": None, "status": "ANALYZING", "clips_to_analyze": 0}
+        
+        batch = self.db.enqueue_job_batch(
+            project_id, "analyze", [{"video_id": video_id} for video_id in stale],
+            join_type="finish_analysis", idempotency_key=idempotency_key
+        )
+        batch_id, job_id = batch or (None, None)
+        # job_id is the finish_analysis join: pollable like any job, it completes (or fails)
+        # with the whole analysis. GET /batches/{batch_id} shows the per-clip progress.
+        return {"job_id": job_id, "batch_id": batch_id, "status": "ANALYZING", "clips_to_analyze": len(stale)}
 
     # --- WORKER METHODS (PRD-WORKERS-01) ---
 
-    def process_analysis_job(self, project_id: str, video_ids: list):
-        """Internal method called by the worker to process analysis."""
-        logger.info(f"Worker processing analysis for project {project_id}")
+    def process_analysis_job(self, project_id: str, video_ids: list, finish: bool = True):
+        """
+        Internal method called by the worker to process analysis.
+        finish=False for a per-clip job of a batch: the batch's finish_analysis job
+        completes the project once every clip is done.
+        """
+        logger.info(f"Worker processing analysis of {len(video_ids)} clip(s) for project {project_id}")
         
-        for video_id in video_ids:
-            # Resolve video path (assuming it's in uploads)
-            import glob
-            matches = glob.glob(os.path.join(self.uploads_dir, f"{video_id}.*"))
-            if matches:
-                video_path = matches[0]
-                self._analyze_single_video(project_id, video_id, video_path)
-            else:
-                logger.error(f"Video file not found for {video_id}")
+        # Another request may have analysed some of these since they were queued
+        for video_id in clips_needing_analysis(self.db, video_ids):
+            # Uploaded on this host, or fetched from storage by whichever worker got the clip.
+            # Pinned, so another job's download can't evict it while it is analysed.
+            pin = generate_unique_id()
+            video_path = self.media_cache.get_path(video_id, pin=pin)
+            try:
+                if video_path:
+                    self._analyze_single_video(project_id, video_id, video_path)
+                    if self.speculative_drafts and self.video_renderer.segment_cache:
+                        self._enqueue_prerender(project_id)
+                else:
+                    logger.error(f"Video file not found for {video_id}")
+            finally:
+                self.media_cache.release(pin)
+
+        if finish:
+            self._check_project_completion(project_id)
 
+    def finish_analysis_job(self, project_id: str):
+        """Join step of a per-clip analysis batch: runs once, after the last clip job completed."""
         self._check_project_completion(project_id)
 
+    def _best_take(self, project_id: str):
+        """
+        The take the draft render would pick right now: the project's analysed clips ranked
+        against the reverse script of what has been analysed so far, as
+        _check_project_completion ranks them once every clip is done.
+        """
+        video_ids = self.db.get_project_clips(project_id)
+        if not video_ids:
+            return None
+        comparison = self.compare_takes(video_ids, self._generate_reverse_script(project_id))
+        return comparison.get("best_take_id")
+
+    def _enqueue_prerender(self, project_id: str):
+        """Queue a speculative draft encode of the currently best take (coalesced if already queued)."""
+        best_take = self._best_take(project_id)
+        if best_take:
+            self.db.enqueue_job(project_id, "prerender", {
+                "video_id": best_take,
+                "is_paid": self.db.is_project_paid(project_id)
+            })
+
+    def process_prerender_job(self, project_id: str, video_id: str, is_paid: bool = False):
+        """
+        Speculative draft encode of the best take analysed so far, run while the rest of
+        the project is still being analysed. The draft EDL is a whole take (EDLGenerator), so
+        the draft render only assembles the cached segments of the winner. A take overtaken
+        by one analysed since the job was queued is skipped.
+        """
+        best_take = self._best_take(project_id)
+        if best_take != video_id:
+            logger.info(f"Skipping draft encode of {video_id} for project {project_id}: {best_take} is now the best take")
+            return None
+
+        logger.info(f"Worker encoding draft segments of {video_id} ahead for project {project_id}")
+        result = self.get_result(video_id) or {}
+        edl = [{
+            "video_id": video_id,
+            "start_time": 0.0,
+            "end_time": None,
+            "loudness": result.get("loudness"),
+            "source_info": result.get("source_info")
+        }]
+        stats = self.video_renderer.prerender(edl, is_paid=is_paid, is_draft=True)
+        if stats and self.video_renderer.segment_cache:
+            speculation = self.video_renderer.segment_cache.speculation_stats()
+            logger.info(f"Speculative encodes so far: {speculation['used']['count']} used, "
+                        f"{speculation['wasted']['count']} wasted, {speculation['pending']['count']} pending")
+        return stats
+
     def _analyze_single_video(self, project_id: str, video_id: str, video_path: str):
         """Extracted logic for analyzing a single video."""
         try:
@@ -160,13 +263,34 @@ class BrainController:
                 self.frame_extractor.extract_frames(video_path, output_dir=video_frames_dir)
                 return video_frames_dir
 
+            def measure_loudness_task():
+                # PRD 10. Audio Rules - measured once here, reused by every render (two-pass loudnorm)
+                try:
+                    return self.loudness_analyzer.measure(video_path)
+                except Exception as e:
+                    logger.warning(f"Loudness measurement failed for {video_id}: {e}")
+                    return None
+
             import concurrent.futures
             with concurrent.futures.ThreadPoolExecutor() as executor:
                 future_audio = executor.submit(extract_audio_task)
                 future_frames = executor.submit(extract_frames_task)
+                future_loudness = executor.submit(measure_loudness_task)
+                # The source this result is for; later analyses reuse it while the upload matches
+                future_fingerprint = executor.submit(file_fingerprint, video_path)
                 
                 audio_path = future_audio.result()
                 video_frames_dir = future_frames.result()
+                loudness = future_loudness.result()
+                source_fingerprint = future_fingerprint.result()
+            
+            # Source info lets renders plan the timeline before this clip is downloaded
+            source_info = None
+            try:
+                info = probe_media(video_path)
+                source_info = {field: info[field] for field in ("duration", "width", "height", "has_audio")}
+            except Exception as e:
+                logger.warning(f"Could not probe {video_id} for source info: {e}")
 
             self.processing_status[video_id]["status"] = "transcribing"
             if audio_path:
@@ -219,7 +343,11 @@ class BrainController:
                 "scenes": scenes,
                 "emotion_map": emotion_map,
                 "characters": characters,
-                "frame_samples": frame_samples
+                "frame_samples": frame_samples,
+                "loudness": loudness,
+                "source_info": source_info,
+                "source_fingerprint": source_fingerprint,
+                "analysis_version": ANALYSIS_VERSION
             }
             
             # Save JSON locally
@@ -256,6 +384,7 @@ class BrainController:
         self.db.enqueue_job(project_id, "render", {
             "video_ids": video_ids,
             "reference_script": script,
+            "is_paid": self.db.is_project_paid(project_id),
             "is_draft": True
         })
         
@@ -350,8 +479,12 @@ class BrainController:
             
         return self.retake_matcher.compare_takes(takes_data, reference_script)
 
-    def render_project(self, project_id: str, reference_script: str = None, bg_music_path: str = None, is_draft: bool = False):
-        """PRD Step 7: Approval & Final Render - Enqueue job."""
+    def render_project(self, project_id: str, reference_script: str = None, bg_music_path: str = None, is_draft: bool = False,
+                       idempotency_key: str = None):
+        """
+        PRD Step 7: Approval & Final Render - Enqueue job.
+        A repeated request (same settings, or same idempotency_key) returns the job already queued.
+        """
         logger.info(f"Enqueuing {'draft ' if is_draft else 'final '}render for project {project_id}")
         
         video_ids = self.db.get_project_clips(project_id)
@@ -369,11 +502,12 @@ class BrainController:
             "bg_music_path": bg_music_path,
             "is_paid": is_paid,
             "is_draft": is_draft
-        })
+        }, idempotency_key=idempotency_key)
         
         return {"job_id": job_id, "status": "RENDERING"}
 
-    def process_render_job(self, project_id: str, video_ids: list, reference_script: str = None, bg_music_path: str = None, is_draft: bool = False, is_paid: bool = False):
+    def process_render_job(self, project_id: str, video_ids: list, reference_script: str = None, bg_music_path: str = None, is_draft: bool = False, is_paid: bool = False,
+                           job_id: str = None):
         """Internal method called by the worker to process rendering."""
         logger.info(f"Worker processing {'draft ' if is_draft else ''}render for project {project_id} (Paid: {is_paid})")
         
@@ -387,11 +521,22 @@ class BrainController:
             edl = self.edl_generator.generate_edl(comparison_result)
             if not edl:
                 raise Exception("Failed to generate EDL (No valid clips found)")
+            
+            # Attach ingest loudness stats (skips loudnorm's analysis pass) and source info
+            # (lets the renderer plan and start encoding before every source is downloaded)
+            for clip_data in edl:
+                result = self.get_result(clip_data["video_id"]) or {}
+                clip_data["loudness"] = result.get("loudness")
+                clip_data["source_info"] = result.get("source_info")
                 
             # Step 3: Render
             render_id = generate_unique_id()
             output_filename = f"{'draft_' if is_draft else 'render_'}{render_id}.mp4"
-            render_path = self.video_renderer.render_video(edl, output_filename, bg_music_path=bg_music_path, is_paid=is_paid)
+            progress_callback = None
+            if job_id:
+                progress_callback = lambda progress: self.db.update_job_progress(job_id, progress)
+            render_path = self.video_renderer.render_video(edl, output_filename, bg_music_path=bg_music_path, is_paid=is_paid, is_draft=is_draft,
+                                                           progress_callback=progress_callback)
             
             if not render_path:
                 raise Exception("Rendering failed (VideoRenderer returned None)")
@@ -423,7 +568,8 @@ class BrainController:
                 "public_url": public_url,
                 "download_url": f"/download/{output_filename}",
                 "edl": edl,
-                "comparison": comparison_result
+                "comparison": comparison_result,
+                "render_stats": self.video_renderer.last_render_stats
             }
         except Exception as e:
             logger.error(f"Render job failed: {e}")
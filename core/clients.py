@@ -0,0 +1,71 @@
+"""
+Process-wide network clients.
+
+The API, the background worker thread and every Database/Storage/MediaCache they
+create share one Supabase client per (url, key), backed by one pooled httpx client,
+and one boto3 client per S3 endpoint. Connections are kept alive between operations
+instead of paying a TCP + TLS handshake per query or upload.
+
+Pool limits and timeouts:
+
+    SUPABASE_MAX_CONNECTIONS  - connections open at once (default 20)
+    SUPABASE_MAX_KEEPALIVE    - idle connections kept for reuse (default 10)
+    SUPABASE_KEEPALIVE_EXPIRY - seconds an idle connection is kept (default 60)
+    SUPABASE_TIMEOUT          - per-request read/write/pool timeout in seconds (default 30)
+    SUPABASE_CONNECT_TIMEOUT  - connect timeout in seconds (default 10)
+"""
+import os
+import threading
+from .utils import get_logger
+from .transfer import s3_client
+
+logger = get_logger(__name__)
+
+_lock = threading.Lock()
+_http_client = None
+_supabase_clients = {}
+_s3_clients = {}
+
+def get_http_client():
+    """The shared, pooled httpx client (created on first use)."""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            import httpx
+            limits = httpx.Limits(
+                max_connections=int(os.environ.get("SUPABASE_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.environ.get("SUPABASE_MAX_KEEPALIVE", "10")),
+                keepalive_expiry=float(os.environ.get("SUPABASE_KEEPALIVE_EXPIRY", "60"))
+            )
+            timeout = httpx.Timeout(float(os.environ.get("SUPABASE_TIMEOUT", "30")),
+                                    connect=float(os.environ.get("SUPABASE_CONNECT_TIMEOUT", "10")))
+            _http_client = httpx.Client(limits=limits, timeout=timeout)
+        return _http_client
+
+def get_supabase_client(url: str = None, key: str = None):
+    """Shared Supabase client for url/key (default SUPABASE_URL/SUPABASE_KEY), or None if they are not set."""
+    url = url or os.environ.get("SUPABASE_URL")
+    key = key or os.environ.get("SUPABASE_KEY")
+    if not url or not key:
+        return None
+
+    http_client = get_http_client()
+    with _lock:
+        client = _supabase_clients.get((url, key))
+        if client is None:
+            from supabase import create_client, ClientOptions
+            # The timeouts come from the shared httpx client, which both postgrest and storage use
+            client = create_client(url, key, options=ClientOptions(httpx_client=http_client))
+            _supabase_clients[(url, key)] = client
+            logger.info("Supabase client initialized (shared connection pool)")
+        return client
+
+def get_s3_client(endpoint_url: str, access_key: str, secret_key: str, region: str = "us-east-1"):
+    """Shared boto3 client per endpoint and credentials (boto3 clients are thread-safe and pool their own connections)."""
+    cache_key = (endpoint_url, access_key, secret_key, region)
+    with _lock:
+        client = _s3_clients.get(cache_key)
+        if client is None:
+            client = s3_client(endpoint_url, access_key, secret_key, region)
+            _s3_clients[cache_key] = client
+        return client
@@ -1,6 +1,9 @@
 import os
-from supabase import create_client, Client
-from .utils import get_logger
+from .clients import get_supabase_client
+from .job_lanes import JOB_LANES, DEFAULT_LANE, lane_for_job
+from .job_leases import JOB_LEASE_SECONDS, JOB_RETRY_BACKOFF_SECONDS, default_worker_id
+from .job_notifier import get_job_notifier
+from .utils import get_logger, payload_hash
 
 logger = get_logger(__name__)
 
@@ -13,10 +16,11 @@ class Database:
             logger.warning("SUPABASE_URL or SUPABASE_KEY not set. Database operations will fail.")
             self.client = None
         else:
-            self.client: Client = create_client(self.url, self.key)
-            logger.info("Supabase client initialized")
+            # Shared with Storage and every other Database in this process
+            self.client = get_supabase_client(self.url, self.key)
 
-    def save_video(self, video_id: str, project_id: str, filename: str, storage_path: str, duration: float = None):
+    def save_video(self, video_id: str, project_id: str, filename: str, storage_path: str, duration: float = None,
+                   source_fingerprint: str = None):
         if not self.client: return
         try:
             data = {
@@ -25,6 +29,7 @@ class Database:
                 "filename": filename,
                 "storage_path": storage_path,
                 "duration": duration,
+                "source_fingerprint": source_fingerprint,
                 "status": "processing"
             }
             self.client.table("videos").insert(data).execute()
@@ -134,6 +139,18 @@ class Database:
             logger.error(f"Failed to get project clips: {e}")
             return []
 
+    def get_video_storage_path(self, video_id: str):
+        """Storage path of an uploaded clip (carries the real file extension)."""
+        if not self.client: return None
+        try:
+            response = self.client.table("videos").select("storage_path").eq("id", video_id).execute()
+            if response.data:
+                return response.data[0].get("storage_path")
+            return None
+        except Exception as e:
+            logger.error(f"Failed to get video storage path: {e}")
+            return None
+
     def get_project_total_duration(self, project_id: str) -> float:
         """PRD-MONETIZATION: Get total duration of all clips in a project."""
         if not self.client: return 0.0
@@ -168,47 +185,242 @@ class Database:
 
     # --- JOB QUEUE METHODS (PRD-WORKERS-01) ---
 
-    def enqueue_job(self, project_id: str, job_type: str, payload: dict):
+    def enqueue_job(self, project_id: str, job_type: str, payload: dict, lane: str = None, priority: int = 0,
+                    idempotency_key: str = None):
+        """
+        Queue a job. lane defaults to the one for its type (core/job_lanes.py); priority
+        adds that many seconds of head start within the lane.
+
+        A repeated request is coalesced: if a job with the same project, type and payload
+        is still pending or running, or one was queued with the same idempotency_key in the
+        last 24 hours, its id is returned and nothing new is queued.
+        """
         if not self.client: return None
+        lane = lane or lane_for_job(job_type, payload)
+        if lane not in JOB_LANES:
+            raise ValueError(f"Unknown job lane: {lane}")
         try:
-            data = {
-                "project_id": project_id,
-                "type": job_type,
-                "payload": payload,
-                "status": "pending"
-            }
-            response = self.client.table("jobs").insert(data).execute()
-            if response.data:
-                return response.data[0]["id"]
-            return None
+            response = self.client.rpc("enqueue_job", {
+                "project": project_id,
+                "job_type": job_type,
+                "job_payload": payload,
+                "job_lane": lane,
+                "job_priority": priority,
+                "hash": payload_hash(payload),
+                "key": idempotency_key
+            }).execute()
+            if not response.data:
+                return None
+            job = response.data[0]
+            if job["created"]:
+                # Wake idle workers now instead of at their next poll
+                get_job_notifier().notify()
+            else:
+                logger.info(f"Coalesced duplicate {job_type} request for project {project_id} into job {job['id']}")
+            return job["id"]
         except Exception as e:
             logger.error(f"Failed to enqueue job: {e}")
             return None
 
-    def fetch_next_job(self):
-        """Atomically fetch and lock the next pending job."""
+    def enqueue_job_batch(self, project_id: str, job_type: str, payloads: list, join_type: str = None, join_payload: dict = None,
+                          idempotency_key: str = None):
+        """
+        Queue one job per payload as a batch, atomically, plus a join_type job with
+        join_payload that waits until the last of them completes (complete_job releases it)
+        and fails if one of them fails. Returns (batch id, join job id), or None.
+        Coalesced like enqueue_job: a running batch for the same payloads (or the same
+        idempotency_key) is returned instead of queuing another, and a job already queued
+        with one of the payloads joins the batch instead of being queued twice.
+        """
         if not self.client: return None
         try:
-            # 1. Find a pending job
-            response = self.client.table("jobs").select("*").eq("status", "pending").order("created_at").limit(1).execute()
+            response = self.client.rpc("enqueue_job_batch", {
+                "project": project_id,
+                "job_type": job_type,
+                "payloads": payloads,
+                "job_lane": lane_for_job(job_type, payloads[0] if payloads else None),
+                "join_type": join_type,
+                "join_payload": join_payload or {},
+                "join_lane": lane_for_job(join_type, join_payload) if join_type else DEFAULT_LANE,
+                "hash": payload_hash({"payloads": payloads, "join_type": join_type, "join_payload": join_payload or {}}),
+                "key": idempotency_key,
+                # Lets the batch adopt the same jobs already queued on their own (eager analysis)
+                "payload_hashes": [payload_hash(payload) for payload in payloads]
+            }).execute()
             if not response.data:
                 return None
-            
-            job = response.data[0]
-            job_id = job["id"]
-            
-            # 2. Try to lock it by updating status to 'processing'
-            # Note: In a high-concurrency environment, this would need a more robust lock (e.g. SELECT FOR UPDATE)
-            # but for MVP on Supabase REST API, we'll do a simple update check.
-            lock_response = self.client.table("jobs").update({"status": "processing", "updated_at": "now()"}).eq("id", job_id).eq("status", "pending").execute()
-            
-            if lock_response.data:
-                return lock_response.data[0]
-            return None # Someone else grabbed it
+            batch = response.data[0]
+            if batch["created"]:
+                get_job_notifier().notify()
+            else:
+                logger.info(f"Coalesced duplicate {job_type} batch for project {project_id} into batch {batch['id']}")
+            return batch["id"], batch["join_job_id"]
         except Exception as e:
-            logger.error(f"Failed to fetch next job: {e}")
+            logger.error(f"Failed to enqueue job batch: {e}")
             return None
 
+    def get_job_batch(self, batch_id: str):
+        """A batch with its job counts by status (None if not found) for GET /batches/{batch_id}."""
+        if not self.client: return None
+        try:
+            response = self.client.table("job_batches").select("*").eq("id", batch_id).execute()
+            if not response.data:
+                return None
+            batch = response.data[0]
+            jobs = self.client.table("jobs").select("status").eq("batch_id", batch_id).execute()
+            counts = {}
+            for job in jobs.data or []:
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            batch["jobs"] = counts
+            return batch
+        except Exception as e:
+            logger.error(f"Failed to fetch job batch: {e}")
+            return None
+
+    def complete_job(self, job_id: str, worker_id: str = None) -> bool:
+        """
+        Mark a job completed, if it is still ours (worker_id's lease; None skips the check).
+        For a batch job this also counts it off the batch, enqueueing the join job when it
+        was the last one; that happens in one statement, so it fires exactly once.
+        """
+        if not self.client: return False
+        try:
+            response = self.client.rpc("complete_job", {"job_id": job_id, "worker": worker_id}).execute()
+            if response.data:
+                logger.info(f"Job {job_id} updated to completed")
+                return True
+            logger.warning(f"Job {job_id} finished but was no longer ours to complete (lease lost?)")
+            return False
+        except Exception as e:
+            logger.error(f"Failed to complete job: {e}")
+            return False
+
+    def fail_job(self, job_id: str, worker_id: str = None, error: str = None) -> bool:
+        """
+        Mark a job failed, if it is still ours (worker_id's lease; None skips the check).
+        A job the reaper already handed to another worker is left to that worker.
+        """
+        if not self.client: return False
+        try:
+            response = self.client.rpc("fail_job", {"job_id": job_id, "worker": worker_id, "reason": error}).execute()
+            if response.data:
+                logger.info(f"Job {job_id} updated to failed")
+                return True
+            logger.warning(f"Job {job_id} failed but was no longer ours to fail (lease lost?)")
+            return False
+        except Exception as e:
+            logger.error(f"Failed to mark job failed: {e}")
+            return False
+
+    def fetch_next_job(self, job_types: list = None, worker_id: str = None):
+        """Atomically claim the next pending job (None if the queue is empty)."""
+        jobs = self.claim_jobs(1, job_types=job_types, worker_id=worker_id)
+        return jobs[0] if jobs else None
+
+    def claim_jobs(self, limit: int = 1, job_types: list = None, worker_id: str = None, lease_seconds: int = None) -> list:
+        """
+        Atomically claim up to `limit` pending jobs, marking them 'processing'.
+        Runs the claim_jobs SQL function (FOR UPDATE SKIP LOCKED), so concurrent workers
+        never block on or collide over the same rows. Jobs are picked by lane weight,
+        age and per-owner fair share (see core/job_lanes.py). job_types restricts the
+        claim to those types (None: any type). Each job is leased to worker_id for
+        lease_seconds and must be kept alive with renew_job_leases (core/job_leases.py).
+        """
+        if not self.client: return []
+        try:
+            response = self.client.rpc("claim_jobs", {
+                "max_jobs": limit,
+                "job_types": job_types,
+                "worker": worker_id or default_worker_id(),
+                "lease_seconds": lease_seconds or JOB_LEASE_SECONDS
+            }).execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"Failed to claim jobs: {e}")
+            return []
+
+    def renew_job_leases(self, job_ids: list, worker_id: str, lease_seconds: int = None):
+        """Heartbeat: extend our leases. Returns the set of ids still held, or None if the renewal failed."""
+        if not self.client: return None
+        try:
+            response = self.client.rpc("renew_job_leases", {
+                "job_ids": job_ids,
+                "worker": worker_id,
+                "lease_seconds": lease_seconds or JOB_LEASE_SECONDS
+            }).execute()
+            return set(response.data or [])
+        except Exception as e:
+            logger.error(f"Failed to renew job leases: {e}")
+            return None
+
+    def release_job(self, job_id: str, worker_id: str = None, reason: str = None):
+        """
+        Hand back a job whose attempt died: 'pending' again after a backoff, or 'dead'
+        once it has used its max_attempts. Returns the new status (None if we no longer held it).
+        """
+        if not self.client: return None
+        try:
+            response = self.client.rpc("release_job", {
+                "job_id": job_id,
+                "worker": worker_id,
+                "reason": reason,
+                "backoff_seconds": JOB_RETRY_BACKOFF_SECONDS
+            }).execute()
+            if not response.data:
+                return None
+            status = response.data[0]["status"]
+            logger.info(f"Job {job_id} released ({status}): {reason}")
+            return status
+        except Exception as e:
+            logger.error(f"Failed to release job: {e}")
+            return None
+
+    def unclaim_job(self, job_id: str, worker_id: str = None, delay_seconds: int = 5) -> bool:
+        """
+        Hand back a job we claimed but couldn't start: 'pending' again without using up
+        one of its attempts. Returns True if it was still ours to hand back.
+        """
+        if not self.client: return False
+        try:
+            response = self.client.rpc("unclaim_job", {
+                "job_id": job_id,
+                "worker": worker_id,
+                "delay_seconds": delay_seconds
+            }).execute()
+            if response.data:
+                logger.info(f"Job {job_id} returned to the queue unstarted")
+                return True
+            return False
+        except Exception as e:
+            logger.error(f"Failed to unclaim job: {e}")
+            return False
+
+    def reclaim_expired_jobs(self, backoff_seconds: int = None, lease_seconds: int = None) -> list:
+        """
+        Reaper: return every job whose lease lapsed to the queue (or mark it dead). Returns them.
+        A 'processing' job without a lease counts as lapsed once untouched for lease_seconds.
+        """
+        if not self.client: return []
+        try:
+            response = self.client.rpc("reclaim_expired_jobs", {
+                "backoff_seconds": backoff_seconds or JOB_RETRY_BACKOFF_SECONDS,
+                "lease_seconds": lease_seconds or JOB_LEASE_SECONDS
+            }).execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"Failed to reclaim expired jobs: {e}")
+            return []
+
+    def get_queue_stats(self, since_minutes: int = 60) -> list:
+        """Per lane: jobs pending and running, and queue wait percentiles over the last `since_minutes`."""
+        if not self.client: return []
+        try:
+            response = self.client.rpc("job_queue_stats", {"since": f"{since_minutes} minutes"}).execute()
+            return response.data or []
+        except Exception as e:
+            logger.error(f"Failed to fetch queue stats: {e}")
+            return []
+
     def update_job_status(self, job_id: str, status: str, error: str = None):
         if not self.client: return
         try:
@@ -220,6 +432,24 @@ class Database:
         except Exception as e:
             logger.error(f"Failed to update job status: {e}")
 
+    def get_job_progress(self, job_id: str):
+        """A job's status and live render progress for GET /jobs/{job_id}/progress (None if not found). Raises on query errors."""
+        if not self.client: return None
+        try:
+            response = self.client.table("jobs").select("id, status, progress, updated_at").eq("id", job_id).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            logger.error(f"Failed to fetch job progress: {e}")
+            raise
+
+    def update_job_progress(self, job_id: str, progress: dict):
+        """Live render progress (frames encoded, encode fps, ETA) for GET /jobs/{job_id}."""
+        if not self.client: return
+        try:
+            self.client.table("jobs").update({"progress": progress, "updated_at": "now()"}).eq("id", job_id).execute()
+        except Exception as e:
+            logger.error(f"Failed to update job progress: {e}")
+
     def update_status(self, video_id: str, status: str):
         if not self.client: return
         try:
@@ -252,6 +482,26 @@ class Database:
             logger.error(f"Failed to get result: {e}")
             return None
 
+    def get_analysis_state(self, video_ids: list):
+        """
+        What incremental analysis needs to know about these clips (core/analysis_cache.py):
+        ({video_id: source fingerprint}, {video_id: {"source_fingerprint", "analysis_version"}})
+        with only the clips that have a result in the second. None if the lookup failed.
+        """
+        if not self.client: return None
+        if not video_ids: return {}, {}
+        try:
+            videos = self.client.table("videos").select("id, source_fingerprint").in_("id", video_ids).execute()
+            results = self.client.table("results").select(
+                "video_id, source_fingerprint:data->>source_fingerprint, analysis_version:data->analysis_version"
+            ).in_("video_id", video_ids).execute()
+            fingerprints = {row["id"]: row.get("source_fingerprint") for row in videos.data}
+            states = {row["video_id"]: row for row in results.data}
+            return fingerprints, states
+        except Exception as e:
+            logger.error(f"Failed to get analysis state: {e}")
+            return None
+
     def get_status(self, video_id: str):
         if not self.client: return "not_found"
         try:
@@ -0,0 +1,359 @@
+import os
+import math
+import subprocess
+import tempfile
+from .utils import get_logger, probe_keyframes, probe_media
+from .loudness_analyzer import LoudnessAnalyzer
+
+logger = get_logger(__name__)
+
+class FFmpegRenderer:
+    """
+    Compiles an EDL into a single ffmpeg invocation.
+    Decoding, filtering and encoding all stay inside ffmpeg, so no frame ever
+    passes through Python (unlike the MoviePy path in VideoRenderer).
+    """
+
+    AUDIO_RATE = 44100
+    # PRD 10. Audio Rules - Music bed level under the voice, pulled down further while the voice is active
+    MUSIC_VOLUME = 0.15
+    MUSIC_DUCKING = "threshold=0.02:ratio=6:attack=20:release=400"
+    # aloop allocates its whole loop buffer up front, so it is sized to the track (plus a
+    # margin; it replays only what it buffered). Renders are capped well under the
+    # maximum, so a longer or unprobeable track never needs more than that to loop.
+    MUSIC_LOOP_MARGIN_SECONDS = 1.0
+    MUSIC_LOOP_MAX_SECONDS = 600.0
+
+    def __init__(self, ffmpeg_bin: str = "ffmpeg"):
+        self.ffmpeg_bin = ffmpeg_bin
+
+    def build_command(self, segments: list, output_path: str, bg_music_path: str = None,
+                      vf_filters: str = "unsharp=3:3:1.5", height: int = 720, fps: int = 24,
+                      preset: str = "ultrafast", threads: int = 4, max_duration: float = None,
+                      loudness: dict = None, crf: int = None) -> list:
+        """
+        Build the ffmpeg command line for a list of resolved segments.
+
+        Args:
+            segments: List of dicts with 'path', 'start', 'end', 'has_audio', 'width' and 'height'.
+            output_path: Destination file.
+            bg_music_path: Optional music track, looped under the timeline.
+            vf_filters: Filters applied to the concatenated video (after scaling).
+            max_duration: Optional output duration cap in seconds.
+            loudness: Combined ingest loudness stats for two-pass (linear) loudnorm.
+            crf: x264 constant rate factor (None keeps the encoder default).
+
+        Returns:
+            The argument list to pass to subprocess.
+        """
+        cmd = [self.ffmpeg_bin, "-hide_banner", "-nostdin", "-y"]
+        graph = []
+        has_audio = any(seg["has_audio"] for seg in segments)
+        width = self.canvas_width(segments[0], height)
+
+        # 1. One input per segment. Input-side seeking means ffmpeg only decodes
+        # from the nearest keyframe before each cut instead of from the start of the take.
+        for i, seg in enumerate(segments):
+            cmd.extend(self._segment_input(seg))
+            graph.extend(self._segment_chains(i, seg, width, height, fps, has_audio))
+
+        # 2. Concatenate
+        concat_inputs = "".join(f"[v{i}][a{i}]" if has_audio else f"[v{i}]" for i in range(len(segments)))
+        if has_audio:
+            graph.append(f"{concat_inputs}concat=n={len(segments)}:v=1:a=1[vcat][acat]")
+        else:
+            graph.append(f"{concat_inputs}concat=n={len(segments)}:v=1:a=0[vcat]")
+
+        # 3. PRD 8. Camera Policy - Soft clarity
+        graph.append(f"[vcat]{vf_filters}[vout]" if vf_filters else "[vcat]null[vout]")
+
+        # 4. PRD 10. Audio Rules - Music bed and normalization
+        if has_audio:
+            music_args, audio_graph = self._audio_mix_chain("acat", bg_music_path, len(segments), loudness)
+            cmd.extend(music_args)
+            graph.extend(audio_graph)
+
+        cmd.extend(["-filter_complex", ";".join(graph), "-map", "[vout]"])
+        if has_audio:
+            cmd.extend(["-map", "[aout]", "-c:a", "aac"])
+        cmd.extend(self._video_encoder_args(preset, threads, crf=crf))
+        if max_duration:
+            cmd.extend(["-t", f"{max_duration:.3f}"])
+        cmd.append(output_path)
+        return cmd
+
+    def build_segment_command(self, segment: dict, output_path: str, width: int, height: int = 720,
+                              fps: int = 24, preset: str = "ultrafast", threads: int = 4,
+                              vf_filters: str = "unsharp=3:3:1.5", with_audio: bool = True, crf: int = None) -> list:
+        """
+        Encode one segment on its own, ready to be joined with the concat demuxer.
+
+        Video gets the full per-take chain (scale/pad/fps/unsharp) and is encoded with
+        libx264. Audio is stored as PCM so normalization, music and AAC encoding happen
+        once over the joined timeline, without per-segment encoder priming gaps.
+
+        The frame count is pinned to round(duration * fps): at EOF the fps filter emits
+        a frame for the tail of the last source frame, which would put an extra frame
+        into every segment (and every chunk of a split segment) cut off the source grid.
+        The audio is cut from the same frames / fps and padded or trimmed to exactly that
+        many samples (source audio often starts or ends a codec frame off the video), so
+        both streams of every segment end together and the joined timeline doesn't drift.
+        Both are padded and trimmed inside the graph: an output -frames:v would stop the
+        muxer while the audio still has samples to write.
+        """
+        frames = max(1, round((segment["end"] - segment["start"]) * fps))
+        segment = dict(segment, end=segment["start"] + frames / fps)
+        graph = self._segment_chains(0, segment, width, height, fps, with_audio)
+        graph.append(f"[v0]{vf_filters + ',' if vf_filters else ''}tpad=stop=-1:stop_mode=clone,trim=end_frame={frames}[vout]")
+        if with_audio:
+            graph.append(f"[a0]apad,atrim=end_sample={round(frames * self.AUDIO_RATE / fps)}[aout]")
+
+        cmd = [self.ffmpeg_bin, "-hide_banner", "-nostdin", "-y"]
+        cmd.extend(self._segment_input(segment))
+        cmd.extend(["-filter_complex", ";".join(graph), "-map", "[vout]"])
+        if with_audio:
+            cmd.extend(["-map", "[aout]", "-c:a", "pcm_s16le"])
+        cmd.extend(self._video_encoder_args(preset, threads, faststart=False, crf=crf))
+        cmd.append(output_path)
+        return cmd
+
+    def build_assemble_command(self, segment_files: list, list_path: str, output_path: str,
+                               with_audio: bool = True, bg_music_path: str = None, loudness: dict = None) -> list:
+        """Join encoded segments: video is stream-copied, audio is mixed/normalized and encoded once."""
+        with open(list_path, "w") as f:
+            f.write("ffconcat version 1.0\n")
+            for path in segment_files:
+                f.write(f"file '{self._escape_concat_path(os.path.abspath(path))}'\n")
+
+        cmd = [self.ffmpeg_bin, "-hide_banner", "-nostdin", "-y", "-f", "concat", "-safe", "0", "-i", list_path]
+        if with_audio:
+            music_args, audio_graph = self._audio_mix_chain("0:a:0", bg_music_path, 1, loudness)
+            cmd.extend(music_args)
+            cmd.extend(["-filter_complex", ";".join(audio_graph), "-map", "0:v:0", "-map", "[aout]", "-c:a", "aac"])
+        else:
+            cmd.extend(["-map", "0:v:0"])
+        cmd.extend(["-c:v", "copy", "-movflags", "+faststart", output_path])
+        return cmd
+
+    def _segment_input(self, seg: dict) -> list:
+        duration = seg["end"] - seg["start"]
+        # Microsecond cut points, so the chunks of a split segment add up to the segment
+        return ["-ss", f"{seg['start']:.6f}", "-t", f"{duration:.6f}", "-i", seg["path"]]
+
+    def _segment_chains(self, i: int, seg: dict, width: int, height: int, fps: int, with_audio: bool) -> list:
+        """Per-input video chain [v{i}] and, if the timeline has audio, audio chain [a{i}]."""
+        # concat needs identical frame sizes, so letterbox every take onto the first take's canvas
+        chains = [
+            f"[{i}:v:0]fps={fps},scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,format=yuv420p,setpts=PTS-STARTPTS[v{i}]"
+        ]
+        if with_audio:
+            if seg["has_audio"]:
+                chains.append(f"[{i}:a:0]aresample={self.AUDIO_RATE},aformat=sample_fmts=fltp:channel_layouts=stereo,asetpts=PTS-STARTPTS[a{i}]")
+            else:
+                # Keep concat happy: silent clips still need an audio pad of the same length
+                chains.append(f"anullsrc=r={self.AUDIO_RATE}:cl=stereo,atrim=duration={seg['end'] - seg['start']:.3f}[a{i}]")
+        return chains
+
+    def _audio_mix_chain(self, audio_label: str, bg_music_path: str, music_index: int, loudness: dict = None):
+        """
+        Music bed (optional) and loudness normalization, ending in [aout]. Returns (input args, graph).
+        With ingest loudness stats, loudnorm runs in linear mode and skips its look-ahead analysis.
+        """
+        args, graph = [], []
+        if bg_music_path:
+            # Loop, duck under the voice (sidechain) and mix, all inside the graph.
+            # aresample/aformat are pass-through when the input is a prepared music bed.
+            args.extend(["-i", bg_music_path])
+            graph.append(f"[{music_index}:a:0]aresample={self.AUDIO_RATE},aformat=sample_fmts=fltp:channel_layouts=stereo,"
+                         f"aloop=loop=-1:size={self.music_loop_samples(bg_music_path)},volume={self.MUSIC_VOLUME}[bg]")
+            graph.append(f"[{audio_label}]aformat=sample_fmts=fltp:channel_layouts=stereo,asplit=2[voice][sc]")
+            graph.append(f"[bg][sc]sidechaincompress={self.MUSIC_DUCKING}[ducked]")
+            graph.append("[voice][ducked]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[amix]")
+            audio_label = "amix"
+        # loudnorm's output timestamps can run ahead of its samples (a gap the AAC muxer keeps,
+        # so the audio outlasts the video); the samples themselves are contiguous, so renumber them
+        graph.append(f"[{audio_label}]{LoudnessAnalyzer.loudnorm_filter(loudness)},aresample={self.AUDIO_RATE},"
+                     f"aformat=channel_layouts=stereo,asetpts=N/SR/TB[aout]")
+        return args, graph
+
+    def music_loop_samples(self, music_path: str) -> int:
+        """aloop buffer size for a music track: its length in output samples."""
+        try:
+            duration = probe_media(music_path)["duration"]
+        except Exception as e:
+            logger.warning(f"Could not probe music track {music_path}: {e}")
+            duration = 0.0
+        if not duration or duration > self.MUSIC_LOOP_MAX_SECONDS:
+            duration = self.MUSIC_LOOP_MAX_SECONDS
+        return math.ceil((duration + self.MUSIC_LOOP_MARGIN_SECONDS) * self.AUDIO_RATE)
+
+    def build_music_bed_command(self, music_path: str, output_path: str) -> list:
+        """Decode and resample a music track once into a PCM bed the render graphs can loop as-is."""
+        return [
+            self.ffmpeg_bin, "-y", "-hide_banner", "-nostdin",
+            "-i", music_path, "-map", "0:a:0", "-vn",
+            "-ar", str(self.AUDIO_RATE), "-ac", "2", "-c:a", "pcm_s16le",
+            output_path
+        ]
+
+    def prepare_music_bed(self, music_path: str, output_path: str) -> str:
+        self._run(self.build_music_bed_command(music_path, output_path))
+        return output_path
+
+    @staticmethod
+    def _video_encoder_args(preset: str, threads: int, faststart: bool = True, crf: int = None) -> list:
+        args = ["-c:v", "libx264", "-preset", preset, "-threads", str(threads), "-pix_fmt", "yuv420p"]
+        if crf is not None:
+            args.extend(["-crf", str(crf)])
+        if faststart:
+            args.extend(["-movflags", "+faststart"])
+        return args
+
+    @staticmethod
+    def canvas_width(segment: dict, height: int) -> int:
+        """Output width that keeps the segment's aspect ratio at the target height (even for yuv420p)."""
+        src_w, src_h = segment.get("width"), segment.get("height")
+        if not src_w or not src_h:
+            return int(round(height * 16 / 9 / 2)) * 2
+        return int(round(src_w * height / src_h / 2)) * 2
+
+    def render(self, segments: list, output_path: str, on_progress=None, **kwargs) -> str:
+        """Run the compiled command. Raises RuntimeError if ffmpeg fails."""
+        if not segments:
+            raise ValueError("No segments to render")
+
+        cmd = self.build_command(segments, output_path, **kwargs)
+        logger.info(f"Running ffmpeg render with {len(segments)} segments -> {output_path}")
+        self._run(cmd, on_progress)
+        return output_path
+
+    def plan_stream_copy(self, segments: list, snap_tolerance: float = 0.5) -> list:
+        """
+        Map each segment onto the source keyframes for a stream-copy assembly.
+
+        A cut that lands within snap_tolerance of a keyframe is snapped to it and
+        copied whole. Otherwise only the head up to the next keyframe (the boundary
+        GOP) is re-encoded and the rest is copied.
+
+        Returns:
+            List of parts: dicts with 'path', 'start', 'end', 'copy' and the segment's probe info.
+        """
+        parts = []
+        for seg in segments:
+            keyframes = probe_keyframes(seg["path"])
+            if not keyframes:
+                return None
+
+            start, end = seg["start"], seg["end"]
+            nearest = min(keyframes, key=lambda k: abs(k - start))
+            if abs(nearest - start) <= snap_tolerance and nearest < end:
+                parts.append(dict(seg, start=nearest, end=end, copy=True))
+                continue
+
+            next_keyframe = next((k for k in keyframes if k > start), None)
+            if next_keyframe is None or next_keyframe >= end:
+                # No keyframe inside the cut: the whole (short) cut is the boundary
+                parts.append(dict(seg, copy=False))
+            else:
+                parts.append(dict(seg, end=next_keyframe, copy=False))
+                parts.append(dict(seg, start=next_keyframe, copy=True))
+        return parts
+
+    def render_segment(self, segment: dict, output_path: str, on_progress=None, **kwargs) -> str:
+        """Encode a single cache segment (see build_segment_command)."""
+        self._run(self.build_segment_command(segment, output_path, **kwargs), on_progress)
+        return output_path
+
+    def assemble_segments(self, segment_files: list, output_path: str, on_progress=None, **kwargs) -> str:
+        """Join encoded segments into the final output (see build_assemble_command)."""
+        logger.info(f"Assembling {len(segment_files)} segments -> {output_path}")
+        with tempfile.TemporaryDirectory(prefix="assemble_") as work_dir:
+            list_path = os.path.join(work_dir, "concat.txt")
+            self._run(self.build_assemble_command(segment_files, list_path, output_path, **kwargs), on_progress)
+        return output_path
+
+    def render_stream_copy(self, parts: list, output_path: str, on_progress=None) -> str:
+        """
+        Assemble parts with the concat demuxer and '-c copy'.
+        Boundary parts are first re-encoded to match the source stream parameters.
+        """
+        encoded = sum(1 for part in parts if not part["copy"])
+        logger.info(f"Stream-copy render: {len(parts)} parts ({encoded} boundary re-encodes) -> {output_path}")
+
+        with tempfile.TemporaryDirectory(prefix="streamcopy_") as work_dir:
+            lines = ["ffconcat version 1.0"]
+            for i, part in enumerate(parts):
+                if part["copy"]:
+                    lines.append(f"file '{self._escape_concat_path(os.path.abspath(part['path']))}'")
+                    lines.append(f"inpoint {part['start']:.6f}")
+                    if part["end"] < part["duration"]:
+                        lines.append(f"outpoint {part['end']:.6f}")
+                else:
+                    boundary_path = os.path.join(work_dir, f"boundary_{i:03d}.mp4")
+                    self._encode_boundary(part, boundary_path)
+                    lines.append(f"file '{self._escape_concat_path(boundary_path)}'")
+
+            list_path = os.path.join(work_dir, "concat.txt")
+            with open(list_path, "w") as f:
+                f.write("\n".join(lines) + "\n")
+
+            self._run([
+                self.ffmpeg_bin, "-hide_banner", "-nostdin", "-y",
+                "-f", "concat", "-safe", "0", "-i", list_path,
+                "-map", "0", "-c", "copy", "-movflags", "+faststart",
+                output_path
+            ], on_progress)
+        return output_path
+
+    def _encode_boundary(self, part: dict, output_path: str):
+        """Re-encode a boundary GOP with the same size, frame rate and codecs as its source."""
+        cmd = [
+            self.ffmpeg_bin, "-hide_banner", "-nostdin", "-y",
+            "-ss", f"{part['start']:.6f}", "-t", f"{part['end'] - part['start']:.6f}", "-i", part["path"],
+            "-map", "0:v:0", "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+            "-s", f"{part['width']}x{part['height']}"
+        ]
+        if part.get("fps"):
+            cmd.extend(["-r", f"{part['fps']:.6f}"])
+        if part["has_audio"]:
+            cmd.extend(["-map", "0:a:0", "-c:a", "aac"])
+            if part.get("sample_rate"):
+                cmd.extend(["-ar", str(part["sample_rate"])])
+            if part.get("channels"):
+                cmd.extend(["-ac", str(part["channels"])])
+        cmd.append(output_path)
+        self._run(cmd)
+
+    @staticmethod
+    def _escape_concat_path(path: str) -> str:
+        return path.replace("'", "'\\''")
+
+    def _run(self, cmd: list, on_progress=None):
+        """
+        Run ffmpeg, raising RuntimeError with the stderr tail on failure.
+        With on_progress, ffmpeg's -progress stream is parsed and the output time
+        (seconds) is passed to on_progress after every progress block.
+        """
+        if not on_progress:
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            returncode, stderr = result.returncode, result.stderr
+        else:
+            cmd = cmd[:1] + ["-progress", "pipe:1", "-nostats"] + cmd[1:]
+            # stderr goes to a file so a chatty encoder can never block on a full pipe
+            with tempfile.TemporaryFile(mode="w+") as stderr_file:
+                process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file, text=True)
+                out_seconds = 0.0
+                for line in process.stdout:
+                    key, _, value = line.strip().partition("=")
+                    if key == "out_time_us" and value.lstrip("-").isdigit():
+                        out_seconds = max(int(value), 0) / 1_000_000
+                    elif key == "progress":
+                        on_progress(out_seconds)
+                returncode = process.wait()
+                stderr_file.seek(0)
+                stderr = stderr_file.read()
+
+        if returncode != 0:
+            tail = "\n".join(stderr.strip().splitlines()[-10:])
+            raise RuntimeError(f"ffmpeg exited with code {returncode}: {tail}")
@@ -0,0 +1,25 @@
+"""
+Scheduling lanes for the job queue.
+
+Workers claim pending jobs by weighted fair score (claim_jobs in supabase_setup.sql),
+not strictly by age. Each job is enqueued into one lane:
+
+    interactive - draft renders, and the analysis join step that produces the draft:
+                  a creator is waiting on the result (weight 8)
+    final       - final renders (weight 4)
+    bulk        - analysis, speculative draft encodes and anything else (weight 1)
+
+Weights live in the job_lanes table so they can be tuned without a deploy; jobs of
+one owner are interleaved round-robin across their projects within every lane.
+"""
+JOB_LANES = ("interactive", "final", "bulk")
+
+DEFAULT_LANE = "bulk"
+
+def lane_for_job(job_type: str, payload: dict = None) -> str:
+    """The lane a new job is queued in."""
+    if job_type == "finish_analysis":
+        return "interactive"
+    if job_type == "render":
+        return "interactive" if (payload or {}).get("is_draft") else "final"
+    return DEFAULT_LANE
@@ -0,0 +1,98 @@
+"""
+Job leases: how a worker shows it is still working on the jobs it claimed.
+
+claim_jobs leases each job to the claiming worker. While a job runs, the worker's
+LeaseKeeper renews the lease every third of its length. A worker that dies (OOM,
+container restart) stops renewing, and any worker's reaper then hands its jobs back
+to the queue with an exponential backoff, or marks them 'dead' after max_attempts
+(supabase_setup.sql: renew_job_leases, release_job, reclaim_expired_jobs).
+
+    JOB_LEASE_SECONDS          - lease length (default 120)
+    JOB_RETRY_BACKOFF_SECONDS  - delay before the first retry, doubling per attempt (default 30)
+    WORKER_ID                  - name recorded on claimed jobs (default host-pid)
+"""
+import os
+import socket
+import threading
+from .utils import get_logger
+
+logger = get_logger(__name__)
+
+JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", "120"))
+JOB_RETRY_BACKOFF_SECONDS = int(os.environ.get("JOB_RETRY_BACKOFF_SECONDS", "30"))
+
+def default_worker_id() -> str:
+    return os.environ.get("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+class LeaseKeeper:
+    """Background heartbeat for a worker's running jobs, plus the reaper for everyone's expired leases."""
+
+    def __init__(self, db, pool, worker_id: str, lease_seconds: int = None, reap_interval: float = None):
+        """
+        Args:
+            db: Database (renew_job_leases / reclaim_expired_jobs).
+            pool: JobProcessPool whose running jobs this worker holds leases on.
+            worker_id: The worker name the jobs were claimed with.
+            lease_seconds: Lease length to renew to (JOB_LEASE_SECONDS).
+            reap_interval: Seconds between reaper runs (default: half a lease).
+        """
+        self.db = db
+        self.pool = pool
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds or JOB_LEASE_SECONDS
+        self.heartbeat_interval = self.lease_seconds / 3
+        self.reap_interval = reap_interval or self.lease_seconds / 2
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def heartbeat(self) -> list:
+        """Renew the leases on our running jobs. Returns the ids of jobs whose lease was lost (and were stopped)."""
+        jobs = self.pool.running_jobs()
+        if not jobs:
+            return []
+        held = self.db.renew_job_leases([job["id"] for job in jobs], self.worker_id, self.lease_seconds)
+        if held is None:
+            # Database unreachable: keep running, the next beat may get through before the lease lapses
+            return []
+        lost = []
+        for job in jobs:
+            if job["id"] not in held and self.pool.terminate(job["id"]):
+                # Reclaimed while we were out of touch; another worker may already be running it
+                logger.warning(f"Lease on job {job['id']} was lost, stopping it")
+                lost.append(job["id"])
+        return lost
+
+    def reap(self) -> list:
+        """Return jobs with expired leases (from any worker) to the queue."""
+        reclaimed = self.db.reclaim_expired_jobs(JOB_RETRY_BACKOFF_SECONDS, self.lease_seconds)
+        for job in reclaimed:
+            if job.get("status") == "dead":
+                logger.error(f"Job {job['id']} is dead after {job.get('attempts')} attempts: {job.get('error')}")
+            else:
+                logger.warning(f"Reclaimed job {job['id']} (attempt {job.get('attempts')}): {job.get('error')}")
+        return reclaimed
+
+    def _run(self):
+        elapsed = self.reap_interval  # Reap once on startup: recover jobs from a previous crash
+        while not self._stopped.is_set():
+            try:
+                self.heartbeat()
+                if elapsed >= self.reap_interval:
+                    self.reap()
+                    elapsed = 0.0
+            except Exception as e:
+                logger.error(f"Lease heartbeat error: {e}")
+            self._stopped.wait(self.heartbeat_interval)
+            elapsed += self.heartbeat_interval
@@ -0,0 +1,151 @@
+import os
+import glob
+import time
+import socket
+import tempfile
+import threading
+from .utils import get_logger, ensure_directory
+
+logger = get_logger(__name__)
+
+# Postgres channel the jobs trigger notifies (supabase_setup.sql)
+JOB_CHANNEL = "jobs"
+
+class JobNotifier:
+    """
+    Wakes idle workers as soon as a job is enqueued, so they don't sit out a poll interval.
+
+    A notification reaches a waiting worker over whichever of these it shares with the producer:
+      - an in-process event: the API and its internal worker thread (MVP mode)
+      - local datagram sockets in notify_dir (JOB_NOTIFY_DIR): API and worker processes on one host
+      - Postgres LISTEN on the 'jobs' channel when database_url (DATABASE_URL) is set: workers
+        anywhere. Needs psycopg2 and a direct or session-mode connection (the transaction
+        pooler drops LISTEN).
+
+    Notifications are only a hint; workers still poll (with backoff), so a lost one costs latency, never a job.
+    """
+
+    def __init__(self, notify_dir: str = None, database_url: str = None):
+        self.notify_dir = notify_dir or os.environ.get("JOB_NOTIFY_DIR", os.path.join(tempfile.gettempdir(), "cinema-ai-jobs"))
+        self.database_url = database_url or os.environ.get("DATABASE_URL")
+        self.listening_remote = False
+        self._event = threading.Event()
+        self._stopped = threading.Event()
+        self._socket = None
+        self._socket_path = None
+        self._threads = []
+        ensure_directory(self.notify_dir)
+
+    def notify(self):
+        """A job was enqueued: wake workers in this process and on this host."""
+        self.wake()
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sender.setblocking(False)
+        try:
+            for path in glob.glob(os.path.join(self.notify_dir, "*.sock")):
+                try:
+                    sender.sendto(b"1", path)
+                except BlockingIOError:
+                    pass  # Queue full: that worker already has a wake-up pending
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Left behind by a worker that exited without cleaning up
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+        finally:
+            sender.close()
+
+    def wake(self):
+        """Wake waiters in this process only (e.g. on shutdown)."""
+        self._event.set()
+
+    def start_listening(self):
+        """Worker side: start receiving notifications from other processes and hosts."""
+        if self._threads:
+            return
+        self._socket_path = os.path.join(self.notify_dir, f"worker-{os.getpid()}-{id(self)}.sock")
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(self._socket_path)
+        self._socket.settimeout(1.0)
+        self._threads.append(threading.Thread(target=self._listen_socket, daemon=True))
+
+        if self.database_url:
+            self._threads.append(threading.Thread(target=self._listen_postgres, daemon=True))
+
+        for thread in self._threads:
+            thread.start()
+
+    def wait(self, timeout: float) -> bool:
+        """Block until notified or timeout. Returns True if notified."""
+        notified = self._event.wait(timeout)
+        self._event.clear()
+        return notified
+
+    def stop(self):
+        self._stopped.set()
+        self.wake()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        if self._socket:
+            self._socket.close()
+            self._socket = None
+        if self._socket_path and os.path.exists(self._socket_path):
+            os.remove(self._socket_path)
+
+    def _listen_socket(self):
+        while not self._stopped.is_set():
+            try:
+                self._socket.recv(16)
+                self._event.set()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+    def _listen_postgres(self):
+        import select
+        try:
+            import psycopg2
+        except ImportError:
+            logger.warning("DATABASE_URL is set but psycopg2 is not installed; workers will poll for jobs")
+            return
+
+        while not self._stopped.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.database_url)
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {JOB_CHANNEL}")
+                self.listening_remote = True
+                logger.info("Listening for job notifications from Postgres")
+                # Jobs may have been enqueued while we were not listening
+                self._event.set()
+
+                while not self._stopped.is_set():
+                    if select.select([conn], [], [], 1.0)[0]:
+                        conn.poll()
+                        if conn.notifies:
+                            conn.notifies.clear()
+                            self._event.set()
+            except Exception as e:
+                logger.warning(f"Job notification listener lost its connection: {e}")
+                self.listening_remote = False
+                self._stopped.wait(5)
+            finally:
+                if conn is not None:
+                    conn.close()
+        self.listening_remote = False
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+def get_job_notifier() -> JobNotifier:
+    """The process-wide notifier, shared by the API's enqueue calls and the internal worker."""
+    global _notifier
+    with _notifier_lock:
+        if _notifier is None:
+            _notifier = JobNotifier()
+        return _notifier
@@ -0,0 +1,255 @@
+import os
+import time
+import queue
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+from .utils import get_logger
+
+logger = get_logger(__name__)
+
+def _serve(target, conn):
+    """Child process loop: run each job sent by the pool, until told to stop (None) or the pool goes away."""
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        # An exception escapes and ends the process, so the pool reports a non-zero exit for this job
+        target(job)
+        conn.send(job["id"])
+
+class JobProcessPool:
+    """
+    Runs each job in a child process, admitted through ResourceSlots.
+
+    Children are spawned rather than forked, so each starts from a clean interpreter
+    without the parent's threads, locks or open connections, and a crash or OOM kill
+    takes down only its own job. The parent learns about exits through reap().
+
+    A child runs one job at a time but outlives it: up to max_idle children wait for
+    the next job instead of exiting, so models a job loaded (Whisper, ...) are not
+    loaded again for every clip. Idle children exit after idle_seconds, and each is
+    replaced after max_jobs jobs to bound leaks.
+
+        JOB_PROCESS_MAX_IDLE      - children kept waiting for work (default 1, 0: one process per job)
+        JOB_PROCESS_IDLE_SECONDS  - how long an idle child is kept (default 300)
+        JOB_PROCESS_MAX_JOBS      - jobs one child runs before it is replaced (default 50)
+    """
+
+    def __init__(self, slots, target, on_exit=None, max_idle: int = None, idle_seconds: float = None, max_jobs: int = None):
+        """
+        Args:
+            slots: ResourceSlots to reserve capacity from.
+            target: Top-level function run in the child with the job dict.
+            on_exit: Called (from a watcher thread) whenever a job finishes, e.g. to wake the worker loop.
+        """
+        self.slots = slots
+        self.target = target
+        self.on_exit = on_exit
+        self.max_idle = max_idle if max_idle is not None else int(os.environ.get("JOB_PROCESS_MAX_IDLE", "1"))
+        self.idle_seconds = idle_seconds if idle_seconds is not None else float(os.environ.get("JOB_PROCESS_IDLE_SECONDS", "300"))
+        self.max_jobs = max_jobs or int(os.environ.get("JOB_PROCESS_MAX_JOBS", "50"))
+        self._context = multiprocessing.get_context("spawn")
+        self._running = {}
+        self._idle = []
+        self._exited = queue.Queue()
+        self._lock = threading.Lock()
+
+    def start(self, job: dict) -> bool:
+        """Start the job if its reservation fits. Returns False (and starts nothing) otherwise."""
+        if not self.slots.acquire(job["type"]):
+            return False
+        try:
+            child = self._take_idle() or self._spawn(job)
+            # The job learns the cores it was granted, e.g. to size its encoders
+            child["conn"].send(dict(job, cores=self.slots.requirement(job["type"])["cores"]))
+        except Exception:
+            self.slots.release(job["type"])
+            raise
+        watcher = threading.Thread(target=self._watch, args=(child, job), daemon=True)
+        with self._lock:
+            self._running[job["id"]] = (job, child, watcher)
+        watcher.start()
+        logger.info(f"Started job {job['id']} ({job['type']}) in process {child['process'].pid}; slots: {self.slots.usage()}")
+        return True
+
+    def reap(self) -> list:
+        """Jobs that finished since the last call, as (job, exit code), with their slots released."""
+        self._expire_idle()
+        exited = []
+        while True:
+            try:
+                job, exitcode = self._exited.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._running.pop(job["id"], None)
+            self.slots.release(job["type"])
+            exited.append((job, exitcode))
+        return exited
+
+    def running_jobs(self) -> list:
+        with self._lock:
+            return [job for job, _, _ in self._running.values()]
+
+    def terminate(self, job_id: str) -> bool:
+        """Stop a running job's process (it is reported through reap() as usual). False if it is not running."""
+        with self._lock:
+            entry = self._running.get(job_id)
+        if not entry or not entry[1]["process"].is_alive():
+            return False
+        entry[1]["process"].terminate()
+        return True
+
+    def join(self, timeout: float = None):
+        """Wait for every running job to finish (and be ready for reap())."""
+        with self._lock:
+            watchers = [watcher for _, _, watcher in self._running.values()]
+        for watcher in watchers:
+            watcher.join(timeout)
+
+    def close(self):
+        """Stop the idle children (call once no more jobs will be started)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for child in idle:
+            self._stop(child)
+
+    def _spawn(self, job: dict) -> dict:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_serve, args=(self.target, child_conn), name=f"job-{job['id']}")
+        process.start()
+        child_conn.close()
+        return {"process": process, "conn": parent_conn, "jobs": 0, "idle_since": None}
+
+    def _take_idle(self):
+        with self._lock:
+            while self._idle:
+                child = self._idle.pop()
+                if child["process"].is_alive():
+                    return child
+        return None
+
+    def _watch(self, child: dict, job: dict):
+        process, conn = child["process"], child["conn"]
+        exitcode = None
+        while exitcode is None:
+            ready = wait([conn, process.sentinel])
+            if conn in ready:
+                try:
+                    conn.recv()
+                    exitcode = 0
+                except (EOFError, OSError):
+                    ready = [process.sentinel]
+            if exitcode is None and process.sentinel in ready:
+                process.join()
+                exitcode = process.exitcode
+
+        if exitcode == 0:
+            self._park(child)
+        self._exited.put((job, exitcode))
+        if self.on_exit:
+            self.on_exit()
+
+    def _park(self, child: dict):
+        """Keep a child that finished its job for the next one, or stop it."""
+        child["jobs"] += 1
+        with self._lock:
+            if child["jobs"] < self.max_jobs and len(self._idle) < self.max_idle:
+                child["idle_since"] = time.monotonic()
+                self._idle.append(child)
+                return
+        self._stop(child)
+
+    def _expire_idle(self):
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            expired = [child for child in self._idle if child["idle_since"] < cutoff]
+            self._idle = [child for child in self._idle if child["idle_since"] >= cutoff]
+        for child in expired:
+            self._stop(child)
+
+    @staticmethod
+    def _stop(child: dict):
+        try:
+            child["conn"].send(None)
+        except (OSError, ValueError):
+            pass
+        child["conn"].close()
+        child["process"].join(5)
+        if child["process"].is_alive():
+            child["process"].terminate()
+
+class InProcessJobPool:
+    """
+    Runs jobs on a thread of the worker's own process, with the same interface as
+    JobProcessPool. Nothing is spawned and loaded models stay in memory, for the worker
+    embedded in the API process (main.py) on small instances. Give it ResourceSlots
+    with max_jobs=1: jobs here share one interpreter.
+
+    A job thread can't be stopped from outside, so terminate() only logs it; a job
+    whose lease was lost finishes, but its completion is ignored (complete_job checks
+    the lease) and the job runs again where it was reclaimed.
+    """
+
+    def __init__(self, slots, target, on_exit=None):
+        self.slots = slots
+        self.target = target
+        self.on_exit = on_exit
+        self._running = {}
+        self._exited = queue.Queue()
+        self._lock = threading.Lock()
+
+    def start(self, job: dict) -> bool:
+        if not self.slots.acquire(job["type"]):
+            return False
+        thread = threading.Thread(target=self._run, args=(job,), name=f"job-{job['id']}", daemon=True)
+        with self._lock:
+            self._running[job["id"]] = (job, thread)
+        thread.start()
+        logger.info(f"Started job {job['id']} ({job['type']}) in-process; slots: {self.slots.usage()}")
+        return True
+
+    def reap(self) -> list:
+        exited = []
+        while True:
+            try:
+                job, exitcode = self._exited.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._running.pop(job["id"], None)
+            self.slots.release(job["type"])
+            exited.append((job, exitcode))
+        return exited
+
+    def running_jobs(self) -> list:
+        with self._lock:
+            return [job for job, _ in self._running.values()]
+
+    def terminate(self, job_id: str) -> bool:
+        logger.warning(f"Job {job_id} runs in-process and can't be stopped; its result will be discarded")
+        return False
+
+    def join(self, timeout: float = None):
+        with self._lock:
+            threads = [thread for _, thread in self._running.values()]
+        for thread in threads:
+            thread.join(timeout)
+
+    def close(self):
+        pass
+
+    def _run(self, job: dict):
+        exitcode = 0
+        try:
+            self.target(dict(job, cores=self.slots.requirement(job["type"])["cores"]))
+        except BaseException as e:
+            logger.error(f"Job {job['id']} raised in-process: {e}")
+            exitcode = 1
+        self._exited.put((job, exitcode))
+        if self.on_exit:
+            self.on_exit()
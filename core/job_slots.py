@@ -0,0 +1,128 @@
+"""
+Resource slots for running several jobs at once in one worker.
+
+Each job type declares the cores and memory one job of that type needs. A worker
+admits a job only when its reservation fits in the machine's capacity next to the
+jobs already running, and when that much memory is actually free right now, so one
+worker process can keep a large box busy without overcommitting RAM.
+
+    WORKER_CORES      - cores the worker may use (default: all)
+    WORKER_MEMORY_MB  - memory the worker may reserve (default: 90% of RAM)
+    WORKER_MAX_JOBS   - jobs run at once regardless of capacity (default: no limit)
+    JOB_RESOURCES     - JSON overrides per job type, e.g. {"render": {"cores": 2, "memory_mb": 800}}
+"""
+import os
+import json
+import threading
+from .utils import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_JOB_RESOURCES = {
+    # Whisper, scene detection and frame extraction
+    "analyze": {"cores": 2, "memory_mb": 1536},
+    # ffmpeg encodes with the render profile's thread budget (core/render_profiles.py)
+    "render": {"cores": 4, "memory_mb": 1024},
+    # Join step after per-clip analysis: reverse script and draft enqueue
+    "finish_analysis": {"cores": 1, "memory_mb": 256},
+    # Speculative draft encode of one take (360p draft profile, 2 threads)
+    "prerender": {"cores": 2, "memory_mb": 512}
+}
+
+# Reservation for job types without an entry
+FALLBACK_JOB_RESOURCES = {"cores": 1, "memory_mb": 512}
+
+def job_resources() -> dict:
+    """Per job type requirements: the defaults, overridden by JOB_RESOURCES."""
+    resources = {job_type: dict(need) for job_type, need in DEFAULT_JOB_RESOURCES.items()}
+    overrides = os.environ.get("JOB_RESOURCES")
+    if overrides:
+        try:
+            for job_type, need in json.loads(overrides).items():
+                resources[job_type] = dict(resources.get(job_type, FALLBACK_JOB_RESOURCES), **need)
+        except (ValueError, AttributeError) as e:
+            logger.error(f"Ignoring invalid JOB_RESOURCES: {e}")
+    return resources
+
+def _meminfo_mb(field: str) -> float:
+    """A /proc/meminfo field in MB, or None where it isn't available."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def available_memory_mb() -> float:
+    return _meminfo_mb("MemAvailable")
+
+class ResourceSlots:
+    """Capacity accounting for the jobs a worker runs at once."""
+
+    def __init__(self, cores: float = None, memory_mb: float = None, resources: dict = None, max_jobs: int = None):
+        self.cores = cores or float(os.environ.get("WORKER_CORES") or os.cpu_count() or 1)
+        total_memory = _meminfo_mb("MemTotal") or 4096
+        self.memory_mb = memory_mb or float(os.environ.get("WORKER_MEMORY_MB") or total_memory * 0.9)
+        self.resources = resources or job_resources()
+        self.max_jobs = max_jobs or int(os.environ.get("WORKER_MAX_JOBS") or 0) or None
+        self.used_cores = 0.0
+        self.used_memory_mb = 0.0
+        self.running = 0
+        self._lock = threading.Lock()
+
+    def requirement(self, job_type: str) -> dict:
+        return self.resources.get(job_type, FALLBACK_JOB_RESOURCES)
+
+    def fits(self, job_type: str) -> bool:
+        with self._lock:
+            return self._fits(job_type)
+
+    def admissible_types(self) -> list:
+        """Job types that could start right now."""
+        with self._lock:
+            return [job_type for job_type in self.resources if self._fits(job_type)]
+
+    def acquire(self, job_type: str) -> bool:
+        """Reserve capacity for one job; False if it doesn't fit."""
+        with self._lock:
+            if not self._fits(job_type):
+                return False
+            need = self.requirement(job_type)
+            self.used_cores += need["cores"]
+            self.used_memory_mb += need["memory_mb"]
+            self.running += 1
+            return True
+
+    def release(self, job_type: str):
+        with self._lock:
+            need = self.requirement(job_type)
+            self.used_cores = max(0.0, self.used_cores - need["cores"])
+            self.used_memory_mb = max(0.0, self.used_memory_mb - need["memory_mb"])
+            self.running = max(0, self.running - 1)
+
+    def usage(self) -> dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "cores": self.used_cores,
+                "max_cores": self.cores,
+                "memory_mb": self.used_memory_mb,
+                "max_memory_mb": self.memory_mb
+            }
+
+    def _fits(self, job_type: str) -> bool:
+        if self.max_jobs and self.running >= self.max_jobs:
+            return False
+        # An idle worker always takes a job, even one larger than the box (the old one-at-a-time behaviour)
+        if self.running == 0:
+            return True
+        need = self.requirement(job_type)
+        if self.used_cores + need["cores"] > self.cores:
+            return False
+        if self.used_memory_mb + need["memory_mb"] > self.memory_mb:
+            return False
+        # Other tenants may be using memory our reservations don't know about
+        free = available_memory_mb()
+        return free is None or need["memory_mb"] <= free
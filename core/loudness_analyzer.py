@@ -0,0 +1,102 @@
+import re
+import json
+import math
+import subprocess
+from .utils import get_logger
+
+logger = get_logger(__name__)
+
+# PRD 10. Audio Rules - Normalization target (ffmpeg loudnorm defaults)
+TARGET_I = -24.0
+TARGET_TP = -2.0
+TARGET_LRA = 7.0
+
+class LoudnessAnalyzer:
+    """
+    Measures EBU R128 loudness once per clip during analysis.
+
+    The stored stats let the renderer run loudnorm as the second pass of a
+    two-pass normalization (linear mode), so no render has to carry the
+    look-ahead analysis of single-pass loudnorm.
+    """
+
+    def measure(self, video_path: str) -> dict:
+        """
+        Run the loudnorm measurement pass over the clip's first audio stream.
+        Returns input_i/input_tp/input_lra/input_thresh/target_offset, or None if there is no audio.
+        """
+        logger.info(f"Measuring loudness for {video_path}")
+        cmd = [
+            "ffmpeg", "-hide_banner", "-nostdin", "-i", video_path,
+            "-map", "0:a:0", "-vn",
+            "-af", f"loudnorm=I={TARGET_I}:TP={TARGET_TP}:LRA={TARGET_LRA}:print_format=json",
+            "-f", "null", "-"
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            logger.info(f"No measurable audio in {video_path}, skipping loudness stats")
+            return None
+
+        # loudnorm prints its JSON block at the end of stderr
+        match = re.search(r"\{[^{}]*\"input_i\"[^{}]*\}", result.stderr)
+        if not match:
+            logger.warning(f"Could not parse loudnorm output for {video_path}")
+            return None
+
+        raw = json.loads(match.group(0))
+        stats = {}
+        for field in ("input_i", "input_tp", "input_lra", "input_thresh", "target_offset"):
+            stats[field] = float(raw[field])
+        logger.info(f"Loudness for {video_path}: {stats['input_i']:.1f} LUFS, {stats['input_tp']:.1f} dBTP")
+        return stats
+
+    @staticmethod
+    def combine(measurements: list) -> dict:
+        """
+        Combine per-clip stats for a multi-clip timeline.
+
+        Args:
+            measurements: List of (stats, duration) pairs, one per timeline segment.
+
+        Returns:
+            Combined stats, or None if any segment has no stats (renderer falls back to single-pass).
+        """
+        if not measurements or any(stats is None for stats, _ in measurements):
+            return None
+
+        total = sum(duration for _, duration in measurements)
+        if total <= 0:
+            return None
+
+        def energy_mean(field):
+            # Loudness adds in the power domain, weighted by how long each clip plays
+            power = sum(duration * 10 ** (stats[field] / 10) for stats, duration in measurements
+                        if math.isfinite(stats[field]))
+            return 10 * math.log10(power / total) if power > 0 else -99.0
+
+        return {
+            "input_i": energy_mean("input_i"),
+            "input_tp": max(stats["input_tp"] for stats, _ in measurements),
+            "input_lra": max(stats["input_lra"] for stats, _ in measurements),
+            "input_thresh": energy_mean("input_thresh"),
+            "target_offset": sum(stats["target_offset"] * duration for stats, duration in measurements) / total
+        }
+
+    @staticmethod
+    def loudnorm_filter(stats: dict = None) -> str:
+        """loudnorm filter string: linear second pass when stats are known, single-pass otherwise."""
+        if not stats:
+            return f"loudnorm=I={TARGET_I}:TP={TARGET_TP}:LRA={TARGET_LRA}"
+
+        def clamp(value, low, high):
+            return min(max(value if math.isfinite(value) else low, low), high)
+
+        return (
+            f"loudnorm=I={TARGET_I}:TP={TARGET_TP}:LRA={TARGET_LRA}"
+            f":measured_I={clamp(stats['input_i'], -99.0, 0.0):.2f}"
+            f":measured_TP={clamp(stats['input_tp'], -99.0, 99.0):.2f}"
+            f":measured_LRA={clamp(stats['input_lra'], 0.0, 99.0):.2f}"
+            f":measured_thresh={clamp(stats['input_thresh'], -99.0, 0.0):.2f}"
+            f":offset={clamp(stats['target_offset'], -99.0, 99.0):.2f}"
+            f":linear=true"
+        )
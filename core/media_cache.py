@@ -0,0 +1,214 @@
+import os
+import glob
+import time
+import fcntl
+import threading
+import concurrent.futures
+from .utils import get_logger, ensure_directory, locked_json_file, process_alive
+
+logger = get_logger(__name__)
+
+class MediaCache:
+    """
+    Local copies of render sources, keyed by video_id.
+
+    The index remembers each clip's real file (and so its extension), so a render
+    never has to guess at paths. Clips uploaded through this instance are registered
+    in place and never evicted; clips downloaded from storage live in the cache
+    directory and are evicted least recently used first once they exceed max_bytes,
+    except those pinned by a render in progress (get_path with pin=, until release(pin)).
+
+    Concurrent requests for the same missing clip share one download, both between
+    threads (in-flight futures) and between worker processes (per-clip file lock).
+    """
+
+    INDEX_FILE = "index.json"
+    BUCKET = "videos"
+
+    def __init__(self, cache_dir: str, uploads_dir: str = None, storage=None, storage_path_resolver=None, max_bytes: int = None):
+        """
+        Args:
+            cache_dir: Where downloaded clips and the index live.
+            uploads_dir: Directory of locally uploaded clips (<video_id>.<ext>), checked before downloading.
+            storage: Storage backend used for downloads (created lazily from STORAGE_BACKEND if omitted).
+            storage_path_resolver: Callable video_id -> storage path (e.g. from the videos table).
+                Without it, clips are assumed to be at uploads/<video_id>.mp4.
+        """
+        self.cache_dir = cache_dir
+        self.uploads_dir = uploads_dir
+        self.storage = storage
+        self.storage_path_resolver = storage_path_resolver
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.environ.get("MEDIA_CACHE_MAX_BYTES", 10 * 1024 ** 3))
+        self.hits = 0
+        self.misses = 0
+        self.downloaded_bytes = 0
+        self._lock = threading.Lock()  # In-flight fetch table
+        self._index_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._inflight = {}
+        ensure_directory(cache_dir)
+
+    def register(self, video_id: str, path: str):
+        """Record a clip that already exists locally (e.g. a fresh upload). Registered clips are never evicted."""
+        with self._locked_index() as index:
+            index["media"][video_id] = {
+                "path": os.path.abspath(path),
+                "size": os.path.getsize(path),
+                "external": True,
+                "last_access": time.time()
+            }
+
+    def get_path(self, video_id: str, pin: str = None) -> str:
+        """
+        Local path of a clip, downloading it on a miss. Returns None if it cannot be found anywhere.
+        pin keeps the clip from being evicted until release(pin).
+        """
+        path = self._lookup(video_id, pin)
+        if path:
+            self._count(hit=True)
+            logger.info(f"Media cache hit for {video_id}")
+            return path
+
+        # Share one fetch between every thread asking for the same clip
+        with self._lock:
+            future = self._inflight.get(video_id)
+            owner = future is None
+            if owner:
+                future = concurrent.futures.Future()
+                self._inflight[video_id] = future
+        if not owner:
+            path = future.result()
+            if path and pin:
+                self._lookup(video_id, pin)
+            return path
+
+        try:
+            path = self._fetch(video_id, pin)
+            future.set_result(path)
+            return path
+        except Exception as e:
+            logger.error(f"Failed to fetch {video_id} into media cache: {e}")
+            future.set_result(None)
+            return None
+        finally:
+            with self._lock:
+                self._inflight.pop(video_id, None)
+
+    def release(self, pin: str):
+        """Unpin every clip a render pinned, then evict down to the disk budget."""
+        with self._locked_index() as index:
+            for entry in index["media"].values():
+                entry.get("pins", {}).pop(pin, None)
+            self._evict(index)
+
+    def stats(self) -> dict:
+        with self._locked_index() as index:
+            cached = [entry["size"] for entry in index["media"].values() if not entry.get("external")]
+        with self._counter_lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(cached),
+                "bytes": sum(cached),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "downloaded_bytes": self.downloaded_bytes
+            }
+
+    def _lookup(self, video_id: str, pin: str = None) -> str:
+        """Indexed path if the file is still there (marking it used, and pinned with pin), else None."""
+        with self._locked_index() as index:
+            entry = index["media"].get(video_id)
+            if entry:
+                if os.path.exists(entry["path"]):
+                    entry["last_access"] = time.time()
+                    if pin and not entry.get("external"):
+                        entry.setdefault("pins", {})[pin] = os.getpid()
+                    return entry["path"]
+                del index["media"][video_id]
+        return None
+
+    def _fetch(self, video_id: str, pin: str = None) -> str:
+        # Another worker process may be downloading the same clip; wait for it, then re-check
+        with open(os.path.join(self.cache_dir, f".{video_id}.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                path = self._lookup(video_id, pin)
+                if path:
+                    self._count(hit=True)
+                    return path
+                self._count(hit=False)
+
+                # Uploads written before the index existed
+                if self.uploads_dir:
+                    matches = sorted(glob.glob(os.path.join(self.uploads_dir, f"{video_id}.*")))
+                    if matches:
+                        logger.info(f"Media cache miss for {video_id}, indexing local upload {matches[0]}")
+                        self.register(video_id, matches[0])
+                        return os.path.abspath(matches[0])
+
+                return self._download(video_id, pin)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _download(self, video_id: str, pin: str = None) -> str:
+        storage_path = self.storage_path_resolver(video_id) if self.storage_path_resolver else None
+        storage_path = storage_path or f"uploads/{video_id}.mp4"
+        ext = os.path.splitext(storage_path)[1] or ".mp4"
+        logger.info(f"Media cache miss for {video_id}, downloading {self.BUCKET}/{storage_path}")
+
+        if self.storage is None:
+            from .storage_backends import create_storage
+            self.storage = create_storage()
+
+        path = os.path.join(self.cache_dir, f"{video_id}{ext}")
+        # Storage writes through <path>.part and renames on success, so a download cut off
+        # here resumes on the next fetch (the per-clip lock keeps other processes out)
+        if not self.storage.download_file(self.BUCKET, storage_path, path):
+            return None
+
+        size = os.path.getsize(path)
+        with self._counter_lock:
+            self.downloaded_bytes += size
+        with self._locked_index() as index:
+            index["media"][video_id] = {"path": path, "size": size, "external": False, "last_access": time.time(),
+                                        "pins": {pin: os.getpid()} if pin else {}}
+            self._evict(index)
+        return path
+
+    def _evict(self, index: dict):
+        """Drop least recently used downloads until the cache fits max_bytes, skipping pinned ones."""
+        cached = {key: entry for key, entry in index["media"].items() if not entry.get("external")}
+        total = sum(entry["size"] for entry in cached.values())
+        if total <= self.max_bytes:
+            return
+
+        for key, entry in sorted(cached.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if self._pinned(entry):
+                continue
+            try:
+                os.remove(entry["path"])
+            except FileNotFoundError:
+                pass
+            total -= entry["size"]
+            del index["media"][key]
+            logger.info(f"Evicted {key} ({entry['size']} bytes) from media cache")
+
+    @staticmethod
+    def _pinned(entry: dict) -> bool:
+        """Whether a live render still pins the clip; pins left by dead processes are dropped."""
+        entry["pins"] = {pin: pid for pin, pid in entry.get("pins", {}).items() if process_alive(pid)}
+        return bool(entry["pins"])
+
+    def _count(self, hit: bool):
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _locked_index(self):
+        return locked_json_file(os.path.join(self.cache_dir, self.INDEX_FILE), {"media": {}}, self._index_lock)
@@ -0,0 +1,63 @@
+"""
+Named render profiles.
+
+Each profile sets the output resolution, encoder preset, CRF, frame rate, thread
+budget and the post-scale video filters for one kind of render:
+
+    draft   - internal review renders, cheapest possible (360p, no sharpening)
+    preview - free tier output (PRD 12. Free Tier - 720p)
+    final   - paid output (PRD-MONETIZATION - 1080p), never upscaled past the sources
+
+Presets and CRFs come from scripts/benchmark_profiles.py on the synthetic fixtures.
+"""
+RENDER_PROFILES = {
+    "draft": {
+        "height": 360,
+        "fps": 24,
+        # At 360p decoding the source dominates, so veryfast costs no more than ultrafast at a third of the size
+        "preset": "veryfast",
+        "crf": 28,
+        "threads": 2,
+        "vf_filters": None
+    },
+    "preview": {
+        "height": 720,
+        "fps": 24,
+        "preset": "veryfast",
+        "crf": 23,
+        "threads": 4,
+        "vf_filters": "unsharp=3:3:1.5"
+    },
+    "final": {
+        "height": 1080,
+        # Sources below 1080p are rendered at their own height, but never below the free tier
+        "min_height": 720,
+        "fps": 24,
+        "preset": "veryfast",
+        "crf": 20,
+        "threads": 4,
+        "vf_filters": "unsharp=3:3:1.5"
+    }
+}
+
+def get_render_profile(name: str) -> dict:
+    """Return a copy of the named profile (callers may adjust it per render)."""
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile: {name}")
+    return dict(RENDER_PROFILES[name], name=name)
+
+def profile_for_job(is_draft: bool = False, is_paid: bool = False) -> str:
+    """Drafts always use the draft profile; otherwise the tier decides."""
+    if is_draft:
+        return "draft"
+    return "final" if is_paid else "preview"
+
+def output_height(profile: dict, segments: list) -> int:
+    """Target height for a render: the profile height, capped at the tallest source when the profile sets min_height."""
+    height = profile["height"]
+    if "min_height" in profile:
+        source_height = max((seg.get("height") or 0 for seg in segments), default=0)
+        if source_height:
+            height = max(profile["min_height"], min(height, source_height))
+    # yuv420p needs even dimensions
+    return height - height % 2
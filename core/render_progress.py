@@ -0,0 +1,134 @@
+import os
+import time
+import threading
+from .utils import get_logger
+
+logger = get_logger(__name__)
+
+# Minimum seconds between progress reports (each report is a database write)
+PROGRESS_INTERVAL = float(os.environ.get("RENDER_PROGRESS_INTERVAL", "2.0"))
+
+class RenderProgress:
+    """
+    Aggregates encoder progress for one render into frames encoded, encode fps and ETA.
+
+    A render can run several ffmpeg processes at once (cached segments, chunks), so each
+    one reports its own output time under a task id and the totals are summed here.
+    Reports go to the callback at most once per min_interval, plus once on every phase
+    change and at the end.
+    """
+
+    def __init__(self, total_seconds: float, fps: float, callback=None, min_interval: float = PROGRESS_INTERVAL):
+        self.total_seconds = max(float(total_seconds), 0.0)
+        self.fps = fps
+        self.callback = callback
+        self.min_interval = min_interval
+        self.phase = "encoding"
+        self._tasks = {}
+        self._reused_seconds = 0.0
+        self._started = time.monotonic()
+        self._last_report = None
+        self._lock = threading.Lock()
+
+    def task(self, task_id, length: float):
+        """Register an encode of `length` output seconds. Returns the on_progress hook for ffmpeg."""
+        with self._lock:
+            self._tasks[task_id] = [0.0, float(length)]
+
+        def on_progress(out_seconds: float):
+            self.update(task_id, out_seconds)
+        return on_progress
+
+    def drop(self, task_id, reused: bool = False):
+        """Take a registered task out of the encode (a cache hit if reused, else a skipped segment)."""
+        with self._lock:
+            task = self._tasks.pop(task_id, None)
+            if task and reused:
+                self._reused_seconds += task[1]
+
+    def update(self, task_id, out_seconds: float):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return
+            task[0] = min(max(float(out_seconds), 0.0), task[1])
+        self._report()
+
+    def set_phase(self, phase: str):
+        with self._lock:
+            self.phase = phase
+        self._report(force=True)
+
+    def finish(self, render_stats: dict = None):
+        """Final report, with the render's wall time and real-time factor for capacity planning."""
+        with self._lock:
+            self.phase = "done"
+            for task in self._tasks.values():
+                task[0] = task[1]
+        extra = {}
+        if render_stats:
+            extra = {
+                "wall_time": render_stats.get("wall_time"),
+                "realtime_factor": render_stats.get("realtime_factor"),
+                "backend": render_stats.get("backend")
+            }
+        self._report(force=True, extra=extra)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            encoded = sum(done for done, _ in self._tasks.values())
+            pending = sum(length - done for done, length in self._tasks.values())
+            phase = self.phase
+            reused = self._reused_seconds
+
+        elapsed = time.monotonic() - self._started
+        total_frames = int(round(self.total_seconds * self.fps))
+        frames_encoded = min(int(round((encoded + reused) * self.fps)), total_frames)
+        # Throughput only counts frames this render actually encoded
+        encode_fps = encoded * self.fps / elapsed if elapsed > 0 else 0.0
+        if phase == "done":
+            eta = 0.0
+        elif encode_fps > 0:
+            eta = pending * self.fps / encode_fps
+        else:
+            eta = None
+
+        return {
+            "phase": phase,
+            "frames_encoded": frames_encoded,
+            "total_frames": total_frames,
+            "percent": round(100.0 * frames_encoded / total_frames, 1) if total_frames else 0.0,
+            "encode_fps": round(encode_fps, 2),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "elapsed_seconds": round(elapsed, 1)
+        }
+
+    def _report(self, force: bool = False, extra: dict = None):
+        if not self.callback:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._last_report is not None and now - self._last_report < self.min_interval:
+                return
+            self._last_report = now
+
+        snapshot = self.snapshot()
+        if extra:
+            snapshot.update(extra)
+        try:
+            self.callback(snapshot)
+        except Exception as e:
+            # Progress is best effort and must never fail the render
+            logger.warning(f"Render progress callback failed: {e}")
+
+def moviepy_logger(progress: RenderProgress, task_id="moviepy"):
+    """proglog logger that forwards MoviePy's frame counter into a RenderProgress."""
+    from proglog import ProgressBarLogger
+
+    class _ProgressLogger(ProgressBarLogger):
+        def bars_callback(self, bar, attr, value, old_value=None):
+            # write_videofile iterates frames on the 't' bar
+            if bar == "t" and attr == "index":
+                progress.update(task_id, value / progress.fps)
+
+    return _ProgressLogger()
@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from .utils import get_logger, ensure_directory, locked_json_file, process_alive
+
+logger = get_logger(__name__)
+
+class SegmentCache:
+    """
+    Disk cache of encoded render segments.
+
+    A segment is one EDL entry (or preview piece) encoded on its own. Its key covers
+    the source content, in/out points, filters and encoder profile, so a re-render
+    only re-encodes the entries that actually changed. Entries are evicted least
+    recently used first once the cache grows past max_bytes, except those pinned by
+    a render in progress (get/put with pin=, until release(pin)).
+
+    The index lives next to the segments and is guarded by a file lock, so several
+    worker processes can share one cache directory.
+
+    Segments encoded ahead of a render (VideoRenderer.prerender) are marked speculative.
+    The first render that reuses one counts it as used; one evicted without ever being
+    used counts as wasted. speculation_stats() reports both.
+    """
+
+    INDEX_FILE = "index.json"
+    # Hash this much from the head, middle and tail of a source instead of the whole file
+    HASH_SAMPLE_BYTES = 1024 * 1024
+
+    def __init__(self, cache_dir: str, max_bytes: int = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.environ.get("SEGMENT_CACHE_MAX_BYTES", 5 * 1024 ** 3))
+        self._source_hashes = {}
+        self._lock = threading.Lock()
+        ensure_directory(cache_dir)
+
+    def source_hash(self, path: str) -> str:
+        """Content fingerprint of a source file: size plus sampled head/middle/tail bytes."""
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if memo_key in self._source_hashes:
+            return self._source_hashes[memo_key]
+
+        digest = hashlib.sha256(str(stat.st_size).encode())
+        with open(path, "rb") as f:
+            for offset in (0, stat.st_size // 2, max(stat.st_size - self.HASH_SAMPLE_BYTES, 0)):
+                f.seek(offset)
+                digest.update(f.read(self.HASH_SAMPLE_BYTES))
+
+        self._source_hashes[memo_key] = digest.hexdigest()
+        return self._source_hashes[memo_key]
+
+    @staticmethod
+    def segment_key(source_hash: str, start: float, end: float, profile: dict) -> str:
+        """Stable key for an encoded segment. Times are rounded to the millisecond."""
+        material = json.dumps({
+            "source": source_hash,
+            "start": round(start, 3),
+            "end": round(end, 3),
+            "profile": profile
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, key: str, speculative: bool = False, pin: str = None):
+        """
+        Return the cached segment path (and mark it used), or None on a miss.
+        speculative=True for lookups from another speculative encode, which don't count as use.
+        pin keeps the segment from being evicted until release(pin).
+        """
+        with self._locked_index() as index:
+            entry = index["segments"].get(key)
+            if not entry:
+                return None
+            path = os.path.join(self.cache_dir, entry["file"])
+            if not os.path.exists(path):
+                del index["segments"][key]
+                return None
+            entry["last_access"] = time.time()
+            if pin:
+                entry.setdefault("pins", {})[pin] = os.getpid()
+            if entry.get("speculative") and not entry.get("used") and not speculative:
+                entry["used"] = True
+                self._count(index, "used", entry)
+            return path
+
+    def entry_size(self, key: str) -> int:
+        with self._locked_index() as index:
+            entry = index["segments"].get(key)
+            return entry["size"] if entry else 0
+
+    def temp_path(self, key: str, ext: str = ".mkv") -> str:
+        """Scratch path inside the cache dir, so put() can move it in with an atomic rename."""
+        return os.path.join(self.cache_dir, f".{key}.{os.getpid()}.{threading.get_ident()}.tmp{ext}")
+
+    def put(self, key: str, temp_path: str, ext: str = ".mkv", speculative: bool = False,
+            seconds: float = 0.0, encode_time: float = 0.0, pin: str = None) -> str:
+        """
+        Move an encoded segment into the cache, then evict down to the disk budget.
+        speculative=True for an encode no render has asked for yet; seconds (footage) and
+        encode_time (wall clock) are recorded with it to measure wasted speculation.
+        pin keeps the segment from being evicted until release(pin).
+        """
+        filename = f"{key}{ext}"
+        path = os.path.join(self.cache_dir, filename)
+        os.replace(temp_path, path)
+        with self._locked_index() as index:
+            now = time.time()
+            entry = {
+                "file": filename,
+                "size": os.path.getsize(path),
+                "created": now,
+                "last_access": now,
+                # Renders already using the same key keep their pins
+                "pins": dict(index["segments"].get(key, {}).get("pins", {}))
+            }
+            if pin:
+                entry["pins"][pin] = os.getpid()
+            # A render may have encoded the same segment meanwhile; that one is not speculative
+            if speculative and key not in index["segments"]:
+                entry.update(speculative=True, used=False, seconds=seconds, encode_time=encode_time)
+                self._count(index, "encoded", entry)
+            index["segments"][key] = entry
+            self._evict(index)
+        return path
+
+    def release(self, pin: str):
+        """Unpin everything a render pinned, then evict down to the disk budget."""
+        with self._locked_index() as index:
+            for entry in index["segments"].values():
+                entry.get("pins", {}).pop(pin, None)
+            self._evict(index)
+
+    def stats(self) -> dict:
+        with self._locked_index() as index:
+            sizes = [entry["size"] for entry in index["segments"].values()]
+        return {"entries": len(sizes), "bytes": sum(sizes), "max_bytes": self.max_bytes}
+
+    def speculation_stats(self) -> dict:
+        """
+        Speculative encodes so far: encoded, used by a render, wasted (evicted unused) and
+        still pending use in the cache, each as count, footage seconds, bytes and encode time.
+        """
+        with self._locked_index() as index:
+            stats = {name: dict(counter) for name, counter in self._counters(index).items()}
+            pending = [entry for entry in index["segments"].values() if entry.get("speculative") and not entry.get("used")]
+        stats["pending"] = {
+            "count": len(pending),
+            "seconds": sum(entry["seconds"] for entry in pending),
+            "bytes": sum(entry["size"] for entry in pending),
+            "encode_time": sum(entry["encode_time"] for entry in pending)
+        }
+        encoded = stats["encoded"]["encode_time"]
+        stats["wasted_ratio"] = stats["wasted"]["encode_time"] / encoded if encoded else None
+        return stats
+
+    @staticmethod
+    def _counters(index: dict) -> dict:
+        return index.setdefault("speculation", {
+            name: {"count": 0, "seconds": 0.0, "bytes": 0, "encode_time": 0.0} for name in ("encoded", "used", "wasted")
+        })
+
+    def _count(self, index: dict, name: str, entry: dict):
+        counter = self._counters(index)[name]
+        counter["count"] += 1
+        counter["seconds"] += entry["seconds"]
+        counter["bytes"] += entry["size"]
+        counter["encode_time"] += entry["encode_time"]
+
+    def _evict(self, index: dict):
+        """Drop least recently used segments until the cache fits max_bytes, skipping pinned ones."""
+        total = sum(entry["size"] for entry in index["segments"].values())
+        if total <= self.max_bytes:
+            return
+
+        for key, entry in sorted(index["segments"].items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if self._pinned(entry):
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, entry["file"]))
+            except FileNotFoundError:
+                pass
+            total -= entry["size"]
+            del index["segments"][key]
+            if entry.get("speculative") and not entry.get("used"):
+                self._count(index, "wasted", entry)
+            logger.info(f"Evicted segment {key[:12]} ({entry['size']} bytes) from render cache")
+
+    @staticmethod
+    def _pinned(entry: dict) -> bool:
+        """Whether a live render still pins the entry; pins left by dead processes are dropped."""
+        entry["pins"] = {pin: pid for pin, pid in entry.get("pins", {}).items() if process_alive(pid)}
+        return bool(entry["pins"])
+
+    def _locked_index(self):
+        """Load the index under an exclusive lock and write it back atomically on exit."""
+        return locked_json_file(os.path.join(self.cache_dir, self.INDEX_FILE), {"segments": {}}, self._lock)
@@ -1,10 +1,15 @@
 import os
-from supabase import create_client, Client
+import mimetypes
+from urllib.parse import quote
+from .clients import get_supabase_client, get_s3_client
 from .utils import get_logger
+from .transfer import download_to_file, upload_multipart, UPLOAD_CHUNK_SIZE
+from .storage_backends import StorageBackend
 
 logger = get_logger(__name__)
 
-class Storage:
+class Storage(StorageBackend):
+    """Supabase Storage backend (see core/storage_backends.py for the others)."""
     def __init__(self):
         self.url = os.environ.get("SUPABASE_URL")
         self.key = os.environ.get("SUPABASE_KEY")
@@ -13,11 +18,24 @@ class Storage:
             logger.warning("SUPABASE_URL or SUPABASE_KEY not set. Storage operations will fail.")
             self.client = None
         else:
-            self.client: Client = create_client(self.url, self.key)
-            logger.info("Supabase storage client initialized")
+            # Shared with Database and every other Storage in this process
+            self.client = get_supabase_client(self.url, self.key)
+
+        # Supabase's S3-compatible endpoint, used for parallel multipart uploads when S3 access keys are set
+        self.s3_endpoint = os.environ.get("SUPABASE_S3_ENDPOINT") or (f"{self.url.rstrip('/')}/storage/v1/s3" if self.url else None)
+        self.s3_access_key = os.environ.get("SUPABASE_S3_ACCESS_KEY_ID")
+        self.s3_secret_key = os.environ.get("SUPABASE_S3_SECRET_ACCESS_KEY")
+        self.s3_region = os.environ.get("SUPABASE_S3_REGION", "us-east-1")
 
     def upload_file(self, bucket: str, storage_path: str, local_path: str):
+        """
+        Upload a local file. Files larger than one chunk go through the S3 endpoint as a
+        parallel multipart upload (UPLOAD_CONCURRENCY parts in flight, each retried on its
+        own) when S3 access keys are configured; everything else is a single request.
+        """
         if not self.client: return None
+        if self.s3_access_key and self.s3_secret_key and os.path.getsize(local_path) > UPLOAD_CHUNK_SIZE:
+            return self._upload_multipart(bucket, storage_path, local_path)
         try:
             with open(local_path, 'rb') as f:
                 self.client.storage.from_(bucket).upload(storage_path, f)
@@ -27,6 +45,17 @@ class Storage:
             logger.error(f"Failed to upload file: {e}")
             return None
 
+    def _upload_multipart(self, bucket: str, storage_path: str, local_path: str):
+        try:
+            client = get_s3_client(self.s3_endpoint, self.s3_access_key, self.s3_secret_key, self.s3_region)
+            size = upload_multipart(client, bucket, storage_path, local_path,
+                                    content_type=mimetypes.guess_type(local_path)[0])
+            logger.info(f"File uploaded to {bucket}/{storage_path} ({size} bytes, multipart)")
+            return storage_path
+        except Exception as e:
+            logger.error(f"Failed to upload file: {e}")
+            return None
+
     def get_public_url(self, bucket: str, storage_path: str):
         if not self.client: return None
         try:
@@ -36,12 +65,17 @@ class Storage:
             return None
 
     def download_file(self, bucket: str, storage_path: str, local_path: str):
+        """
+        Stream an object to local_path without holding it in memory (source clips can be
+        gigabytes on a 512MB instance). The file only appears once complete and verified;
+        an interrupted download resumes from <local_path>.part on the next call.
+        """
         if not self.client: return False
         try:
-            res = self.client.storage.from_(bucket).download(storage_path)
-            with open(local_path, 'wb') as f:
-                f.write(res)
-            logger.info(f"File downloaded from {bucket}/{storage_path} to {local_path}")
+            url = f"{self.url.rstrip('/')}/storage/v1/object/{quote(bucket)}/{quote(storage_path)}"
+            headers = {"Authorization": f"Bearer {self.key}", "apikey": self.key}
+            size = download_to_file(url, local_path, headers=headers)
+            logger.info(f"File downloaded from {bucket}/{storage_path} to {local_path} ({size} bytes)")
             return True
         except Exception as e:
             logger.error(f"Failed to download file: {e}")
@@ -0,0 +1,171 @@
+"""
+Storage backends.
+
+Everything that moves media in or out of persistent storage goes through one of
+these, chosen with STORAGE_BACKEND:
+
+    supabase - Supabase Storage (default, core/storage.py)
+    local    - a directory on this machine; development, tests and single-node deployments
+    s3       - any S3-compatible object store
+
+Backends share the Storage interface: upload_file returns the storage path (or None),
+download_file returns True on success, get_public_url returns a URL (or None).
+"""
+import os
+import shutil
+from abc import ABC, abstractmethod
+from urllib.parse import quote
+from .clients import get_s3_client
+from .utils import get_logger, ensure_directory
+from .transfer import upload_multipart, UPLOAD_CHUNK_SIZE, UPLOAD_CONCURRENCY
+
+logger = get_logger(__name__)
+
+class StorageBackend(ABC):
+    """Interface every storage backend implements."""
+
+    @abstractmethod
+    def upload_file(self, bucket: str, storage_path: str, local_path: str):
+        """Store local_path at bucket/storage_path. Returns storage_path, or None on failure."""
+
+    @abstractmethod
+    def download_file(self, bucket: str, storage_path: str, local_path: str) -> bool:
+        """Fetch bucket/storage_path to local_path. Returns True on success."""
+
+    @abstractmethod
+    def get_public_url(self, bucket: str, storage_path: str):
+        """URL the object can be fetched from directly, or None."""
+
+def link_or_copy(source: str, destination: str):
+    """
+    Place source at destination without copying bytes when both are on one filesystem
+    (a hardlink), falling back to a copy across filesystems. Either way the destination
+    appears atomically, so readers never see a partial file.
+    """
+    temp_path = f"{destination}.{os.getpid()}.tmp"
+    try:
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            # Different filesystem, or one without hardlinks
+            shutil.copyfile(source, temp_path)
+        os.replace(temp_path, destination)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Buckets as directories under root (LOCAL_STORAGE_ROOT). Uploads and downloads are
+    hardlinks where possible, so a single-node deployment never copies or sends media.
+    Objects share their bytes with the local files they came from and must not be
+    modified in place; everything in the pipeline writes new files instead.
+    """
+
+    def __init__(self, root: str = None, public_url: str = None):
+        self.root = os.path.abspath(root or os.environ.get("LOCAL_STORAGE_ROOT", "storage"))
+        # Base URL the root is served from, if any; without it callers fall back to local downloads
+        self.public_url = public_url or os.environ.get("LOCAL_STORAGE_PUBLIC_URL")
+        ensure_directory(self.root)
+        logger.info(f"Local storage backend at {self.root}")
+
+    def upload_file(self, bucket: str, storage_path: str, local_path: str):
+        try:
+            object_path = self._object_path(bucket, storage_path)
+            ensure_directory(os.path.dirname(object_path))
+            link_or_copy(local_path, object_path)
+            logger.info(f"File stored at {bucket}/{storage_path}")
+            return storage_path
+        except Exception as e:
+            logger.error(f"Failed to upload file: {e}")
+            return None
+
+    def download_file(self, bucket: str, storage_path: str, local_path: str) -> bool:
+        try:
+            object_path = self._object_path(bucket, storage_path)
+            if not os.path.exists(object_path):
+                logger.error(f"Failed to download file: {bucket}/{storage_path} not found")
+                return False
+            link_or_copy(object_path, local_path)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to download file: {e}")
+            return False
+
+    def get_public_url(self, bucket: str, storage_path: str):
+        if not self.public_url:
+            return None
+        return f"{self.public_url.rstrip('/')}/{quote(bucket)}/{quote(storage_path)}"
+
+    def _object_path(self, bucket: str, storage_path: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, bucket, storage_path))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Storage path escapes the storage root: {bucket}/{storage_path}")
+        return path
+
+class S3StorageBackend(StorageBackend):
+    """
+    Any S3-compatible object store (S3_ENDPOINT_URL; AWS itself when unset).
+    Uploads and downloads are chunked and parallel (UPLOAD_CHUNK_SIZE, UPLOAD_CONCURRENCY).
+    """
+
+    # Presigned URL lifetime when no public base URL is configured (SigV4 maximum is 7 days)
+    URL_EXPIRES_SECONDS = 7 * 24 * 3600
+
+    def __init__(self, endpoint_url: str = None, access_key: str = None, secret_key: str = None,
+                 region: str = None, public_url: str = None):
+        self.endpoint_url = endpoint_url or os.environ.get("S3_ENDPOINT_URL")
+        self.access_key = access_key or os.environ.get("S3_ACCESS_KEY_ID")
+        self.secret_key = secret_key or os.environ.get("S3_SECRET_ACCESS_KEY")
+        self.region = region or os.environ.get("S3_REGION", "us-east-1")
+        self.public_url = public_url or os.environ.get("S3_PUBLIC_URL")
+
+    @property
+    def client(self):
+        return get_s3_client(self.endpoint_url, self.access_key, self.secret_key, self.region)
+
+    def upload_file(self, bucket: str, storage_path: str, local_path: str):
+        try:
+            size = upload_multipart(self.client, bucket, storage_path, local_path)
+            logger.info(f"File uploaded to {bucket}/{storage_path} ({size} bytes)")
+            return storage_path
+        except Exception as e:
+            logger.error(f"Failed to upload file: {e}")
+            return None
+
+    def download_file(self, bucket: str, storage_path: str, local_path: str) -> bool:
+        try:
+            from boto3.s3.transfer import TransferConfig
+            config = TransferConfig(multipart_threshold=UPLOAD_CHUNK_SIZE, multipart_chunksize=UPLOAD_CHUNK_SIZE,
+                                    max_concurrency=UPLOAD_CONCURRENCY)
+            # Ranged GETs streamed to a temporary file that is renamed into place when complete
+            self.client.download_file(bucket, storage_path, local_path, Config=config)
+            logger.info(f"File downloaded from {bucket}/{storage_path} to {local_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to download file: {e}")
+            return False
+
+    def get_public_url(self, bucket: str, storage_path: str):
+        try:
+            if self.public_url:
+                return f"{self.public_url.rstrip('/')}/{quote(bucket)}/{quote(storage_path)}"
+            return self.client.generate_presigned_url(
+                "get_object", Params={"Bucket": bucket, "Key": storage_path}, ExpiresIn=self.URL_EXPIRES_SECONDS
+            )
+        except Exception as e:
+            logger.error(f"Failed to get public URL: {e}")
+            return None
+
+def create_storage(backend: str = None) -> StorageBackend:
+    """Storage backend named by `backend` or STORAGE_BACKEND (default: supabase)."""
+    backend = (backend or os.environ.get("STORAGE_BACKEND", "supabase")).lower()
+    if backend == "local":
+        return LocalStorageBackend()
+    if backend == "s3":
+        return S3StorageBackend()
+    if backend == "supabase":
+        # Imported here so the other backends work without the supabase package
+        from .storage import Storage
+        return Storage()
+    raise ValueError(f"Unknown storage backend: {backend}")
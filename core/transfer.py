@@ -0,0 +1,158 @@
+"""
+File transfer infrastructure: resumable HTTP downloads, S3 clients and multipart uploads.
+
+Storage (core/storage.py) and the storage backends use these for the actual bytes;
+the shared client instances live in core/clients.py.
+"""
+import os
+import re
+import time
+import random
+import hashlib
+import http.client
+import urllib.error
+import urllib.request
+from .utils import get_logger
+
+logger = get_logger(__name__)
+
+# Read size for streaming downloads; peak memory per download is about one chunk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Longest wait between download retries
+RETRY_MAX_DELAY = 30.0
+
+def _retry_backoff(retry_delay: float, attempt: int) -> float:
+    """Delay before retry number `attempt` (1-based): retry_delay doubled per attempt, capped, with jitter."""
+    delay = min(retry_delay * 2 ** (attempt - 1), RETRY_MAX_DELAY)
+    return delay * random.uniform(0.5, 1.0)
+
+def download_to_file(url: str, local_path: str, headers: dict = None, chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+                     retries: int = 3, retry_delay: float = 1.0, expected_md5: str = None, timeout: float = 60.0) -> int:
+    """
+    Stream an HTTP object to disk in fixed-size chunks, so memory stays flat however large it is.
+
+    Bytes go to <local_path>.part, which is renamed into place only once complete. An
+    interrupted transfer resumes from the part file with a Range request, on this call's
+    retries or on a later call. The result is checked against the server's length and
+    against expected_md5 (or a plain MD5 ETag). Returns the size; raises IOError on failure.
+
+    Server errors (5xx) and dropped connections are retried with exponential backoff
+    (retry_delay, doubling up to RETRY_MAX_DELAY), so an overloaded storage backend is
+    not hammered by every download at once.
+    """
+    part_path = f"{local_path}.part"
+    attempt = 0
+    while True:
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        request = urllib.request.Request(url, headers=dict(headers or {}))
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+        total = None
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                if response.status == 206:
+                    match = re.match(r"bytes (\d+)-\d+/(\d+)", response.headers.get("Content-Range", ""))
+                    if not match or int(match.group(1)) != offset:
+                        raise IOError(f"Unexpected Content-Range: {response.headers.get('Content-Range')}")
+                    total = int(match.group(2))
+                else:
+                    # Full response (first attempt, or the server ignored the range): start over
+                    offset = 0
+                    length = response.headers.get("Content-Length")
+                    total = int(length) if length else None
+                etag = (response.headers.get("ETag") or "").strip('"')
+                with open(part_path, "ab" if offset else "wb") as f:
+                    while True:
+                        chunk = response.read(chunk_size)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:
+                # The part file doesn't fit the object (changed or already complete): refetch it whole
+                os.remove(part_path)
+            elif e.code < 500:
+                raise IOError(f"Download failed with HTTP {e.code}: {url}")
+            attempt += 1
+            if attempt > retries:
+                raise IOError(f"Download failed with HTTP {e.code} after {retries} retries: {url}")
+            if e.code != 416:
+                delay = _retry_backoff(retry_delay, attempt)
+                logger.warning(f"Download failed with HTTP {e.code}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+            continue
+        except (OSError, http.client.HTTPException) as e:
+            attempt += 1
+            if attempt > retries:
+                raise IOError(f"Download interrupted after {retries} retries: {e}")
+            logger.warning(f"Download interrupted ({e}), resuming at byte {os.path.getsize(part_path) if os.path.exists(part_path) else 0}")
+            time.sleep(_retry_backoff(retry_delay, attempt))
+            continue
+
+        size = os.path.getsize(part_path)
+        if total is not None and size < total:
+            # Connection closed early without an error; resume from what arrived
+            attempt += 1
+            if attempt > retries:
+                raise IOError(f"Download incomplete after {retries} retries: {size} of {total} bytes")
+            time.sleep(_retry_backoff(retry_delay, attempt))
+            continue
+        break
+
+    try:
+        if total is not None and size != total:
+            raise IOError(f"Downloaded {size} bytes, expected {total}")
+        # Multipart ETags ("<md5>-<parts>") are not a checksum of the content
+        checksum = expected_md5 or (etag if re.fullmatch(r"[0-9a-f]{32}", etag) else None)
+        if checksum:
+            md5 = hashlib.md5()
+            with open(part_path, "rb") as f:
+                for chunk in iter(lambda: f.read(chunk_size), b""):
+                    md5.update(chunk)
+            if md5.hexdigest() != checksum.lower():
+                raise IOError(f"Checksum mismatch: got {md5.hexdigest()}, expected {checksum}")
+    except IOError:
+        # A corrupt part file must not be resumed
+        os.remove(part_path)
+        raise
+
+    os.replace(part_path, local_path)
+    return size
+
+# Multipart uploads: part size (S3 minimum is 5MiB) and parts in flight at once
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024))
+UPLOAD_CONCURRENCY = int(os.environ.get("UPLOAD_CONCURRENCY", "4"))
+
+def s3_client(endpoint_url: str, access_key: str, secret_key: str, region: str = "us-east-1", max_attempts: int = 5):
+    """
+    boto3 client for an S3-compatible endpoint (e.g. Supabase Storage's /storage/v1/s3).
+    Every request, so every multipart part, is retried on its own up to max_attempts times.
+    """
+    import boto3
+    from botocore.config import Config
+    config = Config(
+        signature_version="s3v4",
+        s3={"addressing_style": "path"},
+        retries={"max_attempts": max_attempts, "mode": "standard"},
+        max_pool_connections=max(10, UPLOAD_CONCURRENCY),
+        # S3-compatible services don't all accept the newer default checksum trailers
+        request_checksum_calculation="when_required",
+        response_checksum_validation="when_required"
+    )
+    return boto3.client("s3", endpoint_url=endpoint_url, aws_access_key_id=access_key,
+                        aws_secret_access_key=secret_key, region_name=region, config=config)
+
+def upload_multipart(client, bucket: str, key: str, local_path: str, chunk_size: int = UPLOAD_CHUNK_SIZE,
+                     concurrency: int = UPLOAD_CONCURRENCY, content_type: str = None) -> int:
+    """
+    Upload a file as an S3 multipart upload, chunk_size parts with up to concurrency in
+    flight. A failed part is retried by itself (see s3_client), so a network blip costs
+    one part rather than the whole file; a part that keeps failing aborts the upload.
+    Files smaller than one chunk go up in a single request. Returns the size.
+    """
+    from boto3.s3.transfer import TransferConfig
+    config = TransferConfig(multipart_threshold=chunk_size, multipart_chunksize=chunk_size,
+                            max_concurrency=concurrency, use_threads=concurrency > 1)
+    extra_args = {"ContentType": content_type} if content_type else None
+    client.upload_file(local_path, bucket, key, ExtraArgs=extra_args, Config=config)
+    return os.path.getsize(local_path)
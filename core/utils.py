@@ -2,6 +2,7 @@ import os
 import logging
 import uuid
 from pathlib import Path
+from contextlib import contextmanager, nullcontext
 
 # Configure logging
 logging.basicConfig(
@@ -20,6 +21,22 @@ logger = get_logger(__name__)
 def generate_unique_id() -> str:
     return str(uuid.uuid4())
 
+def payload_hash(payload) -> str:
+    """sha256 of a JSON payload in canonical form (sorted keys), so equal requests hash equal."""
+    import json
+    import hashlib
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def file_fingerprint(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """sha256 of a file's contents, read in chunks."""
+    import hashlib
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 def ensure_directory(path: str):
     Path(path).mkdir(parents=True, exist_ok=True)
 
@@ -64,3 +81,101 @@ def get_video_duration(video_path: str) -> float:
     duration = frame_count / fps if fps > 0 else 0.0
     video.release()
     return duration
+
+def ffmpeg_available() -> bool:
+    """Check that both ffmpeg and ffprobe are on PATH."""
+    import shutil
+    return shutil.which("ffmpeg") is not None and shutil.which("ffprobe") is not None
+
+def probe_media(video_path: str) -> dict:
+    """Probe a media file with ffprobe and return the stream info the renderer needs."""
+    import json
+    import subprocess
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration:stream=codec_type,codec_name,width,height,pix_fmt,r_frame_rate,sample_rate,channels",
+        "-of", "json", video_path
+    ]
+    output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    data = json.loads(output)
+
+    info = {
+        "duration": float(data.get("format", {}).get("duration") or 0.0),
+        "has_video": False,
+        "has_audio": False,
+        "width": None,
+        "height": None,
+        "fps": None,
+        "pix_fmt": None,
+        "video_codec": None,
+        "audio_codec": None,
+        "sample_rate": None,
+        "channels": None
+    }
+    for stream in data.get("streams", []):
+        if stream.get("codec_type") == "video" and not info["has_video"]:
+            info["has_video"] = True
+            info["video_codec"] = stream.get("codec_name")
+            info["width"] = stream.get("width")
+            info["height"] = stream.get("height")
+            info["pix_fmt"] = stream.get("pix_fmt")
+            num, _, den = (stream.get("r_frame_rate") or "0/1").partition("/")
+            info["fps"] = float(num) / float(den) if float(den or 0) > 0 else None
+        elif stream.get("codec_type") == "audio" and not info["has_audio"]:
+            info["has_audio"] = True
+            info["audio_codec"] = stream.get("codec_name")
+            info["sample_rate"] = int(stream.get("sample_rate") or 0) or None
+            info["channels"] = stream.get("channels")
+    return info
+
+def probe_keyframes(video_path: str) -> list:
+    """Return keyframe timestamps (seconds) of the first video stream, read from packet flags (no decoding)."""
+    import subprocess
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0", video_path
+    ]
+    output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    keyframes = []
+    for line in output.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            keyframes.append(float(pts_time))
+    return sorted(keyframes)
+
+@contextmanager
+def locked_json_file(path: str, default: dict, thread_lock=None):
+    """
+    Load a JSON index under an exclusive file lock (shared by every process using the
+    same directory) and write it back atomically on exit.
+    """
+    import json
+    import fcntl
+    with (thread_lock or nullcontext()), open(f"{os.path.splitext(path)[0]}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                data = default
+
+            yield data
+
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def process_alive(pid: int) -> bool:
+    """True while a process with this pid exists on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
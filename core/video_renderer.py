@@ -1,15 +1,99 @@
 import os
-from .utils import get_logger, ensure_directory
+import time
+import tempfile
+import concurrent.futures
+from .utils import get_logger, ensure_directory, ffmpeg_available, probe_media, probe_keyframes, generate_unique_id
+from .ffmpeg_renderer import FFmpegRenderer
+from .segment_cache import SegmentCache
+from .media_cache import MediaCache
+from .loudness_analyzer import LoudnessAnalyzer
+from .render_progress import RenderProgress, moviepy_logger
+from .render_profiles import get_render_profile, profile_for_job, output_height
 
 logger = get_logger(__name__)
 
+# PRD-MONETIZATION: Free drafts are compressed to 12 x 5s, paid renders capped at 5m
+PREVIEW_THRESHOLD = 60
+PREVIEW_SEGMENTS = 12
+PREVIEW_SEGMENT_DURATION = 5.0
+PAID_MAX_DURATION = 300
+
+# Drafts whose sources are at most this tall are assembled by stream copy instead of
+# being encoded with the draft profile (copying is cheaper than any encode)
+DRAFT_HEIGHT = 720
+STREAM_COPY_SNAP_TOLERANCE = 0.5
+
+# Parallel chunked encoding: long segments are split at keyframes into ~CHUNK_SECONDS
+# chunks and encoded by up to RENDER_CHUNK_WORKERS ffmpeg processes at once, sharing
+# the render's core budget between them
+CHUNK_SECONDS = 10.0
+CHUNK_KEYFRAME_SNAP = 1.0
+
+def map_timeline_windows(spans: list, windows: list) -> list:
+    """
+    Map timeline windows back onto the source spans that make up the timeline.
+
+    Args:
+        spans: Ordered (start, end) source ranges; the timeline is their concatenation.
+        windows: (start, end) ranges on the timeline.
+
+    Returns:
+        List of (span_index, source_start, source_end) pieces, in timeline order.
+        A window that straddles a cut yields one piece per span it touches.
+    """
+    pieces = []
+    for window_start, window_end in windows:
+        offset = 0.0
+        for index, (span_start, span_end) in enumerate(spans):
+            length = span_end - span_start
+            overlap_start = max(window_start, offset)
+            overlap_end = min(window_end, offset + length)
+            if overlap_end - overlap_start > 1e-6:
+                pieces.append((index, span_start + overlap_start - offset, span_start + overlap_end - offset))
+            offset += length
+            if offset >= window_end:
+                break
+    return pieces
+
 class VideoRenderer:
-    def __init__(self, output_dir: str = "outputs/renders", uploads_dir: str = "uploads"):
+    def __init__(self, output_dir: str = "outputs/renders", uploads_dir: str = "uploads", backend: str = None, cache_dir: str = None,
+                 media_cache: MediaCache = None):
         self.output_dir = output_dir
         self.uploads_dir = uploads_dir
+        # 'ffmpeg' compiles the EDL into one ffmpeg call, 'moviepy' is the legacy frame loop
+        self.backend = (backend or os.environ.get("RENDER_BACKEND", "ffmpeg")).lower()
+        self.ffmpeg_renderer = FFmpegRenderer()
+        self.draft_stream_copy = os.environ.get("DRAFT_STREAM_COPY", "true").lower() == "true"
+        self.chunk_workers = max(1, int(os.environ.get("RENDER_CHUNK_WORKERS", "1")))
+        # Cores this render may use: the job slot's grant (set per job by worker.py).
+        # None means the render profile's encoder threads.
+        self.core_budget = None
+        # Missing sources are downloaded this many at a time before/while encoding
+        self.prefetch_workers = max(1, int(os.environ.get("RENDER_PREFETCH_WORKERS", "4")))
+        self.last_render_stats = None
+        self._cache_stats = None
+        self._progress_callback = None
+        self._progress = None
+        # Cache pin of the render in progress: its sources and segments are not evicted until it ends
+        self._pin = None
+        self._render_profile = get_render_profile("preview")
         ensure_directory(output_dir)
 
-    def render_video(self, edl: list, output_filename: str = "final_render.mp4", bg_music_path: str = None, is_paid: bool = False) -> str:
+        # Segment cache: each EDL entry is encoded once and reused across re-renders
+        self.segment_cache = None
+        if os.environ.get("SEGMENT_CACHE", "true").lower() == "true":
+            cache_dir = cache_dir or os.environ.get("SEGMENT_CACHE_DIR") or \
+                os.path.join(os.path.dirname(os.path.abspath(output_dir)), "segment_cache")
+            self.segment_cache = SegmentCache(cache_dir)
+
+        # Render sources: video_id -> local file, downloading (and evicting) as needed
+        self.media_cache = media_cache or MediaCache(
+            os.environ.get("MEDIA_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(output_dir)), "media_cache"),
+            uploads_dir=uploads_dir
+        )
+
+    def render_video(self, edl: list, output_filename: str = "final_render.mp4", bg_music_path: str = None, is_paid: bool = False, is_draft: bool = False,
+                     progress_callback=None, profile: str = None) -> str:
         """
         Render video based on EDL.
         PRD 12. Free Tier vs Paid Tier rules.
@@ -18,49 +102,556 @@ class VideoRenderer:
             edl: List of clip dictionaries from EDLGenerator.
             output_filename: Name of the output file.
             is_paid: True if the user has a paid subscription, False otherwise.
+            is_draft: True for draft renders, which may take the stream-copy fast path.
+            progress_callback: Optional callable receiving throttled progress dicts
+                (frames_encoded, total_frames, encode_fps, eta_seconds, ...).
+            profile: Render profile name (draft/preview/final). Defaults to the one
+                matching is_draft/is_paid, see core/render_profiles.py.
             
         Returns:
             Path to the rendered video file.
         """
+        started = time.monotonic()
+        backend = self.backend
+        output_path = None
+        self._cache_stats = None
+        media_before = (self.media_cache.hits, self.media_cache.misses, self.media_cache.downloaded_bytes)
+        self._progress_callback = progress_callback
+        self._progress = None
+        self._render_profile = get_render_profile(profile or profile_for_job(is_draft, is_paid))
+        logger.info(f"Using '{self._render_profile['name']}' render profile")
+
+        if backend == "ffmpeg" and not ffmpeg_available():
+            logger.warning("ffmpeg/ffprobe not found on PATH. Falling back to MoviePy renderer.")
+            backend = "moviepy"
+
+        self._pin = generate_unique_id()
+        try:
+            if backend == "ffmpeg":
+                try:
+                    output_path = self._render_with_ffmpeg(edl, output_filename, bg_music_path, is_paid, is_draft)
+                except Exception as e:
+                    logger.error(f"ffmpeg render failed ({e}). Falling back to MoviePy renderer.")
+                    backend = "moviepy"
+                    started = time.monotonic()
+
+            if backend == "moviepy":
+                output_path = self._render_with_moviepy(edl, output_filename, bg_music_path, is_paid)
+        finally:
+            self._release_pin()
+
+        if output_path:
+            self._record_render_stats(backend, output_path, time.monotonic() - started)
+            hits, misses, downloaded = (after - before for after, before in zip(
+                (self.media_cache.hits, self.media_cache.misses, self.media_cache.downloaded_bytes), media_before))
+            self.last_render_stats["media"] = {"hits": hits, "misses": misses, "downloaded_bytes": downloaded}
+            if self._progress:
+                self._progress.finish(self.last_render_stats)
+        return output_path
+
+    def _start_progress(self, total_seconds: float):
+        """Begin progress tracking for the output about to be encoded (no-op without a callback)."""
+        fps = self._render_profile["fps"]
+        self._progress = RenderProgress(total_seconds, fps, self._progress_callback) if self._progress_callback else None
+        return self._progress
+
+    def _progress_hook(self, task_id, length: float):
+        return self._progress.task(task_id, length) if self._progress else None
+
+    def _record_render_stats(self, backend: str, output_path: str, wall_time: float):
+        """Log the real-time factor (wall time / output duration, lower is faster)."""
+        try:
+            duration = probe_media(output_path)["duration"] if ffmpeg_available() else 0.0
+        except Exception:
+            duration = 0.0
+        rtf = wall_time / duration if duration > 0 else None
+        self.last_render_stats = {
+            "backend": backend,
+            "wall_time": wall_time,
+            "output_duration": duration,
+            "realtime_factor": rtf,
+            "profile": self._render_profile["name"],
+            "cache": self._cache_stats
+        }
+        if rtf is not None:
+            logger.info(f"Render complete with {backend} backend: {duration:.1f}s of video in {wall_time:.1f}s (RTF {rtf:.2f})")
+
+    def _release_pin(self):
+        """Let the caches evict what the finished render (or prerender) pinned."""
+        pin, self._pin = self._pin, None
+        try:
+            if self.segment_cache:
+                self.segment_cache.release(pin)
+            self.media_cache.release(pin)
+        except Exception as e:
+            logger.warning(f"Could not release cache pin {pin}: {e}")
+
+    def _resolve_source(self, video_id: str, pin: str = None):
+        """Find the local source file for a clip, downloading it from Supabase if needed."""
+        path = self.media_cache.get_path(video_id, pin=pin or self._pin)
+        if not path:
+            logger.warning(f"Could not find or download source video for ID {video_id}")
+        return path
+
+    def _preview_windows(self, duration: float) -> list:
+        """Sample PREVIEW_SEGMENTS windows spaced evenly across the whole timeline."""
+        # We want to cover the whole video, so we space the start of each segment
+        # across (duration - segment_duration)
+        spacing = (duration - PREVIEW_SEGMENT_DURATION) / (PREVIEW_SEGMENTS - 1)
+        return [(i * spacing, i * spacing + PREVIEW_SEGMENT_DURATION) for i in range(PREVIEW_SEGMENTS)]
+
+    def _can_stream_copy(self, segments: list) -> bool:
+        """
+        Stream copy only works when every source can be concatenated as-is and
+        already fits the draft spec: H.264/yuv420p at or below draft height,
+        identical frame size and rate, and matching audio layout.
+        """
+        first = segments[0]
+        for seg in segments:
+            if seg["video_codec"] != "h264" or seg["pix_fmt"] != "yuv420p":
+                return False
+            if not seg["height"] or seg["height"] > DRAFT_HEIGHT:
+                return False
+            if (seg["width"], seg["height"], seg["fps"]) != (first["width"], first["height"], first["fps"]):
+                return False
+            if seg["has_audio"] != first["has_audio"]:
+                return False
+            if seg["has_audio"] and (seg["audio_codec"] != "aac" or
+                                     (seg["sample_rate"], seg["channels"]) != (first["sample_rate"], first["channels"])):
+                return False
+        return True
+
+    def _render_with_ffmpeg(self, edl: list, output_filename: str, bg_music_path: str = None, is_paid: bool = False, is_draft: bool = False) -> str:
+        """Render the EDL with a single ffmpeg filter graph (trim/concat/scale/loudnorm/music)."""
+        logger.info(f"Starting ffmpeg render with {len(edl)} clips")
+
+        if bg_music_path and not os.path.exists(bg_music_path):
+            bg_music_path = None
+
+        # Fetch every source up front, concurrently. When ingest recorded source info for
+        # every clip, the timeline is planned from it and each segment encode only waits
+        # for its own source, so encoding starts while later clips are still downloading.
+        sources = self._prefetch_sources(edl)
+        pipelined = (self.segment_cache is not None and self.chunk_workers == 1
+                     and not (is_draft and self.draft_stream_copy and not bg_music_path)
+                     and all(clip_data.get("source_info") for clip_data in edl))
+        segments = self._plan_segments(edl, sources, pipelined)
+
+        if not segments:
+            logger.error("No valid clips to render")
+            return None
+
+        segments, max_duration = self._tier_segments(segments, is_paid)
+
+        if bg_music_path:
+            bg_music_path = self._music_bed(bg_music_path)
+
+        output_path = os.path.join(self.output_dir, output_filename)
+        output_seconds = sum(seg["end"] - seg["start"] for seg in segments)
+        if max_duration:
+            output_seconds = min(output_seconds, max_duration)
+        self._start_progress(output_seconds)
+
+        # Draft fast path: without a music bed the cuts can be copied
+        if is_draft and self.draft_stream_copy and not bg_music_path and self._can_stream_copy(segments):
+            if max_duration:
+                segments = self._clamp_segments(segments, max_duration)
+            parts = self.ffmpeg_renderer.plan_stream_copy(segments, STREAM_COPY_SNAP_TOLERANCE)
+            if parts:
+                self.ffmpeg_renderer.render_stream_copy(parts, output_path, on_progress=self._progress_hook("copy", output_seconds))
+                return output_path
+
+        if self.segment_cache or self.chunk_workers > 1:
+            if max_duration:
+                segments = self._clamp_segments(segments, max_duration)
+            return self._render_segments(segments, output_path, bg_music_path)
+
+        render_profile = self._render_profile
+        self.ffmpeg_renderer.render(
+            segments,
+            output_path,
+            bg_music_path=bg_music_path,
+            vf_filters=render_profile["vf_filters"],
+            height=output_height(render_profile, segments),
+            fps=render_profile["fps"],
+            preset=render_profile["preset"],
+            crf=render_profile["crf"],
+            threads=render_profile["threads"],
+            max_duration=max_duration,
+            loudness=self._timeline_loudness(segments),
+            on_progress=self._progress_hook("render", output_seconds)
+        )
+        return output_path
+
+    def prerender(self, edl: list, is_paid: bool = False, is_draft: bool = True, profile: str = None) -> dict:
+        """
+        Speculatively encode the segments a render of this EDL would need into the
+        segment cache, without assembling them. A later render_video of the same EDL
+        (same tier and profile) then only joins cached segments.
+
+        Returns stats (segments, encoded, cached, seconds, wall_time), or None when
+        nothing is worth encoding ahead: no segment cache, no usable sources, or a
+        draft that will take the stream-copy path anyway.
+        """
+        if not self.segment_cache or not ffmpeg_available():
+            return None
+        started = time.monotonic()
+        self._progress = None
+        self._render_profile = get_render_profile(profile or profile_for_job(is_draft, is_paid))
+
+        self._pin = generate_unique_id()
+        try:
+            segments = self._plan_segments(edl, self._prefetch_sources(edl))
+            if not segments:
+                return None
+            segments, max_duration = self._tier_segments(segments, is_paid)
+            if is_draft and self.draft_stream_copy and self._can_stream_copy(segments):
+                logger.info("Draft can be stream-copied, nothing to encode ahead")
+                return None
+            if max_duration:
+                segments = self._clamp_segments(segments, max_duration)
+
+            profile, threads, workers, segments = self._segment_encoding(segments)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(self._cached_segment, seg, profile, threads, i, speculative=True)
+                           for i, seg in enumerate(segments)]
+                results = [future.result() for future in futures]
+        finally:
+            self._release_pin()
+
+        encoded = [seg for seg, _, saved in results if seg and saved is None]
+        stats = {
+            "segments": len(results),
+            "encoded": len(encoded),
+            "cached": len(results) - len(encoded),
+            "seconds": sum(seg["end"] - seg["start"] for seg in encoded),
+            "wall_time": time.monotonic() - started
+        }
+        logger.info(f"Speculative '{self._render_profile['name']}' encode: {stats['encoded']}/{stats['segments']} segments "
+                    f"({stats['seconds']:.1f}s of footage) in {stats['wall_time']:.1f}s")
+        return stats
+
+    def _tier_segments(self, segments: list, is_paid: bool) -> tuple:
+        """
+        PRD-MONETIZATION: Duration Caps & Preview Compression.
+        Returns (segments, max_duration): free renders are cut down to preview windows,
+        paid ones get the duration cap to apply (None when under it).
+        """
+        total_duration = sum(seg["end"] - seg["start"] for seg in segments)
+        max_duration = None
+
+        if not is_paid:
+            if total_duration > PREVIEW_THRESHOLD:
+                logger.info(f"Applying Preview Compression for draft (Original: {total_duration}s)")
+                # Cut the preview windows straight out of the sources, so the render
+                # only ever decodes ~60s of footage however long the timeline is
+                pieces = map_timeline_windows(
+                    [(seg["start"], seg["end"]) for seg in segments],
+                    self._preview_windows(total_duration)
+                )
+                segments = [dict(segments[index], start=start, end=end) for index, start, end in pieces]
+            else:
+                logger.info("Draft duration is under 60s, no compression needed.")
+        elif total_duration > PAID_MAX_DURATION:
+            logger.info(f"Trimming final video to 300s duration cap (Original: {total_duration}s)")
+            max_duration = PAID_MAX_DURATION
+        return segments, max_duration
+
+    def _prefetch_sources(self, edl: list) -> dict:
+        """Start resolving every distinct source on a bounded pool. Returns {video_id: Future of (path, probe info)}."""
+        video_ids = list(dict.fromkeys(clip_data.get("video_id") for clip_data in edl))
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(self.prefetch_workers, max(len(video_ids), 1)))
+        sources = {video_id: executor.submit(self._fetch_source, video_id, self._pin) for video_id in video_ids}
+        # Don't block here: the render consumes each future as it needs it
+        executor.shutdown(wait=False)
+        return sources
+
+    def _fetch_source(self, video_id: str, pin: str = None):
+        path = self._resolve_source(video_id, pin)
+        if path and pin and pin != self._pin:
+            # The render ended (e.g. failed) without waiting for this source
+            self.media_cache.release(pin)
+        return (path, probe_media(path)) if path else (None, None)
+
+    @staticmethod
+    def _source_result(source) -> tuple:
+        try:
+            return source.result()
+        except Exception as e:
+            logger.error(f"Failed to fetch render source: {e}")
+            return None, None
+
+    def _plan_segments(self, edl: list, sources: dict, pipelined: bool = False) -> list:
+        """
+        Turn EDL entries into segments. Pipelined segments are planned from the ingest
+        source_info and carry their pending 'source' instead of a path (see _await_source).
+        """
+        segments = []
+        for clip_data in edl:
+            source = sources[clip_data.get("video_id")]
+            if pipelined:
+                video_path, info = None, dict(clip_data["source_info"], has_video=True)
+            else:
+                video_path, info = self._source_result(source)
+                if not video_path:
+                    continue
+
+            start = clip_data.get("start_time", 0.0) or 0.0
+            end = clip_data.get("end_time")
+            if end is None:
+                end = info["duration"]
+
+            # Sanity check
+            if start < 0: start = 0
+            if end > info["duration"]: end = info["duration"]
+            if start >= end or not info["has_video"]:
+                logger.warning(f"Invalid clip duration: start={start}, end={end}")
+                continue
+
+            segment = dict(info, path=video_path, start=start, end=end, loudness=clip_data.get("loudness"))
+            if pipelined:
+                segment["source"] = source
+            segments.append(segment)
+        return segments
+
+    def _await_source(self, seg: dict) -> dict:
+        """Wait for a pipelined segment's source and swap the planned info for the real probe."""
+        video_path, info = self._source_result(seg["source"])
+        if not video_path:
+            logger.warning("Source for a planned segment could not be fetched, dropping it")
+            return None
+        end = seg["end"]
+        if info["duration"] < end:
+            logger.warning(f"Source {video_path} is shorter than its ingest info ({info['duration']:.2f}s), clamping segment")
+            end = info["duration"]
+        if seg["start"] >= end or not info["has_video"]:
+            return None
+        return dict(info, path=video_path, start=seg["start"], end=end, loudness=seg.get("loudness"))
+
+    def _render_segments(self, segments: list, output_path: str, bg_music_path: str = None) -> str:
+        """
+        Encode each segment (or chunk) independently and join them.
+        With the segment cache, only segments whose source, cut points or encoder profile
+        changed are re-encoded; without it, the encodes go to a scratch directory.
+        """
+        if not self.segment_cache:
+            with tempfile.TemporaryDirectory(prefix="segments_", dir=self.output_dir) as work_dir:
+                return self._render_encoded_segments(segments, output_path, bg_music_path, work_dir)
+        return self._render_encoded_segments(segments, output_path, bg_music_path)
+
+    def _render_encoded_segments(self, segments: list, output_path: str, bg_music_path: str = None, work_dir: str = None) -> str:
+        profile, threads, workers, segments = self._segment_encoding(segments)
+        with_audio = profile["with_audio"]
+
+        # Every segment is its own ffmpeg process, so a bounded pool of threads is enough
+        # to keep the encoders busy. Segments whose source is still downloading
+        # wait inside their task, so earlier segments encode in the meantime.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self._cached_segment, seg, profile, threads, i,
+                                self._progress_hook(i, seg["end"] - seg["start"]), work_dir=work_dir)
+                for i, seg in enumerate(segments)
+            ]
+            results = [future.result() for future in futures]
+
+        segments = [seg for seg, _, _ in results if seg]
+        segment_files = [path for seg, path, _ in results if seg]
+        if not segments:
+            raise RuntimeError("No render sources could be resolved")
+        if self.segment_cache:
+            self._record_cache_stats(segments, results)
+
+        if self._progress:
+            self._progress.set_phase("assembling")
+
+        self.ffmpeg_renderer.assemble_segments(segment_files, output_path, with_audio=with_audio, bg_music_path=bg_music_path,
+                                               loudness=self._timeline_loudness(segments))
+        return output_path
+
+    def _record_cache_stats(self, segments: list, results: list):
+        hits = sum(1 for seg, _, saved in results if seg and saved is not None)
+        bytes_saved = sum(saved for seg, _, saved in results if seg and saved)
+        seconds_saved = sum(seg["end"] - seg["start"] for seg, _, saved in results if seg and saved is not None)
+
+        self._cache_stats = {
+            "segments": len(segments),
+            "hits": hits,
+            "misses": len(segments) - hits,
+            "hit_rate": hits / len(segments),
+            "bytes_saved": bytes_saved,
+            "seconds_saved": seconds_saved,
+            # Encodes done ahead of renders (see prerender): how many were used, and wasted
+            "speculation": self.segment_cache.speculation_stats()
+        }
+        logger.info(f"Segment cache: {hits}/{len(segments)} hits ({bytes_saved} bytes, {seconds_saved:.1f}s of encode reused)")
+
+    def _segment_encoding(self, segments: list) -> tuple:
+        """
+        Encoder settings for the segments of a render: (profile, threads, workers, segments).
+        The profile is part of every cache key; long segments are chunked when encoding in parallel.
+
+        The core budget (the job slot's grant, else the profile's threads) is split
+        between the parallel encoders, so together they stay within the cores the
+        render was given.
+        """
+        render_profile = self._render_profile
+        height = output_height(render_profile, segments)
+        profile = {
+            "width": self.ffmpeg_renderer.canvas_width(segments[0], height),
+            "height": height,
+            "fps": render_profile["fps"],
+            "preset": render_profile["preset"],
+            "crf": render_profile["crf"],
+            "vf_filters": render_profile["vf_filters"],
+            "with_audio": any(seg["has_audio"] for seg in segments)
+        }
+
+        budget = max(1, int(self.core_budget or render_profile["threads"]))
+        workers = min(self.chunk_workers, budget)
+        if workers == 1:
+            return profile, min(render_profile["threads"], budget), 1, segments
+        return profile, budget // workers, workers, self._chunk_segments(segments, profile["fps"])
+
+    def _cached_segment(self, seg: dict, profile: dict, threads: int, task_id: int, on_progress=None, speculative: bool = False,
+                        work_dir: str = None):
+        """
+        Cached encode of one segment, encoding it on a miss (see prerender for speculative).
+        Returns (resolved segment, path, bytes saved or None on a miss); the segment is None if its source is missing.
+        With a work_dir (no segment cache), the segment is always encoded into it.
+        """
+        if seg.get("source"):
+            seg = self._await_source(seg)
+            if not seg:
+                if self._progress:
+                    self._progress.drop(task_id)
+                return None, None, None
+
+        if work_dir:
+            path = os.path.join(work_dir, f"{task_id:05d}.mkv")
+            self.ffmpeg_renderer.render_segment(seg, path, threads=threads, on_progress=on_progress, **profile)
+            return seg, path, None
+
+        key = self.segment_cache.segment_key(self.segment_cache.source_hash(seg["path"]), seg["start"], seg["end"], profile)
+        cached_path = self.segment_cache.get(key, speculative=speculative, pin=self._pin)
+        if cached_path:
+            if self._progress:
+                self._progress.drop(task_id, reused=True)
+            return seg, cached_path, self.segment_cache.entry_size(key)
+        return seg, self._encode_segment(seg, key, profile, threads, on_progress, speculative), None
+
+    def _music_bed(self, music_path: str) -> str:
+        """
+        Resampled PCM bed for a music track, cached per track hash so repeat renders
+        with the same track skip decoding and resampling. Falls back to the raw track.
+        """
+        if not self.segment_cache:
+            return music_path
+        try:
+            key = self.segment_cache.segment_key(self.segment_cache.source_hash(music_path), 0.0, 0.0,
+                                                 {"music_bed": True, "sample_rate": self.ffmpeg_renderer.AUDIO_RATE})
+            cached_path = self.segment_cache.get(key, pin=self._pin)
+            if cached_path:
+                logger.info(f"Music bed cache hit for {music_path}")
+                return cached_path
+
+            temp_path = self.segment_cache.temp_path(key, ".wav")
+            try:
+                self.ffmpeg_renderer.prepare_music_bed(music_path, temp_path)
+                return self.segment_cache.put(key, temp_path, ".wav", pin=self._pin)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        except Exception as e:
+            logger.warning(f"Could not prepare music bed for {music_path}: {e}")
+            return music_path
+
+    @staticmethod
+    def _timeline_loudness(segments: list) -> dict:
+        """Combined ingest loudness of the timeline, or None to fall back to single-pass loudnorm."""
+        audible = [seg for seg in segments if seg["has_audio"]]
+        loudness = LoudnessAnalyzer.combine([(seg.get("loudness"), seg["end"] - seg["start"]) for seg in audible])
+        if audible and loudness is None:
+            logger.info("Ingest loudness stats missing for some clips, using single-pass loudnorm")
+        return loudness
+
+    def _encode_segment(self, seg: dict, key: str, profile: dict, threads: int, on_progress=None, speculative: bool = False) -> str:
+        """Encode one segment into the cache and return its cached path."""
+        temp_path = self.segment_cache.temp_path(key)
+        started = time.monotonic()
+        try:
+            self.ffmpeg_renderer.render_segment(seg, temp_path, threads=threads, on_progress=on_progress, **profile)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return self.segment_cache.put(key, temp_path, speculative=speculative, seconds=seg["end"] - seg["start"],
+                                      encode_time=time.monotonic() - started, pin=self._pin)
+
+    @staticmethod
+    def _chunk_segments(segments: list, fps: int) -> list:
+        """
+        Split long segments into ~CHUNK_SECONDS chunks for parallel encoding.
+
+        Boundaries are snapped to a nearby source keyframe (cheap input seek) and then
+        to the output frame grid, so every chunk holds whole frames and starts a new GOP.
+        Chunks are encoded independently and joined by stream copy.
+        """
+        chunks = []
+        keyframes_by_path = {}
+        for seg in segments:
+            if seg["end"] - seg["start"] <= CHUNK_SECONDS * 1.5:
+                chunks.append(seg)
+                continue
+
+            if seg["path"] not in keyframes_by_path:
+                keyframes_by_path[seg["path"]] = probe_keyframes(seg["path"])
+            keyframes = keyframes_by_path[seg["path"]]
+
+            boundaries = [seg["start"]]
+            target = seg["start"] + CHUNK_SECONDS
+            while target < seg["end"] - CHUNK_SECONDS / 2:
+                nearest = min(keyframes, key=lambda k: abs(k - target)) if keyframes else target
+                boundary = nearest if abs(nearest - target) <= CHUNK_KEYFRAME_SNAP else target
+                boundary = seg["start"] + round((boundary - seg["start"]) * fps) / fps
+                if boundary > boundaries[-1]:
+                    boundaries.append(boundary)
+                target = boundary + CHUNK_SECONDS
+            boundaries.append(seg["end"])
+
+            for start, end in zip(boundaries, boundaries[1:]):
+                chunks.append(dict(seg, start=start, end=end))
+        return chunks
+
+    @staticmethod
+    def _clamp_segments(segments: list, max_duration: float) -> list:
+        """Drop or shorten trailing segments so the timeline fits max_duration."""
+        clamped = []
+        remaining = max_duration
+        for seg in segments:
+            if remaining <= 0:
+                break
+            length = min(seg["end"] - seg["start"], remaining)
+            clamped.append(dict(seg, end=seg["start"] + length))
+            remaining -= length
+        return clamped
+
+    def _render_with_moviepy(self, edl: list, output_filename: str, bg_music_path: str = None, is_paid: bool = False) -> str:
+        """Legacy renderer: decodes every frame into Python via MoviePy."""
         # Lazy import to avoid startup crash on Render Free Tier
         try:
             from moviepy.editor import VideoFileClip, concatenate_videoclips
         except ImportError:
             from moviepy import VideoFileClip, concatenate_videoclips
 
-        logger.info(f"Starting video render with {len(edl)} clips")
+        logger.info(f"Starting MoviePy render with {len(edl)} clips")
         
         clips = []
         
         try:
             for clip_data in edl:
-                video_id = clip_data.get("video_id")
-                
-                # Resolve file path
-                # We assume the file is in the uploads directory with a known extension
-                # In a real app, we'd query the DB for the filename.
-                # Here we'll try common extensions.
-                video_path = None
-                for ext in [".mp4", ".mov", ".avi", ".mkv"]:
-                    path = os.path.join(self.uploads_dir, f"{video_id}{ext}")
-                    if os.path.exists(path):
-                        video_path = path
-                        break
-                
+                video_path = self._resolve_source(clip_data.get("video_id"))
                 if not video_path:
-                    logger.info(f"Clip {video_id} not found locally. Attempting to download from Supabase...")
-                    # Try to download from Supabase Storage
-                    # We assume the file is in 'videos' bucket under 'uploads/{video_id}.mp4'
-                    # In a real app, we'd store the extension in the DB.
-                    local_path = os.path.join(self.uploads_dir, f"{video_id}.mp4")
-                    
-                    from .storage import Storage
-                    storage = Storage()
-                    if storage.download_file("videos", f"uploads/{video_id}.mp4", local_path):
-                        video_path = local_path
-                    else:
-                        logger.warning(f"Could not find or download source video for ID {video_id}")
-                        continue
+                    continue
                     
                 logger.info(f"Loading clip from {video_path}")
                 clip = VideoFileClip(video_path)
@@ -91,9 +682,31 @@ class VideoRenderer:
             if not clips:
                 logger.error("No valid clips to render")
                 return None
+            
+            # PRD-MONETIZATION: Preview Compression (Free: 60s)
+            # Sub-clip the preview windows from the source clips before concatenating,
+            # so MoviePy never reads frames outside the preview.
+            total_duration = sum(clip.duration for clip in clips)
+            timeline_clips = clips
+            if not is_paid:
+                if total_duration > PREVIEW_THRESHOLD:
+                    logger.info(f"Applying Preview Compression for draft (Original: {total_duration}s)")
+                    # Sample 12 segments of 5s each, spaced evenly
+                    pieces = map_timeline_windows(
+                        [(0.0, clip.duration) for clip in clips],
+                        self._preview_windows(total_duration)
+                    )
+                    timeline_clips = []
+                    for index, start, end in pieces:
+                        if hasattr(clips[index], 'subclipped'):
+                            timeline_clips.append(clips[index].subclipped(start, end))
+                        else:
+                            timeline_clips.append(clips[index].subclip(start, end))
+                else:
+                    logger.info("Draft duration is under 60s, no compression needed.")
                 
             logger.info("Concatenating clips...")
-            final_video = concatenate_videoclips(clips)
+            final_video = concatenate_videoclips(timeline_clips)
             
             # PRD 12. Free Tier - 720p
             # PRD 8. Camera Policy - Light stabilization & Soft clarity
@@ -126,7 +739,7 @@ class VideoRenderer:
                 bg_audio = AudioFileClip(bg_music_path)
                 
                 # Loop music to match video duration
-                bg_audio = bg_audio.loop(duration=final_video.duration)
+                bg_audio = afx.audio_loop(bg_audio, duration=final_video.duration)
                 
                 # Simple ducking: lower bg volume
                 # For a true sidechain effect in MoviePy, we'd need more complex logic.
@@ -137,48 +750,23 @@ class VideoRenderer:
                 final_audio = CompositeAudioClip([voice_audio, bg_audio])
                 final_video.audio = final_audio
             
-            # PRD-MONETIZATION: Duration Caps & Preview Compression
-            # Free: 60s (Compressed), Paid: 300s (5m) (Truncated if needed)
-            if not is_paid:
-                if final_video.duration > 60:
-                    logger.info(f"Applying Preview Compression for draft (Original: {final_video.duration}s)")
-                    # Sample 12 segments of 5s each, spaced evenly
-                    num_segments = 12
-                    segment_duration = 5.0
-                    total_preview_duration = num_segments * segment_duration
-                    
-                    # Calculate spacing
-                    # We want to cover the whole video, so we space the start of each segment
-                    # across (duration - segment_duration)
-                    spacing = (final_video.duration - segment_duration) / (num_segments - 1)
-                    
-                    preview_clips = []
-                    for i in range(num_segments):
-                        start = i * spacing
-                        end = start + segment_duration
-                        
-                        if hasattr(final_video, 'subclipped'):
-                            seg = final_video.subclipped(start, end)
-                        else:
-                            seg = final_video.subclip(start, end)
-                        preview_clips.append(seg)
-                    
-                    old_final = final_video
-                    final_video = concatenate_videoclips(preview_clips)
-                    old_final.close() # Release original
-                else:
-                    logger.info("Draft duration is under 60s, no compression needed.")
-            else:
+            # PRD-MONETIZATION: Duration Caps
+            # Free: 60s (Compressed above), Paid: 300s (5m) (Truncated if needed)
+            if is_paid:
                 # Paid Tier: Truncate to 5m if it exceeds
-                if final_video.duration > 300:
+                if final_video.duration > PAID_MAX_DURATION:
                     logger.info(f"Trimming final video to 300s duration cap (Original: {final_video.duration}s)")
                     if hasattr(final_video, 'subclipped'):
-                        final_video = final_video.subclipped(0, 300)
+                        final_video = final_video.subclipped(0, PAID_MAX_DURATION)
                     else:
-                        final_video = final_video.subclip(0, 300)
+                        final_video = final_video.subclip(0, PAID_MAX_DURATION)
 
             # PRD-MONETIZATION: Watermark (Free only)
-            vf_filters = "scale=-1:720,unsharp=3:3:1.5"
+            render_profile = self._render_profile
+            height = output_height(render_profile, [{"height": final_video.h}])
+            vf_filters = f"scale=-2:{height}"
+            if render_profile["vf_filters"]:
+                vf_filters += f",{render_profile['vf_filters']}"
             if not is_paid:
                 # Check if drawtext is available
                 # import subprocess
@@ -196,21 +784,27 @@ class VideoRenderer:
                 #     logger.warning(f"Could not check FFmpeg filters: {e}")
                 pass
 
-            ffmpeg_params = ["-vf", vf_filters]
+            ffmpeg_params = ["-vf", vf_filters, "-crf", str(render_profile["crf"])]
             if final_video.audio:
                 ffmpeg_params.extend(["-af", "loudnorm"])
             else:
                 logger.info("No audio track detected, skipping 'loudnorm' filter.")
             
+            # Report frames written through MoviePy's progress bar hooks
+            progress_logger = None
+            if self._start_progress(final_video.duration):
+                self._progress_hook("moviepy", final_video.duration)
+                progress_logger = moviepy_logger(self._progress)
+            
             final_video.write_videofile(
                 output_path, 
                 codec="libx264", 
                 audio_codec="aac",
-                preset="ultrafast",
-                fps=24,
-                threads=4,
+                preset=render_profile["preset"],
+                fps=render_profile["fps"],
+                threads=render_profile["threads"],
                 ffmpeg_params=ffmpeg_params,
-                logger=None
+                logger=progress_logger
             )
             
             # Close clips to release resources
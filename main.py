@@ -5,6 +5,7 @@ from pydantic import BaseModel
 import os
 from core.utils import get_logger, generate_unique_id, save_upload_file
 from core.brain_controller import BrainController
+from core.job_notifier import get_job_notifier
 import threading
 from worker import run_worker
 
@@ -52,6 +53,7 @@ async def shutdown_event():
     import worker
     logger.info("Stopping background worker thread...")
     worker.running = False
+    get_job_notifier().wake()
 
 async def get_current_user(authorization: str = Header(None)):
     """PRD 6. Permission Matrix - Enforced in backend"""
@@ -108,7 +110,7 @@ async def upload_video(project_id: str, file: UploadFile = File(...), user=Depen
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/projects/{project_id}/analyze")
-async def analyze_project(project_id: str, user=Depends(get_current_user)):
+async def analyze_project(project_id: str, idempotency_key: str = Header(None), user=Depends(get_current_user)):
     """PRD Step 3: Analysis Phase"""
     if not brain.check_role(user.id, ["CREATOR"]):
         raise HTTPException(status_code=403, detail="Only Creators can trigger analysis")
@@ -117,9 +119,17 @@ async def analyze_project(project_id: str, user=Depends(get_current_user)):
     if not clips:
         raise HTTPException(status_code=400, detail="No clips found in project")
     
-    result = brain.start_analysis(project_id, clips)
+    # Repeated requests (double clicks, client retries) return the analysis already queued
+    result = brain.start_analysis(project_id, clips, idempotency_key=idempotency_key)
     return result
 
+@app.get("/queue/stats")
+async def get_queue_stats(since_minutes: int = 60, user=Depends(get_current_user)):
+    """Queue depth and wait time (claimed_at - created_at) percentiles per scheduling lane"""
+    if not brain.check_role(user.id, ["ADMIN"]):
+        raise HTTPException(status_code=403, detail="Only Admins can view queue stats")
+    return {"since_minutes": since_minutes, "lanes": brain.db.get_queue_stats(since_minutes)}
+
 @app.get("/jobs/{job_id}")
 async def get_job_status(job_id: str, user=Depends(get_current_user)):
     """PRD-WORKERS-01: Check status of a background job"""
@@ -131,6 +141,25 @@ async def get_job_status(job_id: str, user=Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/batches/{batch_id}")
+async def get_batch_status(batch_id: str, user=Depends(get_current_user)):
+    """Per-clip analysis progress: batch totals and its jobs' counts by status"""
+    batch = brain.db.get_job_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch
+
+@app.get("/jobs/{job_id}/progress")
+async def get_job_progress(job_id: str, user=Depends(get_current_user)):
+    """Live render progress: frames encoded, encode fps and estimated time remaining"""
+    try:
+        progress = brain.db.get_job_progress(job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return progress
+
 @app.get("/projects/{project_id}/status")
 async def get_project_status(project_id: str, user=Depends(get_current_user)):
     status = brain.db.get_project_status(project_id)
@@ -192,7 +221,7 @@ class RenderRequest(BaseModel):
     is_draft: bool = False
 
 @app.post("/projects/{project_id}/render")
-async def render_video(project_id: str, request: RenderRequest, user=Depends(get_current_user)):
+async def render_video(project_id: str, request: RenderRequest, idempotency_key: str = Header(None), user=Depends(get_current_user)):
     """PRD Step 7: Approval & Final Render"""
     if not brain.check_role(user.id, ["CREATOR"]):
         raise HTTPException(status_code=403, detail="Only Creators can trigger render")
@@ -201,7 +230,8 @@ async def render_video(project_id: str, request: RenderRequest, user=Depends(get
     if not request.is_draft and not brain.db.is_project_paid(project_id):
         raise HTTPException(status_code=402, detail="Payment required for final export ($7)")
     
-    result = brain.render_project(project_id, request.reference_script, request.bg_music_path, is_draft=request.is_draft)
+    result = brain.render_project(project_id, request.reference_script, request.bg_music_path, is_draft=request.is_draft,
+                                  idempotency_key=idempotency_key)
     
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
@@ -0,0 +1,161 @@
+"""
+Job claim benchmark: queue throughput against the number of workers.
+
+Compares the old claim (SELECT the oldest pending job, then a conditional UPDATE)
+with the claim_jobs SQL function (FOR UPDATE SKIP LOCKED) from supabase_setup.sql.
+Each worker thread has its own connection, claims jobs until the queue is drained,
+"processes" each for --work-ms and marks it completed.
+
+The jobs schema and claim_jobs are taken from supabase_setup.sql and created in a
+scratch schema, so the benchmark runs the SQL that ships. --rtt-ms adds a delay
+before every statement to stand in for the REST round trip the workers pay.
+
+Needs a Postgres to point at (any local instance works) and psycopg2.
+
+Usage:
+    python scripts/benchmark_job_claim.py --dsn postgresql://postgres@127.0.0.1:5432/postgres
+    python scripts/benchmark_job_claim.py --workers 1 4 16 32 --jobs 2000 --batch 1 4 --rtt-ms 5
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import threading
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA = "claim_bench"
+
+def load_schema_sql() -> str:
+    """The projects table and the whole jobs section of supabase_setup.sql, moved into SCHEMA."""
+    with open(os.path.join(REPO_ROOT, "supabase_setup.sql")) as f:
+        setup = f.read()
+    projects = re.search(r"CREATE TABLE public\.projects \(.*?\n\);", setup, re.S).group(0)
+    jobs = re.search(r"-- 5\. Create 'jobs' table.*?(?=\n-- 6\.)", setup, re.S).group(0)
+    # gen_random_uuid needs no extension
+    return f"{projects}\n{jobs}".replace("public.", f"{SCHEMA}.").replace("uuid_generate_v4()", "gen_random_uuid()")
+
+def reset_queue(conn, jobs: int):
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        cur.execute(load_schema_sql())
+        # Distinct created_at values so queue order is well defined
+        cur.execute(
+            f"INSERT INTO {SCHEMA}.jobs (type, payload, created_at) "
+            f"SELECT 'render', '{{}}'::jsonb, NOW() + i * INTERVAL '1 microsecond' FROM generate_series(1, %s) AS i",
+            (jobs,)
+        )
+
+class Worker(threading.Thread):
+    def __init__(self, dsn: str, strategy: str, batch: int, work_seconds: float, rtt_seconds: float):
+        super().__init__(daemon=True)
+        import psycopg2
+        self.conn = psycopg2.connect(dsn)
+        self.conn.autocommit = True
+        self.strategy = strategy
+        self.batch = batch
+        self.work_seconds = work_seconds
+        self.rtt_seconds = rtt_seconds
+        self.claimed = []
+        self.lost_races = 0
+        self.empty_polls = 0
+
+    def execute(self, cur, sql: str, params=None):
+        if self.rtt_seconds:
+            time.sleep(self.rtt_seconds)
+        cur.execute(sql, params)
+        return cur.fetchall() if cur.description else []
+
+    def claim(self, cur) -> list:
+        if self.strategy == "claim_jobs":
+            return [row[0] for row in self.execute(cur, f"SELECT id FROM {SCHEMA}.claim_jobs(%s)", (self.batch,))]
+
+        # Old fetch_next_job: every worker reads the same head of the queue, one wins the update
+        rows = self.execute(cur, f"SELECT id FROM {SCHEMA}.jobs WHERE status = 'pending' ORDER BY created_at LIMIT 1")
+        if not rows:
+            return None
+        updated = self.execute(
+            cur, f"UPDATE {SCHEMA}.jobs SET status = 'processing', updated_at = NOW() WHERE id = %s AND status = 'pending' RETURNING id",
+            (rows[0][0],)
+        )
+        if not updated:
+            self.lost_races += 1
+        return [row[0] for row in updated]
+
+    def run(self):
+        with self.conn.cursor() as cur:
+            while True:
+                job_ids = self.claim(cur)
+                if job_ids is None:
+                    break
+                if not job_ids:
+                    if self.strategy == "claim_jobs":
+                        # Nothing claimable left (pending rows, if any, are being claimed by others)
+                        break
+                    continue
+                for job_id in job_ids:
+                    time.sleep(self.work_seconds)
+                    self.execute(cur, f"UPDATE {SCHEMA}.jobs SET status = 'completed', updated_at = NOW() WHERE id = %s", (job_id,))
+                self.claimed.extend(job_ids)
+        self.conn.close()
+
+def run_case(dsn: str, strategy: str, workers: int, jobs: int, batch: int, work_seconds: float, rtt_seconds: float) -> dict:
+    import psycopg2
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    reset_queue(conn, jobs)
+
+    threads = [Worker(dsn, strategy, batch, work_seconds, rtt_seconds) for _ in range(workers)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.monotonic() - started
+
+    claimed = [job_id for thread in threads for job_id in thread.claimed]
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT COUNT(*) FROM {SCHEMA}.jobs WHERE status <> 'completed'")
+        left = cur.fetchone()[0]
+        cur.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+    conn.close()
+
+    return {
+        "wall": wall,
+        "jobs_per_second": len(claimed) / wall,
+        "lost_races": sum(thread.lost_races for thread in threads),
+        "duplicates": len(claimed) - len(set(claimed)),
+        "left": left
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark job claiming")
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL", "postgresql://postgres@127.0.0.1:5432/postgres"))
+    parser.add_argument("--workers", nargs="*", type=int, default=[1, 4, 16, 32])
+    parser.add_argument("--strategies", nargs="*", default=["select_update", "claim_jobs"])
+    parser.add_argument("--batch", nargs="*", type=int, default=[1], help="Jobs per claim_jobs call")
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--work-ms", type=float, default=2.0, help="Simulated processing time per job")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Simulated round trip before each statement")
+    args = parser.parse_args()
+
+    try:
+        import psycopg2  # noqa: F401
+    except ImportError:
+        sys.exit("psycopg2 is required: pip install psycopg2-binary")
+
+    rows = []
+    for strategy in args.strategies:
+        for batch in (args.batch if strategy == "claim_jobs" else [1]):
+            for workers in args.workers:
+                result = run_case(args.dsn, strategy, workers, args.jobs, batch, args.work_ms / 1000, args.rtt_ms / 1000)
+                rows.append((strategy, batch, workers, result))
+
+    print(f"\n{'Strategy':<14} {'Batch':>5} {'Workers':>7} {'Wall (s)':>9} {'Jobs/s':>8} {'Lost races':>10} {'Duplicates':>10} {'Left':>5}")
+    for strategy, batch, workers, result in rows:
+        print(f"{strategy:<14} {batch:>5} {workers:>7} {result['wall']:>9.2f} {result['jobs_per_second']:>8.0f} "
+              f"{result['lost_races']:>10} {result['duplicates']:>10} {result['left']:>5}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Render profile benchmark: encode speed vs. file size vs. quality.
+
+Renders each synthetic fixture with every render profile (core/render_profiles.py)
+and reports wall time, encode fps, file size, bitrate and PSNR/SSIM. Quality is
+measured against a lossless (CRF 0) render through the same scale/filter chain,
+so the numbers isolate what the encoder settings cost.
+
+--presets / --crfs sweep a preset x CRF matrix over each profile's resolution,
+which is how the profile defaults were picked.
+
+Usage:
+    python scripts/benchmark_profiles.py [--profiles draft preview final] [--duration 20]
+    python scripts/benchmark_profiles.py --profiles final --presets ultrafast veryfast fast medium --crfs 18 20 23
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import subprocess
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.ffmpeg_renderer import FFmpegRenderer
+from core.render_profiles import RENDER_PROFILES, get_render_profile, output_height
+from core.utils import probe_media
+
+def create_fixtures(work_dir: str, duration: int) -> dict:
+    """1080p synthetic takes: clean test pattern, and the same with film grain (harder to encode)."""
+    fixtures = {
+        "testsrc2 1080p": f"testsrc2=duration={duration}:size=1920x1080:rate=30",
+        "testsrc2 1080p + grain": f"testsrc2=duration={duration}:size=1920x1080:rate=30,noise=alls=12:allf=t"
+    }
+    paths = {}
+    for name, source in fixtures.items():
+        path = os.path.join(work_dir, f"{len(paths)}.mp4")
+        subprocess.run([
+            "ffmpeg", "-v", "error", "-y", "-f", "lavfi", "-i", source,
+            "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-crf", "12", "-c:a", "aac", "-shortest", path
+        ], check=True)
+        paths[name] = path
+    return paths
+
+def measure_quality(distorted: str, reference: str) -> tuple:
+    """(PSNR dB, SSIM) of distorted against reference."""
+    result = subprocess.run([
+        "ffmpeg", "-hide_banner", "-nostdin", "-i", distorted, "-i", reference,
+        "-lavfi", "[0:v]split[d1][d2];[1:v]split[r1][r2];[d1][r1]psnr;[d2][r2]ssim",
+        "-f", "null", "-"
+    ], capture_output=True, text=True)
+    psnr = re.search(r"PSNR .*average:([\d.]+|inf)", result.stderr)
+    ssim = re.search(r"SSIM .*All:([\d.]+)", result.stderr)
+    return (float(psnr.group(1)) if psnr else None, float(ssim.group(1)) if ssim else None)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark render profiles")
+    parser.add_argument("--profiles", nargs="*", default=list(RENDER_PROFILES))
+    parser.add_argument("--presets", nargs="*", default=[], help="x264 presets to sweep (default: each profile's own)")
+    parser.add_argument("--crfs", nargs="*", type=int, default=[], help="CRFs to sweep (default: each profile's own)")
+    parser.add_argument("--duration", type=int, default=20, help="Fixture duration in seconds")
+    args = parser.parse_args()
+
+    renderer = FFmpegRenderer()
+    rows = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for fixture, path in create_fixtures(work_dir, args.duration).items():
+            segment = dict(probe_media(path), path=path, start=0.0, end=float(args.duration))
+            for name in args.profiles:
+                profile = get_render_profile(name)
+                height = output_height(profile, [segment])
+                settings = dict(
+                    height=height, fps=profile["fps"], threads=profile["threads"], vf_filters=profile["vf_filters"]
+                )
+
+                # Same container as the outputs, so psnr/ssim pair frames by identical timestamps
+                reference = os.path.join(work_dir, f"ref_{name}.mp4")
+                renderer.render([segment], reference, preset="ultrafast", crf=0, **settings)
+
+                for preset in args.presets or [profile["preset"]]:
+                    for crf in args.crfs or [profile["crf"]]:
+                        output = os.path.join(work_dir, f"{name}_{preset}_{crf}.mp4")
+                        started = time.monotonic()
+                        renderer.render([segment], output, preset=preset, crf=crf, **settings)
+                        wall = time.monotonic() - started
+
+                        size = os.path.getsize(output)
+                        psnr, ssim = measure_quality(output, reference)
+                        frames = args.duration * profile["fps"]
+                        rows.append((fixture, name, height, preset, crf, wall, frames / wall, size, size * 8 / args.duration / 1000, psnr, ssim))
+                        os.remove(output)
+
+    print(f"\n{'Fixture':<24} {'Profile':<8} {'Height':>6} {'Preset':<10} {'CRF':>4} {'Wall (s)':>9} {'fps':>7} {'Size (MB)':>10} {'kbps':>8} {'PSNR':>6} {'SSIM':>6}")
+    for fixture, name, height, preset, crf, wall, fps, size, kbps, psnr, ssim in rows:
+        psnr_text = f"{psnr:.2f}" if psnr is not None else "n/a"
+        ssim_text = f"{ssim:.4f}" if ssim is not None else "n/a"
+        print(f"{fixture:<24} {name:<8} {height:>6} {preset:<10} {crf:>4} {wall:>9.2f} {fps:>7.1f} {size / 1e6:>10.2f} {kbps:>8.0f} {psnr_text:>6} {ssim_text:>6}")
+
+if __name__ == "__main__":
+    main()
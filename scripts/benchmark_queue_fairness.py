@@ -0,0 +1,142 @@
+"""
+Queue fairness benchmark: time-to-draft while one creator floods the queue.
+
+One owner queues analysis for several large projects at once; meanwhile other
+creators keep requesting draft renders and the occasional final render. A fixed
+pool of workers drains the queue with either
+
+    fifo       - the old order: oldest pending job first (SKIP LOCKED)
+    claim_jobs - lanes and per-owner fair share (supabase_setup.sql, core/job_lanes.py)
+
+and the queue wait (claimed_at - created_at) is reported per lane via job_queue_stats.
+
+The schema, claim_jobs and job_queue_stats come from supabase_setup.sql (see
+benchmark_job_claim.py), so the benchmark runs the SQL that ships.
+
+Usage:
+    python scripts/benchmark_queue_fairness.py --dsn postgresql://postgres@127.0.0.1:5432/postgres
+    python scripts/benchmark_queue_fairness.py --workers 4 --flood-projects 5 --flood-jobs 40 --duration 20
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from benchmark_job_claim import SCHEMA, load_schema_sql
+
+FIFO_CLAIM = f"""
+    UPDATE {SCHEMA}.jobs SET status = 'processing', claimed_at = NOW(), updated_at = NOW()
+    WHERE id = (
+        SELECT id FROM {SCHEMA}.jobs WHERE status = 'pending'
+        ORDER BY created_at LIMIT 1 FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, type
+"""
+
+FAIR_CLAIM = f"SELECT id, type FROM {SCHEMA}.claim_jobs(1)"
+
+def create_project(cur, owner_id: str) -> str:
+    cur.execute(f"INSERT INTO {SCHEMA}.projects (name, owner_id) VALUES ('bench', %s) RETURNING id", (owner_id,))
+    return cur.fetchone()[0]
+
+def enqueue(cur, project_id: str, job_type: str, lane: str):
+    cur.execute(
+        f"INSERT INTO {SCHEMA}.jobs (project_id, type, payload, status, lane) VALUES (%s, %s, '{{}}'::jsonb, 'pending', %s)",
+        (project_id, job_type, lane)
+    )
+
+def worker(dsn: str, claim_sql: str, work_seconds: dict, stop: threading.Event):
+    import psycopg2
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        while not stop.is_set():
+            cur.execute(claim_sql)
+            row = cur.fetchone()
+            if not row:
+                time.sleep(0.005)
+                continue
+            time.sleep(work_seconds[row[1]])
+            cur.execute(f"UPDATE {SCHEMA}.jobs SET status = 'completed', updated_at = NOW() WHERE id = %s", (row[0],))
+    conn.close()
+
+def run_case(dsn: str, strategy: str, args) -> list:
+    import psycopg2
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(load_schema_sql())
+
+    # The flood: one owner analyses several big projects at once
+    flood_owner = "00000000-0000-0000-0000-00000000000f"
+    for _ in range(args.flood_projects):
+        project_id = create_project(cur, flood_owner)
+        for _ in range(args.flood_jobs):
+            enqueue(cur, project_id, "analyze", "bulk")
+
+    creators = [create_project(cur, f"00000000-0000-0000-0000-{i:012d}") for i in range(args.creators)]
+    work_seconds = {"analyze": args.analyze_ms / 1000, "render": args.render_ms / 1000}
+    claim_sql = FIFO_CLAIM if strategy == "fifo" else FAIR_CLAIM
+    stop = threading.Event()
+    threads = [threading.Thread(target=worker, args=(dsn, claim_sql, work_seconds, stop), daemon=True)
+               for _ in range(args.workers)]
+    for thread in threads:
+        thread.start()
+
+    # Other creators request drafts (and now and then a final render) at a steady rate
+    rng = random.Random(42)
+    deadline = time.monotonic() + args.duration
+    while time.monotonic() < deadline:
+        project_id = rng.choice(creators)
+        if rng.random() < 0.2:
+            enqueue(cur, project_id, "render", "final")
+        else:
+            enqueue(cur, project_id, "render", "interactive")
+        time.sleep(rng.expovariate(args.draft_rate))
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    cur.execute(f"SELECT lane, pending, claimed, wait_p50_seconds, wait_p95_seconds, wait_max_seconds FROM {SCHEMA}.job_queue_stats()")
+    stats = cur.fetchall()
+    cur.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+    conn.close()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark time-to-draft under a bulk analysis flood")
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL", "postgresql://postgres@127.0.0.1:5432/postgres"))
+    parser.add_argument("--strategies", nargs="*", default=["fifo", "claim_jobs"])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--flood-projects", type=int, default=5)
+    parser.add_argument("--flood-jobs", type=int, default=40, help="Analysis jobs per flooding project")
+    parser.add_argument("--creators", type=int, default=10)
+    parser.add_argument("--draft-rate", type=float, default=5.0, help="Render requests per second from other creators")
+    parser.add_argument("--analyze-ms", type=float, default=100.0)
+    parser.add_argument("--render-ms", type=float, default=30.0)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of render requests")
+    args = parser.parse_args()
+
+    try:
+        import psycopg2  # noqa: F401
+    except ImportError:
+        sys.exit("psycopg2 is required: pip install psycopg2-binary")
+
+    rows = []
+    for strategy in args.strategies:
+        for stats in run_case(args.dsn, strategy, args):
+            rows.append((strategy, stats))
+
+    print(f"\n{'Strategy':<11} {'Lane':<12} {'Claimed':>7} {'Left':>5} {'Wait p50':>9} {'Wait p95':>9} {'Wait max':>9}")
+    fmt = lambda value: f"{value:>8.2f}s" if value is not None else f"{'-':>9}"
+    for strategy, (lane, pending, claimed, p50, p95, worst) in rows:
+        print(f"{strategy:<11} {lane:<12} {claimed:>7} {pending:>5} {fmt(p50)} {fmt(p95)} {fmt(worst)}")
+
+if __name__ == "__main__":
+    main()
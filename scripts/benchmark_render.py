@@ -0,0 +1,131 @@
+"""
+Render benchmark: real-time factor (RTF) per render backend.
+
+RTF = wall-clock render time / output duration (lower is faster, < 1.0 is faster than real time).
+Uses the same fixtures as the test suite (test_video.mp4) plus a synthetic
+talking-head style clip with audio, generated with ffmpeg's lavfi sources.
+
+With --cores, also renders the synthetic take as a paid final once per core count
+(cold segment cache each time): the process is pinned to that many cores and the
+render gets them as its core budget, split between that many chunk encoders, as a
+worker does for a job slot's grant. Wall time against cores shows how chunked
+encoding scales. --chunk-workers instead varies the encoders on an unchanged budget.
+
+Usage:
+    python scripts/benchmark_render.py [--backends ffmpeg moviepy] [--duration 90]
+    python scripts/benchmark_render.py --backends --cores 1 2 4 8 16 --duration 240
+    python scripts/benchmark_render.py --backends --chunk-workers 1 2 4 --duration 240
+"""
+import os
+import sys
+import argparse
+import subprocess
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.video_renderer import VideoRenderer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def create_synthetic_clip(path: str, duration: int, size: str = "1280x720", rate: int = 30):
+    """Create a clip with moving video and a sine tone so audio filters have work to do."""
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc=duration={duration}:size={size}:rate={rate}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest", path
+    ], check=True)
+
+def build_fixtures(work_dir: str, duration: int) -> dict:
+    """Return {name: (edl, is_paid)} for each benchmark scenario."""
+    test_video = os.path.join(REPO_ROOT, "test_video.mp4")
+    if not os.path.exists(test_video):
+        subprocess.run([
+            "ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=duration=2:size=1280x720:rate=24",
+            "-c:v", "libx264", "-y", test_video
+        ], check=True)
+    os.link(test_video, os.path.join(work_dir, "test_video.mp4"))
+    create_synthetic_clip(os.path.join(work_dir, "synthetic_take.mp4"), duration)
+
+    return {
+        "test_video (short, paid)": ([{"video_id": "test_video", "start_time": 0.0, "end_time": None}], True),
+        f"synthetic {duration}s (paid)": ([{"video_id": "synthetic_take", "start_time": 0.0, "end_time": None}], True),
+        f"synthetic {duration}s (free preview)": ([{"video_id": "synthetic_take", "start_time": 0.0, "end_time": None}], False),
+        "two takes (paid)": ([
+            {"video_id": "synthetic_take", "start_time": 5.0, "end_time": 25.0},
+            {"video_id": "test_video", "start_time": 0.0, "end_time": None}
+        ], True)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark render backends")
+    parser.add_argument("--backends", nargs="*", default=["ffmpeg", "moviepy"])
+    parser.add_argument("--duration", type=int, default=90, help="Synthetic clip duration in seconds")
+    parser.add_argument("--chunk-workers", nargs="*", type=int, default=[], help="Chunk worker counts to benchmark")
+    parser.add_argument("--cores", nargs="*", type=int, default=[], help="Core counts to benchmark chunked encoding on")
+    args = parser.parse_args()
+    available_cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        fixtures = build_fixtures(work_dir, args.duration)
+        rows = []
+        for name, (edl, is_paid) in fixtures.items():
+            for backend in args.backends:
+                renderer = VideoRenderer(output_dir=os.path.join(work_dir, "renders"), uploads_dir=work_dir, backend=backend)
+                try:
+                    renderer.render_video(edl, f"{backend}.mp4", is_paid=is_paid)
+                except Exception as e:
+                    print(f"{name} [{backend}] failed: {e}")
+                    rows.append((name, backend, 0.0, 0.0, None))
+                    continue
+                stats = renderer.last_render_stats or {}
+                rows.append((name, stats.get("backend", backend), stats.get("wall_time", 0.0), stats.get("output_duration", 0.0), stats.get("realtime_factor")))
+
+        edl = [{"video_id": "synthetic_take", "start_time": 0.0, "end_time": None}]
+        chunk_rows = [render_chunked(work_dir, edl, workers, workers) for workers in args.chunk_workers]
+
+        core_rows = []
+        for cores in args.cores:
+            if cores > len(available_cores):
+                print(f"Skipping {cores} cores: only {len(available_cores)} available")
+                continue
+            if hasattr(os, "sched_setaffinity"):
+                # ffmpeg children inherit the affinity
+                os.sched_setaffinity(0, available_cores[:cores])
+            try:
+                core_rows.append(render_chunked(work_dir, edl, cores, f"cores_{cores}", core_budget=cores))
+            finally:
+                if hasattr(os, "sched_setaffinity"):
+                    os.sched_setaffinity(0, available_cores)
+
+    print(f"\n{'Fixture':<34} {'Backend':<8} {'Wall (s)':>9} {'Output (s)':>11} {'RTF':>6}")
+    for name, backend, wall, duration, rtf in rows:
+        rtf_text = f"{rtf:.2f}" if rtf is not None else "n/a"
+        print(f"{name:<34} {backend:<8} {wall:>9.2f} {duration:>11.2f} {rtf_text:>6}")
+
+    if chunk_rows:
+        print(f"\nChunked final render, synthetic {args.duration}s ({len(available_cores)} cores available)")
+        print_chunk_rows("Workers", chunk_rows)
+    if core_rows:
+        print(f"\nChunked final render against cores, synthetic {args.duration}s")
+        print_chunk_rows("Cores", core_rows)
+
+def render_chunked(work_dir: str, edl: list, workers: int, label, core_budget: int = None) -> tuple:
+    """Paid final render of the EDL with a cold segment cache. Returns (workers, wall, rtf, chunks)."""
+    renderer = VideoRenderer(output_dir=os.path.join(work_dir, "renders"), uploads_dir=work_dir, backend="ffmpeg",
+                             cache_dir=os.path.join(work_dir, f"segment_cache_{label}"))
+    renderer.chunk_workers = workers
+    renderer.core_budget = core_budget
+    renderer.render_video(edl, f"chunked_{label}.mp4", is_paid=True)
+    stats = renderer.last_render_stats
+    return workers, stats["wall_time"], stats["realtime_factor"], stats["cache"]["segments"]
+
+def print_chunk_rows(heading: str, rows: list):
+    baseline = rows[0][1]
+    print(f"{heading:>7} {'Chunks':>7} {'Wall (s)':>9} {'RTF':>6} {'Speedup':>8}")
+    for workers, wall, rtf, chunks in rows:
+        print(f"{workers:>7} {chunks:>7} {wall:>9.2f} {rtf:>6.2f} {baseline / wall:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
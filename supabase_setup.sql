@@ -28,10 +28,14 @@ CREATE TABLE public.videos (
     filename TEXT NOT NULL,
     storage_path TEXT,
     duration FLOAT, -- Added for PRD-MONETIZATION upload limits
+    source_fingerprint TEXT, -- sha256 of the uploaded file; analysis is reused while it matches
     status TEXT DEFAULT 'processing',
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Existing deployments
+ALTER TABLE public.videos ADD COLUMN IF NOT EXISTS source_fingerprint TEXT;
+
 -- 3. Create 'results' table (Analysis results)
 CREATE TABLE public.results (
     video_id UUID PRIMARY KEY REFERENCES public.videos(id) ON DELETE CASCADE,
@@ -47,23 +51,544 @@ CREATE TABLE public.user_roles (
 );
 
 -- 5. Create 'jobs' table (Simple Queue)
+-- A batch fans one request out into independent jobs (e.g. one 'analyze' job per clip)
+-- plus a join job that waits ('waiting') until the last of them completes (see
+-- complete_job below). The join job's id is what the client polls for the whole batch.
+CREATE TABLE IF NOT EXISTS public.job_batches (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    project_id UUID REFERENCES public.projects(id) ON DELETE CASCADE,
+    total INTEGER NOT NULL,
+    remaining INTEGER NOT NULL, -- Jobs not yet completed; the one that takes it to 0 enqueues the join
+    join_type TEXT NOT NULL,
+    join_payload JSONB,
+    join_lane TEXT DEFAULT 'interactive',
+    join_job_id UUID, -- Join job, queued 'waiting' with the batch
+    payload_hash TEXT, -- Duplicate requests coalesce onto a batch that is still running
+    idempotency_key TEXT, -- Client-supplied key (Idempotency-Key header)
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 CREATE TABLE public.jobs (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     project_id UUID REFERENCES public.projects(id) ON DELETE CASCADE,
-    type TEXT NOT NULL CHECK (type IN ('analyze', 'render')),
-    status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'processing', 'completed', 'failed')),
+    type TEXT NOT NULL CHECK (type IN ('analyze', 'render', 'finish_analysis', 'prerender')),
+    status TEXT DEFAULT 'pending' CHECK (status IN ('waiting', 'pending', 'processing', 'completed', 'failed', 'dead')),
     payload JSONB,
     error TEXT,
+    progress JSONB, -- Live render progress (frames_encoded, encode_fps, eta_seconds, ...)
+    lane TEXT DEFAULT 'bulk', -- Scheduling lane (see job_lanes)
+    priority INTEGER DEFAULT 0, -- Head start in seconds of queue age
+    claimed_at TIMESTAMP WITH TIME ZONE, -- When a worker took the job (queue wait = claimed_at - created_at)
+    worker_id TEXT, -- Worker holding the lease while processing
+    lease_expires_at TIMESTAMP WITH TIME ZONE, -- Renewed by the worker's heartbeat; past it, the job is reclaimed
+    attempts INTEGER DEFAULT 0, -- Claims so far
+    max_attempts INTEGER DEFAULT 3, -- Lost leases/crashes before the job is marked 'dead'
+    run_after TIMESTAMP WITH TIME ZONE, -- Retry backoff: not claimable before this
+    batch_id UUID REFERENCES public.job_batches(id) ON DELETE SET NULL, -- Fan-out this job belongs to
+    payload_hash TEXT, -- sha256 of the canonical payload: a duplicate request reuses the pending/running job
+    idempotency_key TEXT, -- Client-supplied key (Idempotency-Key header): reuses the job for 24 hours
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Existing deployments: add the new columns in place
+ALTER TABLE public.jobs ADD COLUMN IF NOT EXISTS progress JSONB;
+ALTER TABLE public.jobs ADD COLUMN IF NOT EXISTS lane TEXT DEFAULT 'bulk';
+ALTER TABLE public.jobs ADD COLUMN IF NOT EXISTS priority INTEGER DEFAULT 0;
+ALTER TABLE public.jobs ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE public.jobs ADD COLUMN IF NOT EXISTS worker_id TEXT;
+ALTER TABLE public.jobs ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE public.jobs ADD COLUMN IF NOT EXISTS attempts INTEGER DEFAULT 0;
+ALTER TABLE public.jobs ADD COLUMN IF NOT EXISTS max_attempts INTEGER DEFAULT 3;
+ALTER TABLE public.jobs ADD COLUMN IF NOT EXISTS run_after TIMESTAMP WITH TIME ZONE;
+ALTER TABLE public.jobs ADD COLUMN IF NOT EXISTS batch_id UUID REFERENCES public.job_batches(id) ON DELETE SET NULL;
+ALTER TABLE public.jobs ADD COLUMN IF NOT EXISTS payload_hash TEXT;
+ALTER TABLE public.jobs ADD COLUMN IF NOT EXISTS idempotency_key TEXT;
+ALTER TABLE public.job_batches ADD COLUMN IF NOT EXISTS payload_hash TEXT;
+ALTER TABLE public.job_batches ADD COLUMN IF NOT EXISTS idempotency_key TEXT;
+ALTER TABLE public.jobs DROP CONSTRAINT IF EXISTS jobs_type_check;
+ALTER TABLE public.jobs ADD CONSTRAINT jobs_type_check
+    CHECK (type IN ('analyze', 'render', 'finish_analysis', 'prerender'));
+ALTER TABLE public.jobs DROP CONSTRAINT IF EXISTS jobs_status_check;
+ALTER TABLE public.jobs ADD CONSTRAINT jobs_status_check
+    CHECK (status IN ('waiting', 'pending', 'processing', 'completed', 'failed', 'dead'));
+
+-- Scheduling lanes. A pending job's claim score grows with its age times its lane
+-- weight, so interactive drafts overtake bulk analysis quickly but nothing starves.
+CREATE TABLE IF NOT EXISTS public.job_lanes (
+    lane TEXT PRIMARY KEY,
+    weight REAL NOT NULL
+);
+INSERT INTO public.job_lanes (lane, weight) VALUES
+    ('interactive', 8), -- Draft renders: a creator is waiting on the result
+    ('final', 4),       -- Paid final renders
+    ('bulk', 1)         -- Analysis
+ON CONFLICT (lane) DO NOTHING;
+
+-- Pending jobs by lane and running jobs (the claim below scans only these)
+DROP INDEX IF EXISTS public.jobs_pending_idx;
+CREATE INDEX IF NOT EXISTS jobs_pending_lane_idx ON public.jobs (lane, created_at) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS jobs_processing_idx ON public.jobs (project_id) WHERE status = 'processing';
+CREATE INDEX IF NOT EXISTS jobs_lease_idx ON public.jobs (lease_expires_at) WHERE status = 'processing';
+-- At most one pending or running job per request; enqueue_job finds it here
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_active_request_idx ON public.jobs (project_id, type, payload_hash)
+    WHERE status IN ('pending', 'processing');
+CREATE INDEX IF NOT EXISTS jobs_idempotency_idx ON public.jobs (project_id, idempotency_key) WHERE idempotency_key IS NOT NULL;
+CREATE INDEX IF NOT EXISTS job_batches_project_idx ON public.job_batches (project_id);
+
+-- Claim up to max_jobs pending jobs in one statement. SKIP LOCKED lets concurrent
+-- workers each take different rows instead of all racing for the head of the queue.
+-- job_types limits the claim to the types the worker has capacity for (NULL: any).
+-- Each claimed job is leased to `worker` for lease_seconds; the worker's heartbeat
+-- renews it (renew_job_leases) and reclaim_expired_jobs recovers it if the worker dies.
+--
+-- Jobs are taken by weighted fair score rather than strictly by age:
+--   lane weight * (age in seconds + priority + 1) / (owner's running jobs + owner's queue position)
+-- An owner's queue position interleaves their projects round-robin, so one creator
+-- analysing five projects gets one slot at a time instead of the whole queue.
+-- Called by Database.claim_jobs via RPC.
+DROP FUNCTION IF EXISTS public.claim_jobs(INTEGER);
+DROP FUNCTION IF EXISTS public.claim_jobs(INTEGER, TEXT[]);
+CREATE OR REPLACE FUNCTION public.claim_jobs(
+    max_jobs INTEGER DEFAULT 1,
+    job_types TEXT[] DEFAULT NULL,
+    worker TEXT DEFAULT NULL,
+    lease_seconds INTEGER DEFAULT 120
+)
+RETURNS SETOF public.jobs
+LANGUAGE sql
+AS $$
+    WITH pending AS (
+        -- The oldest jobs of each lane are the only ones that can score highest, so a
+        -- deep backlog costs no more to schedule than a short one
+        SELECT c.id, c.created_at, c.lane, c.priority, c.project_id,
+               COALESCE(p.owner_id, c.project_id) AS owner_key,
+               ROW_NUMBER() OVER (PARTITION BY c.project_id ORDER BY c.created_at) AS project_position
+        FROM public.job_lanes l
+        CROSS JOIN LATERAL (
+            SELECT j.id, j.created_at, j.lane, j.priority, j.project_id
+            FROM public.jobs j
+            WHERE j.status = 'pending' AND j.lane = l.lane
+              AND (job_types IS NULL OR j.type = ANY(job_types))
+              AND (j.run_after IS NULL OR j.run_after <= NOW())
+            ORDER BY j.created_at
+            LIMIT 256
+        ) c
+        LEFT JOIN public.projects p ON p.id = c.project_id
+    ),
+    running AS (
+        SELECT COALESCE(p.owner_id, j.project_id) AS owner_key, COUNT(*) AS jobs
+        FROM public.jobs j
+        LEFT JOIN public.projects p ON p.id = j.project_id
+        WHERE j.status = 'processing'
+        GROUP BY 1
+    ),
+    scored AS (
+        SELECT c.id, c.created_at,
+               COALESCE(l.weight, 1) * (EXTRACT(EPOCH FROM NOW() - c.created_at) + COALESCE(c.priority, 0) + 1)
+               / (COALESCE(r.jobs, 0) + ROW_NUMBER() OVER (
+                     PARTITION BY c.owner_key ORDER BY c.project_position, c.created_at
+                 )) AS score
+        FROM pending c
+        LEFT JOIN public.job_lanes l ON l.lane = c.lane
+        LEFT JOIN running r ON r.owner_key IS NOT DISTINCT FROM c.owner_key
+    )
+    UPDATE public.jobs
+    SET status = 'processing', claimed_at = NOW(), updated_at = NOW(),
+        worker_id = worker, lease_expires_at = NOW() + make_interval(secs => lease_seconds),
+        attempts = COALESCE(attempts, 0) + 1, run_after = NULL
+    WHERE id IN (
+        -- Lock the best candidates by primary key, skipping any another worker holds
+        SELECT j.id
+        FROM unnest(ARRAY(
+            SELECT id FROM scored ORDER BY score DESC, created_at LIMIT max_jobs + 64
+        )) WITH ORDINALITY AS c(id, rank)
+        JOIN public.jobs j ON j.id = c.id
+        WHERE j.status = 'pending'
+        ORDER BY c.rank
+        LIMIT max_jobs
+        FOR UPDATE OF j SKIP LOCKED
+    )
+    RETURNING *;
+$$;
+
+-- Heartbeat: extend the leases `worker` holds on job_ids. Returns the ids still held;
+-- any missing were reclaimed (the lease lapsed) and the worker should stop them.
+CREATE OR REPLACE FUNCTION public.renew_job_leases(job_ids UUID[], worker TEXT, lease_seconds INTEGER DEFAULT 120)
+RETURNS SETOF UUID
+LANGUAGE sql
+AS $$
+    UPDATE public.jobs
+    SET lease_expires_at = NOW() + make_interval(secs => lease_seconds)
+    WHERE id = ANY(job_ids) AND worker_id = worker AND status = 'processing'
+    RETURNING id;
+$$;
+
+-- Hand a job back after its attempt died (worker crash, OOM kill, lost lease):
+-- back to 'pending' after an exponential backoff (backoff_seconds * 2^(attempts - 1)),
+-- or 'dead' once it has used max_attempts. Only the lease holder (or anyone, for
+-- worker NULL) can release it.
+CREATE OR REPLACE FUNCTION public.release_job(job_id UUID, worker TEXT DEFAULT NULL, reason TEXT DEFAULT NULL, backoff_seconds INTEGER DEFAULT 30)
+RETURNS SETOF public.jobs
+LANGUAGE sql
+AS $$
+    UPDATE public.jobs
+    SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'pending' END,
+        run_after = NOW() + make_interval(secs => backoff_seconds * power(2, GREATEST(attempts - 1, 0))),
+        error = reason, worker_id = NULL, lease_expires_at = NULL, updated_at = NOW()
+    WHERE id = job_id AND status = 'processing' AND (worker IS NULL OR worker_id = worker)
+    RETURNING *;
+$$;
+
+-- Hand back a job this worker claimed but could not start (no capacity left): 'pending'
+-- again with the claim undone, so the attempt isn't counted against max_attempts.
+-- delay_seconds keeps it from being claimed straight back while the capacity is short.
+CREATE OR REPLACE FUNCTION public.unclaim_job(job_id UUID, worker TEXT DEFAULT NULL, delay_seconds INTEGER DEFAULT 5)
+RETURNS SETOF public.jobs
+LANGUAGE sql
+AS $$
+    UPDATE public.jobs
+    SET status = 'pending', attempts = GREATEST(attempts - 1, 0),
+        run_after = NOW() + make_interval(secs => delay_seconds),
+        worker_id = NULL, lease_expires_at = NULL, claimed_at = NULL, updated_at = NOW()
+    WHERE id = job_id AND status = 'processing' AND (worker IS NULL OR worker_id = worker)
+    RETURNING *;
+$$;
+
+-- Reaper: release every job whose lease has lapsed. Safe to run from every worker
+-- at once (SKIP LOCKED: each expired job is released by exactly one of them).
+-- A job left 'processing' without a lease (claimed before leases existed, or by a
+-- worker that predates them) counts as lapsed once untouched for lease_seconds.
+DROP FUNCTION IF EXISTS public.reclaim_expired_jobs(INTEGER);
+CREATE OR REPLACE FUNCTION public.reclaim_expired_jobs(backoff_seconds INTEGER DEFAULT 30, lease_seconds INTEGER DEFAULT 120)
+RETURNS SETOF public.jobs
+LANGUAGE sql
+AS $$
+    UPDATE public.jobs
+    SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'pending' END,
+        run_after = NOW() + make_interval(secs => backoff_seconds * power(2, GREATEST(attempts - 1, 0))),
+        error = 'Lease expired (worker ' || COALESCE(worker_id, 'unknown') || ' stopped heartbeating)',
+        worker_id = NULL, lease_expires_at = NULL, updated_at = NOW()
+    WHERE id IN (
+        SELECT id FROM public.jobs
+        WHERE status = 'processing'
+          AND (lease_expires_at < NOW()
+               OR (lease_expires_at IS NULL AND updated_at < NOW() - make_interval(secs => lease_seconds)))
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *;
+$$;
+
+-- Enqueue one job, unless the same request is already queued. A job matches when it has
+-- the same idempotency key (any status, last 24 hours), or the same project, type and
+-- payload hash and is still pending or running. Returns the job id and
+-- whether it was created. Called by Database.enqueue_job.
+CREATE OR REPLACE FUNCTION public.enqueue_job(
+    project UUID,
+    job_type TEXT,
+    job_payload JSONB,
+    job_lane TEXT DEFAULT 'bulk',
+    job_priority INTEGER DEFAULT 0,
+    hash TEXT DEFAULT NULL,
+    key TEXT DEFAULT NULL
+)
+RETURNS TABLE (id UUID, created BOOLEAN)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+    existing UUID;
+BEGIN
+    -- Serialise enqueues of the same request, so two simultaneous clicks can't both miss
+    -- (key before hash, everywhere, so these locks never deadlock)
+    IF key IS NOT NULL THEN
+        PERFORM pg_advisory_xact_lock(hashtext(concat_ws('/', project, 'key', key)));
+    END IF;
+    PERFORM pg_advisory_xact_lock(hashtext(concat_ws('/', project, job_type, hash)));
+
+    IF key IS NOT NULL THEN
+        SELECT j.id INTO existing FROM public.jobs j
+        WHERE j.project_id = project AND j.idempotency_key = key AND j.created_at > NOW() - INTERVAL '24 hours'
+        ORDER BY j.created_at DESC LIMIT 1;
+    END IF;
+    IF existing IS NULL AND hash IS NOT NULL THEN
+        SELECT j.id INTO existing FROM public.jobs j
+        WHERE j.project_id = project AND j.type = job_type AND j.payload_hash = hash
+          AND j.status IN ('pending', 'processing');
+    END IF;
+
+    IF existing IS NOT NULL THEN
+        RETURN QUERY SELECT existing, FALSE;
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    INSERT INTO public.jobs (project_id, type, payload, status, lane, priority, payload_hash, idempotency_key)
+    VALUES (project, job_type, job_payload, 'pending', job_lane, job_priority, hash, key)
+    RETURNING public.jobs.id, TRUE;
+END;
+$$;
+
+-- Enqueue a batch: one job per element of payloads, all in one transaction, plus the
+-- batch row that joins them. Coalesces like enqueue_job: a batch with the same key, or
+-- with the same payload hash while any of its jobs (or its join) is pending or running,
+-- is returned instead. Returns the batch id, whether it was created and the id of its
+-- join job. Called by Database.enqueue_job_batch.
+--
+-- payload_hashes (one per payload) lets the batch adopt matching jobs that are already
+-- queued on their own, e.g. per-clip analysis enqueued at upload: the batch then waits
+-- for them instead of queuing the same work twice. Adopted jobs are locked first, so a
+-- job completing at the same moment is either counted off this batch or not adopted.
+DROP FUNCTION IF EXISTS public.enqueue_job_batch(UUID, TEXT, JSONB, TEXT, TEXT, JSONB, TEXT);
+DROP FUNCTION IF EXISTS public.enqueue_job_batch(UUID, TEXT, JSONB, TEXT, TEXT, JSONB, TEXT, TEXT, TEXT);
+DROP FUNCTION IF EXISTS public.enqueue_job_batch(UUID, TEXT, JSONB, TEXT, TEXT, JSONB, TEXT, TEXT, TEXT, TEXT[]);
+CREATE OR REPLACE FUNCTION public.enqueue_job_batch(
+    project UUID,
+    job_type TEXT,
+    payloads JSONB,
+    job_lane TEXT DEFAULT 'bulk',
+    join_type TEXT DEFAULT NULL,
+    join_payload JSONB DEFAULT '{}'::jsonb,
+    join_lane TEXT DEFAULT 'interactive',
+    hash TEXT DEFAULT NULL,
+    key TEXT DEFAULT NULL,
+    payload_hashes TEXT[] DEFAULT NULL
+)
+RETURNS TABLE (id UUID, created BOOLEAN, join_job_id UUID)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+    existing UUID;
+    batch UUID;
+    join_id UUID;
+    adopted TEXT[];
+BEGIN
+    IF key IS NOT NULL THEN
+        PERFORM pg_advisory_xact_lock(hashtext(concat_ws('/', project, 'batch key', key)));
+    END IF;
+    PERFORM pg_advisory_xact_lock(hashtext(concat_ws('/', project, 'batch', job_type, hash)));
+
+    IF key IS NOT NULL THEN
+        SELECT b.id INTO existing FROM public.job_batches b
+        WHERE b.project_id = project AND b.idempotency_key = key AND b.created_at > NOW() - INTERVAL '24 hours'
+        ORDER BY b.created_at DESC LIMIT 1;
+    END IF;
+    IF existing IS NULL AND hash IS NOT NULL THEN
+        -- Still running: its join hasn't finished or failed (a batch queued before join
+        -- jobs were created up front has no join yet while any of its jobs is running)
+        SELECT b.id INTO existing FROM public.job_batches b
+        WHERE b.project_id = project AND b.payload_hash = hash
+          AND EXISTS (
+              SELECT 1 FROM public.jobs j
+              WHERE (j.id = b.join_job_id AND j.status IN ('waiting', 'pending', 'processing'))
+                 OR (b.join_job_id IS NULL AND j.batch_id = b.id AND j.status IN ('pending', 'processing'))
+          )
+        ORDER BY b.created_at DESC LIMIT 1;
+    END IF;
+
+    IF existing IS NOT NULL THEN
+        RETURN QUERY SELECT b.id, FALSE, b.join_job_id FROM public.job_batches b WHERE b.id = existing;
+        RETURN;
+    END IF;
+
+    INSERT INTO public.job_batches (project_id, total, remaining, join_type, join_payload, join_lane, payload_hash, idempotency_key)
+    VALUES (project, jsonb_array_length(payloads), jsonb_array_length(payloads), join_type, join_payload, join_lane, hash, key)
+    RETURNING public.job_batches.id INTO batch;
+
+    -- The join is queued now but not claimable until complete_job releases it
+    IF join_type IS NOT NULL THEN
+        INSERT INTO public.jobs (project_id, type, payload, status, lane)
+        VALUES (project, join_type, join_payload, 'waiting', join_lane)
+        RETURNING public.jobs.id INTO join_id;
+        UPDATE public.job_batches b SET join_job_id = join_id WHERE b.id = batch;
+    END IF;
+
+    -- Same locks as enqueue_job takes for each job (in a fixed order), so no
+    -- standalone enqueue of the same work can slip in between
+    PERFORM pg_advisory_xact_lock(hashtext(concat_ws('/', project, job_type, h)))
+    FROM (SELECT DISTINCT h FROM unnest(payload_hashes) AS h WHERE h IS NOT NULL ORDER BY h) AS hashes;
+
+    WITH claimed AS (
+        UPDATE public.jobs j SET batch_id = batch
+        WHERE j.id IN (
+            SELECT a.id FROM public.jobs a
+            WHERE a.project_id = project AND a.type = job_type AND a.batch_id IS NULL
+              AND a.status IN ('pending', 'processing') AND a.payload_hash = ANY(payload_hashes)
+            FOR UPDATE
+        )
+        RETURNING j.payload_hash
+    )
+    SELECT COALESCE(array_agg(payload_hash), '{}') INTO adopted FROM claimed;
+
+    INSERT INTO public.jobs (project_id, type, payload, status, lane, batch_id, payload_hash)
+    SELECT project, job_type, p.payload, 'pending', job_lane, batch,
+           -- Work another batch is already running gets a duplicate job (the worker skips it if done)
+           CASE WHEN EXISTS (
+               SELECT 1 FROM public.jobs o
+               WHERE o.project_id = project AND o.type = job_type AND o.payload_hash = h.hash
+                 AND o.status IN ('pending', 'processing')
+           ) THEN NULL ELSE h.hash END
+    FROM jsonb_array_elements(payloads) WITH ORDINALITY AS p(payload, n)
+    LEFT JOIN unnest(payload_hashes) WITH ORDINALITY AS h(hash, n) ON h.n = p.n
+    WHERE h.hash IS NULL OR NOT h.hash = ANY(adopted)
+    ORDER BY p.n;
+
+    RETURN QUERY SELECT batch, TRUE, join_id;
+END;
+$$;
+
+-- Mark a job completed (only while it is still processing under worker's lease; worker
+-- NULL skips that check). For a batch job, count it off the batch; the completion that
+-- takes the batch to zero releases the waiting join job. The decrement locks the batch row, so
+-- of any number of clips finishing at once exactly one sees zero, and a retried or
+-- duplicate completion is ignored. Returns FALSE if the job was not ours to complete.
+CREATE OR REPLACE FUNCTION public.complete_job(job_id UUID, worker TEXT DEFAULT NULL)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    done_batch UUID;
+    left_in_batch INTEGER;
+    join_id UUID;
+BEGIN
+    UPDATE public.jobs
+    SET status = 'completed', lease_expires_at = NULL, updated_at = NOW()
+    WHERE id = job_id AND status = 'processing' AND (worker IS NULL OR worker_id = worker)
+    RETURNING batch_id INTO done_batch;
+    IF NOT FOUND THEN
+        RETURN FALSE;
+    END IF;
+
+    IF done_batch IS NOT NULL THEN
+        UPDATE public.job_batches SET remaining = remaining - 1
+        WHERE id = done_batch
+        RETURNING remaining INTO left_in_batch;
+
+        IF left_in_batch = 0 THEN
+            UPDATE public.jobs j SET status = 'pending', updated_at = NOW()
+            FROM public.job_batches b
+            WHERE b.id = done_batch AND j.id = b.join_job_id AND j.status = 'waiting';
+
+            -- Batches queued before join jobs were created up front
+            INSERT INTO public.jobs (project_id, type, payload, status, lane)
+            SELECT b.project_id, b.join_type, b.join_payload, 'pending', b.join_lane
+            FROM public.job_batches b
+            WHERE b.id = done_batch AND b.join_type IS NOT NULL AND b.join_job_id IS NULL
+            RETURNING id INTO join_id;
+            IF join_id IS NOT NULL THEN
+                UPDATE public.job_batches SET join_job_id = join_id WHERE id = done_batch;
+            END IF;
+        END IF;
+    END IF;
+    RETURN TRUE;
+END;
+$$;
+
+-- Mark a job failed (its handler raised), only while it is still processing under
+-- worker's lease (worker NULL skips that check): an attempt whose lease the reaper
+-- already handed on must not fail the retry. A failed batch job fails its join job
+-- (fail_batch_join below). Returns FALSE if the job was not ours to fail.
+CREATE OR REPLACE FUNCTION public.fail_job(job_id UUID, worker TEXT DEFAULT NULL, reason TEXT DEFAULT NULL)
+RETURNS BOOLEAN
+LANGUAGE sql
+AS $$
+    WITH failed AS (
+        UPDATE public.jobs
+        SET status = 'failed', error = reason, lease_expires_at = NULL, updated_at = NOW()
+        WHERE id = job_id AND status = 'processing' AND (worker IS NULL OR worker_id = worker)
+        RETURNING id
+    )
+    SELECT EXISTS (SELECT 1 FROM failed);
+$$;
+
+-- Queue wait per lane: what's waiting now, and percentiles of claimed_at - created_at
+-- for jobs claimed within `since`. Served by GET /queue/stats.
+CREATE OR REPLACE FUNCTION public.job_queue_stats(since INTERVAL DEFAULT INTERVAL '1 hour')
+RETURNS TABLE (
+    lane TEXT,
+    pending BIGINT,
+    processing BIGINT,
+    oldest_pending_seconds DOUBLE PRECISION,
+    claimed BIGINT,
+    wait_p50_seconds DOUBLE PRECISION,
+    wait_p95_seconds DOUBLE PRECISION,
+    wait_max_seconds DOUBLE PRECISION
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT l.lane,
+           COUNT(j.id) FILTER (WHERE j.status = 'pending'),
+           COUNT(j.id) FILTER (WHERE j.status = 'processing'),
+           EXTRACT(EPOCH FROM NOW() - MIN(j.created_at) FILTER (WHERE j.status = 'pending'))::DOUBLE PRECISION,
+           COUNT(j.id) FILTER (WHERE j.claimed_at >= NOW() - since),
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM j.claimed_at - j.created_at))
+               FILTER (WHERE j.claimed_at >= NOW() - since),
+           percentile_cont(0.95) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM j.claimed_at - j.created_at))
+               FILTER (WHERE j.claimed_at >= NOW() - since),
+           MAX(EXTRACT(EPOCH FROM j.claimed_at - j.created_at))
+               FILTER (WHERE j.claimed_at >= NOW() - since)::DOUBLE PRECISION
+    FROM public.job_lanes l
+    LEFT JOIN public.jobs j ON j.lane = l.lane
+        AND (j.status IN ('pending', 'processing') OR j.claimed_at >= NOW() - since)
+    GROUP BY l.lane, l.weight
+    ORDER BY l.weight DESC;
+$$;
+
+-- Wake idle workers (LISTEN jobs, see core/job_notifier.py) whenever a job becomes pending
+CREATE OR REPLACE FUNCTION public.notify_job_pending()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify('jobs', NEW.type);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS jobs_notify_pending ON public.jobs;
+CREATE TRIGGER jobs_notify_pending
+    AFTER INSERT OR UPDATE OF status ON public.jobs
+    FOR EACH ROW WHEN (NEW.status = 'pending')
+    EXECUTE FUNCTION public.notify_job_pending();
+
+-- A batch job that fails, or dies after its last attempt, can never count its batch
+-- down: fail the waiting join job instead, so whoever polls it sees the error, and put
+-- an analysing project back to UPLOADED so it can be analysed again
+CREATE OR REPLACE FUNCTION public.fail_batch_join()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    WITH failed AS (
+        UPDATE public.jobs j
+        SET status = 'failed', updated_at = NOW(),
+            error = 'Batch job ' || NEW.id || ' ' || NEW.status || COALESCE(': ' || NEW.error, '')
+        FROM public.job_batches b
+        WHERE b.id = NEW.batch_id AND j.id = b.join_job_id AND j.status = 'waiting'
+        RETURNING j.project_id, j.type
+    )
+    UPDATE public.projects p SET status = 'UPLOADED'
+    FROM failed
+    WHERE p.id = failed.project_id AND failed.type = 'finish_analysis' AND p.status = 'ANALYZING';
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS jobs_fail_batch_join ON public.jobs;
+CREATE TRIGGER jobs_fail_batch_join
+    AFTER UPDATE OF status ON public.jobs
+    FOR EACH ROW WHEN (NEW.status IN ('failed', 'dead') AND NEW.batch_id IS NOT NULL)
+    EXECUTE FUNCTION public.fail_batch_join();
+
 -- 6. Disable RLS for MVP testing
 ALTER TABLE public.projects DISABLE ROW LEVEL SECURITY;
 ALTER TABLE public.videos DISABLE ROW LEVEL SECURITY;
 ALTER TABLE public.results DISABLE ROW LEVEL SECURITY;
 ALTER TABLE public.user_roles DISABLE ROW LEVEL SECURITY;
 ALTER TABLE public.jobs DISABLE ROW LEVEL SECURITY;
+ALTER TABLE public.job_lanes DISABLE ROW LEVEL SECURITY;
+ALTER TABLE public.job_batches DISABLE ROW LEVEL SECURITY;
 
 -- 7. Basic Policies (Explicitly allow all for MVP testing)
 DROP POLICY IF EXISTS "Allow all for projects" ON public.projects;
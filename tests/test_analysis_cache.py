@@ -0,0 +1,78 @@
+import os
+import sys
+import tempfile
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.analysis_cache import ANALYSIS_VERSION, clips_needing_analysis
+from core.utils import file_fingerprint
+
+class AnalysisState:
+    """Stand-in for Database: fingerprints recorded at upload and the stored results."""
+
+    def __init__(self):
+        self.fingerprints = {}
+        self.results = {}
+        self.available = True
+
+    def upload(self, video_id, path):
+        self.fingerprints[video_id] = file_fingerprint(path)
+
+    def analyse(self, video_id, path):
+        self.results[video_id] = {"source_fingerprint": file_fingerprint(path), "analysis_version": ANALYSIS_VERSION}
+
+    def get_analysis_state(self, video_ids):
+        if not self.available:
+            return None
+        return ({v: self.fingerprints.get(v) for v in video_ids if v in self.fingerprints},
+                {v: self.results[v] for v in video_ids if v in self.results})
+
+def test_incremental_analysis():
+    print("Starting Incremental Analysis Test...")
+    db = AnalysisState()
+    with tempfile.TemporaryDirectory() as tmp:
+        clips = []
+        for i in range(20):
+            path = os.path.join(tmp, f"clip-{i}.mp4")
+            with open(path, "wb") as f:
+                f.write(os.urandom(4096))
+            clips.append((f"clip-{i}", path))
+
+        # 1. A project of 19 analysed clips gets a 20th: only the new one is analysed
+        print("Step 1: Adding a clip to an analysed project")
+        for video_id, path in clips:
+            db.upload(video_id, path)
+        for video_id, path in clips[:19]:
+            db.analyse(video_id, path)
+        video_ids = [video_id for video_id, _ in clips]
+        assert clips_needing_analysis(db, video_ids) == ["clip-19"]
+        db.analyse(*clips[19])
+        assert clips_needing_analysis(db, video_ids) == []
+
+        # 2. A clip whose source changed since its result was produced is analysed again
+        print("Step 2: Re-analysing a replaced source")
+        with open(clips[3][1], "ab") as f:
+            f.write(b"re-export")
+        db.upload(*clips[3])
+        assert clips_needing_analysis(db, video_ids) == ["clip-3"]
+
+        # 3. Results from an older pipeline, and clips uploaded before fingerprints existed
+        print("Step 3: Result versions and legacy clips")
+        db.results["clip-5"]["analysis_version"] = ANALYSIS_VERSION - 1
+        del db.fingerprints["clip-7"]
+        assert clips_needing_analysis(db, video_ids) == ["clip-3", "clip-5"]
+
+        # 4. When the state can't be read, analyse everything rather than skip
+        print("Step 4: Falling back to a full analysis")
+        db.available = False
+        assert clips_needing_analysis(db, video_ids) == video_ids
+
+    print("Incremental Analysis Test Passed!")
+
+if __name__ == "__main__":
+    try:
+        test_incremental_analysis()
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
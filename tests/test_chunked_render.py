@@ -0,0 +1,142 @@
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+import pytest
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.video_renderer import VideoRenderer
+from core.render_profiles import get_render_profile
+from core.utils import ffmpeg_available, probe_media
+
+def count_frames(path):
+    out = subprocess.run([
+        "ffprobe", "-v", "error", "-count_frames", "-select_streams", "v:0",
+        "-show_entries", "stream=nb_read_frames", "-of", "csv=p=0", path
+    ], capture_output=True, text=True, check=True).stdout
+    return int(out.strip())
+
+def test_chunk_core_budget():
+    print("Starting Chunk Core Budget Test...")
+    renderer = VideoRenderer(output_dir=tempfile.mkdtemp(prefix="chunk_budget_test_"), backend="ffmpeg")
+    try:
+        renderer._render_profile = get_render_profile("final")
+        segments = [{"path": "take.mp4", "start": 0.0, "end": 5.0, "width": 1920, "height": 1080, "has_audio": True}]
+
+        # 1. Without a slot grant the profile's threads are split between the chunk encoders
+        print("Step 1: Splitting the profile's threads")
+        renderer.chunk_workers = 4
+        _, threads, workers, _ = renderer._segment_encoding(segments)
+        assert (workers, threads) == (4, 1)
+        renderer.chunk_workers = 8
+        _, threads, workers, _ = renderer._segment_encoding(segments)
+        assert (workers, threads) == (4, 1), "Never more encoders than cores"
+
+        # 2. The job slot's grant replaces it
+        print("Step 2: Splitting the slot's core grant")
+        renderer.chunk_workers = 4
+        renderer.core_budget = 8
+        _, threads, workers, _ = renderer._segment_encoding(segments)
+        assert (workers, threads) == (4, 2)
+        renderer.core_budget = 2
+        _, threads, workers, _ = renderer._segment_encoding(segments)
+        assert (workers, threads) == (2, 1)
+
+        # 3. A single encoder keeps the profile's threads, within the grant
+        print("Step 3: Single encoder threads")
+        renderer.chunk_workers = 1
+        _, threads, workers, _ = renderer._segment_encoding(segments)
+        assert (workers, threads) == (1, 2)
+        renderer.core_budget = None
+        _, threads, workers, _ = renderer._segment_encoding(segments)
+        assert (workers, threads) == (1, 4)
+
+        print("Chunk Core Budget Test Passed!")
+    finally:
+        shutil.rmtree(renderer.output_dir, ignore_errors=True)
+
+def test_chunked_render():
+    print("Starting Chunked Render Test...")
+    if not ffmpeg_available():
+        pytest.skip("ffmpeg not installed")
+
+    work_dir = tempfile.mkdtemp(prefix="chunked_render_test_")
+    try:
+        uploads_dir = os.path.join(work_dir, "uploads")
+        os.makedirs(uploads_dir)
+        # 30fps source with a keyframe every 1.5s; the render is 24fps
+        subprocess.run([
+            "ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=duration=40:size=640x360:rate=30",
+            "-f", "lavfi", "-i", "sine=frequency=440:duration=40", "-shortest",
+            "-c:v", "libx264", "-preset", "ultrafast", "-g", "45", "-pix_fmt", "yuv420p", "-c:a", "aac",
+            "-y", os.path.join(uploads_dir, "take.mp4")
+        ], check=True)
+        # Cut off the source frame grid, so the chunks start between source frames
+        edl = [{"video_id": "take", "start_time": 3.3, "end_time": 38.0}]
+        expected_frames = round((38.0 - 3.3) * 24)
+
+        renderer = VideoRenderer(output_dir=os.path.join(work_dir, "renders"), uploads_dir=uploads_dir, backend="ffmpeg")
+        renderer.segment_cache = None
+        renderer.chunk_workers = 2
+        renderer.core_budget = 2
+
+        # 1. Chunks are encoded in parallel without the segment cache
+        print("Step 1: Rendering chunked without the segment cache")
+        encodes = []
+        render_segment = renderer.ffmpeg_renderer.render_segment
+        def recording_render_segment(*args, **kwargs):
+            encodes.append((args[0]["start"], args[0]["end"], kwargs["threads"]))
+            return render_segment(*args, **kwargs)
+        renderer.ffmpeg_renderer.render_segment = recording_render_segment
+        output_path = renderer.render_video(edl, "chunked.mp4", profile="draft")
+        assert output_path and os.path.exists(output_path)
+        assert renderer.last_render_stats["backend"] == "ffmpeg"
+        assert len(encodes) > 1, "The take must be split into chunks"
+        assert all(threads == 1 for _, _, threads in encodes)
+        assert not [name for name in os.listdir(renderer.output_dir) if name.startswith("segments_")], \
+            "Scratch encodes are removed after the render"
+
+        # 2. The chunks add up to exactly the frames of the cut
+        print("Step 2: Verifying the frame count")
+        frames = count_frames(output_path)
+        print(f"Chunks: {[(round(start, 3), round(end, 3)) for start, end, _ in encodes]}, frames: {frames}")
+        assert frames == expected_frames, f"Expected {expected_frames} frames, got {frames}"
+        assert abs(probe_media(output_path)["duration"] - (38.0 - 3.3)) < 0.1
+
+        # 3. Same frame count as the single-encoder render
+        print("Step 3: Comparing with a single encoder")
+        renderer.chunk_workers = 1
+        output_path = renderer.render_video(edl, "single.mp4", profile="draft")
+        assert count_frames(output_path) == expected_frames
+
+        # 4. Each segment's audio lasts exactly as long as its frames
+        print("Step 4: Verifying segment audio length")
+        segment = {"path": os.path.join(uploads_dir, "take.mp4"), "start": 3.3, "end": 4.61,
+                   "width": 640, "height": 360, "has_audio": True}
+        segment_path = renderer.ffmpeg_renderer.render_segment(segment, os.path.join(work_dir, "segment.mkv"),
+                                                               width=640, height=360, fps=24, threads=1)
+        pcm = subprocess.run(["ffmpeg", "-v", "error", "-i", segment_path, "-map", "0:a", "-f", "s16le", "-ac", "2", "-"],
+                             capture_output=True, check=True).stdout
+        frames = round((4.61 - 3.3) * 24)
+        assert count_frames(segment_path) == frames
+        assert len(pcm) // 4 == round(frames * renderer.ffmpeg_renderer.AUDIO_RATE / 24), \
+            f"{len(pcm) // 4} samples for {frames} frames"
+
+        print("Chunked Render Test Passed!")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    try:
+        for test in (test_chunk_core_budget, test_chunked_render):
+            try:
+                test()
+            except pytest.skip.Exception as e:
+                print(f"Skipped {test.__name__}: {e}")
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
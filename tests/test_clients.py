@@ -0,0 +1,68 @@
+import os
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class PostgrestHandler(BaseHTTPRequestHandler):
+    """Stands in for Supabase's REST endpoint and records which connection each request arrived on."""
+    protocol_version = "HTTP/1.1"
+    connections = []
+
+    def do_GET(self):
+        self.connections.append(self.client_address)
+        body = json.dumps([{"storage_path": "uploads/clip.mov"}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_shared_clients():
+    print("Starting Shared Client Pool Test...")
+    pytest.importorskip("supabase")
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PostgrestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["SUPABASE_KEY"] = "test-key"
+    
+    try:
+        from core.database import Database
+        from core.storage import Storage
+        
+        # 1. Every Database and Storage in the process shares one client
+        print("Step 1: Creating several Database and Storage instances")
+        databases = [Database(), Database()]
+        storage = Storage()
+        assert databases[0].client is databases[1].client is storage.client
+        
+        # 2. Queries reuse one kept-alive connection instead of reconnecting
+        print("Step 2: Running queries from every instance")
+        for _ in range(5):
+            for db in databases:
+                assert db.get_video_storage_path("clip") == "uploads/clip.mov"
+        print(f"{len(PostgrestHandler.connections)} requests over {len(set(PostgrestHandler.connections))} connection(s)")
+        assert len(PostgrestHandler.connections) == 10
+        assert len(set(PostgrestHandler.connections)) == 1
+        
+        print("Shared Client Pool Test Passed!")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    try:
+        test_shared_clients()
+    except pytest.skip.Exception as e:
+        print(f"Skipped: {e}")
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
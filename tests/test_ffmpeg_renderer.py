@@ -0,0 +1,138 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.video_renderer import VideoRenderer
+from core.utils import probe_media, ffmpeg_available
+
+def test_ffmpeg_backend():
+    print("Starting FFmpeg Render Backend Test...")
+    if not ffmpeg_available():
+        pytest.skip("ffmpeg not installed")
+    
+    test_video = "test_video.mp4"
+    if not os.path.exists(test_video):
+        print("Creating dummy test video...")
+        subprocess.run([
+            "ffmpeg", "-f", "lavfi", "-i", "testsrc=duration=2:size=1280x720:rate=24",
+            "-c:v", "libx264", "-y", test_video
+        ], check=True)
+    
+    renderer = VideoRenderer(output_dir="outputs/test_renders", uploads_dir=".", backend="ffmpeg")
+    
+    # 1. Two cuts from the same take, concatenated in one ffmpeg call
+    print("Step 1: Rendering two-cut EDL with the ffmpeg backend")
+    edl = [
+        {"video_id": "test_video", "start_time": 0.0, "end_time": 1.0},
+        {"video_id": "test_video", "start_time": 2.0, "end_time": 3.5}
+    ]
+    output_path = renderer.render_video(edl, "ffmpeg_backend_test.mp4")
+    assert output_path and os.path.exists(output_path), "Render failed to produce output"
+    
+    stats = renderer.last_render_stats
+    print(f"Render stats: {stats}")
+    assert stats["backend"] == "ffmpeg", f"Expected ffmpeg backend, got {stats['backend']}"
+    
+    # 2. Verify PRD 12. Free Tier - 720p and the concatenated duration
+    info = probe_media(output_path)
+    print(f"Output: {info['width']}x{info['height']}, {info['duration']}s")
+    assert info["height"] == 720
+    assert abs(info["duration"] - 2.5) < 0.2, f"Expected ~2.5s, got {info['duration']}s"
+    
+    print("FFmpeg Render Backend Test Passed!")
+
+def test_draft_stream_copy():
+    print("Starting Draft Stream-Copy Test...")
+    if not ffmpeg_available():
+        pytest.skip("ffmpeg not installed")
+    
+    # H.264/AAC 720p take with a keyframe every second, so draft cuts can be copied
+    take_path = "outputs/test_renders/stream_copy_take.mp4"
+    os.makedirs(os.path.dirname(take_path), exist_ok=True)
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=duration=10:size=1280x720:rate=24",
+        "-f", "lavfi", "-i", "sine=frequency=440:duration=10",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-g", "24", "-c:a", "aac", "-shortest", "-y", take_path
+    ], check=True)
+    
+    renderer = VideoRenderer(output_dir="outputs/test_renders", uploads_dir="outputs/test_renders", backend="ffmpeg")
+    
+    # Whole take plus a cut that starts mid-GOP (forces one boundary re-encode)
+    edl = [
+        {"video_id": "stream_copy_take", "start_time": 0.0, "end_time": None},
+        {"video_id": "stream_copy_take", "start_time": 3.5, "end_time": 6.0}
+    ]
+    parts = renderer.ffmpeg_renderer.plan_stream_copy([
+        dict(probe_media(take_path), path=take_path, start=3.5, end=6.0)
+    ], snap_tolerance=0.2)
+    print(f"Planned parts: {[(p['start'], p['end'], p['copy']) for p in parts]}")
+    assert [p["copy"] for p in parts] == [False, True], "Mid-GOP cut should re-encode only the boundary GOP"
+    
+    output_path = renderer.render_video(edl, "stream_copy_draft.mp4", is_draft=True)
+    info = probe_media(output_path)
+    print(f"Draft: {info['width']}x{info['height']}, {info['duration']}s")
+    # 3.5s sits within the default snap tolerance of the 3.0s keyframe, so 12.5-13.0s is expected
+    assert 12.4 <= info["duration"] <= 13.3, f"Expected 12.5-13.0s, got {info['duration']}s"
+    
+    print("Draft Stream-Copy Test Passed!")
+
+def test_music_bed():
+    print("Starting Music Bed Test...")
+    if not ffmpeg_available():
+        pytest.skip("ffmpeg not installed")
+    
+    # 10s take with audio and a 2s track, so the bed has to loop under the whole render
+    take_path = "outputs/test_renders/music_take.mp4"
+    music_path = "outputs/test_renders/music_track.wav"
+    os.makedirs(os.path.dirname(take_path), exist_ok=True)
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=duration=10:size=640x360:rate=24",
+        "-f", "lavfi", "-i", "sine=frequency=440:duration=10",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", "-y", take_path
+    ], check=True)
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-f", "lavfi", "-i", "sine=frequency=220:duration=2:sample_rate=22050",
+        "-y", music_path
+    ], check=True)
+    
+    renderer = VideoRenderer(output_dir="outputs/test_renders", uploads_dir="outputs/test_renders", backend="ffmpeg")
+    edl = [{"video_id": "music_take", "start_time": 0.0, "end_time": None}]
+    
+    # 1. Music is looped, ducked and mixed inside the graph
+    print("Step 1: Rendering with a background track")
+    output_path = renderer.render_video(edl, "music_bed_test.mp4", bg_music_path=music_path)
+    info = probe_media(output_path)
+    print(f"Output: {info['duration']}s, audio {info['audio_codec']} {info['sample_rate']}Hz")
+    assert info["has_audio"] and abs(info["duration"] - 10.0) < 0.2, f"Expected ~10s with audio, got {info['duration']}s"
+    
+    # 2. The resampled bed is cached per track and reused
+    print("Step 2: Verifying the music bed is cached")
+    bed_path = renderer._music_bed(music_path)
+    assert bed_path != music_path and bed_path.endswith(".wav"), "Music bed should come from the cache"
+    assert renderer._music_bed(music_path) == bed_path, "Same track should hit the same bed"
+    bed = probe_media(bed_path)
+    assert bed["sample_rate"] == renderer.ffmpeg_renderer.AUDIO_RATE and bed["channels"] == 2
+
+    # 3. The loop buffer is sized to the track, not to the largest possible one
+    print("Step 3: Verifying the loop buffer size")
+    samples = renderer.ffmpeg_renderer.music_loop_samples(bed_path)
+    print(f"Loop buffer: {samples} samples")
+    assert 2 * bed["sample_rate"] <= samples <= 4 * bed["sample_rate"], "A 2s track needs ~2s of loop buffer"
+    
+    print("Music Bed Test Passed!")
+
+if __name__ == "__main__":
+    try:
+        for test in (test_ffmpeg_backend, test_draft_stream_copy, test_music_bed):
+            try:
+                test()
+            except pytest.skip.Exception as e:
+                print(f"Skipped {test.__name__}: {e}")
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
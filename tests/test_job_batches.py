@@ -0,0 +1,224 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+CLIPS = 20
+WORKERS = 8
+
+def test_batch_join():
+    """Runs the batch functions from supabase_setup.sql against DATABASE_URL (a scratch schema)."""
+    print("Starting Job Batch Join Test...")
+    psycopg2 = pytest.importorskip("psycopg2")
+    dsn = os.environ.get("DATABASE_URL")
+    if not dsn:
+        pytest.skip("needs DATABASE_URL")
+
+    from benchmark_job_claim import SCHEMA, load_schema_sql
+
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    try:
+        cur.execute(load_schema_sql())
+        cur.execute(f"INSERT INTO {SCHEMA}.projects (name) VALUES ('batch') RETURNING id")
+        project_id = cur.fetchone()[0]
+
+        # 1. One job per clip, enqueued together
+        print(f"Step 1: Enqueuing a batch of {CLIPS} clip jobs")
+        payloads = "[" + ",".join(f'{{"video_ids": ["clip-{i}"]}}' for i in range(CLIPS)) + "]"
+        cur.execute(f"SELECT id, created, join_job_id FROM {SCHEMA}.enqueue_job_batch(%s, 'analyze', %s::jsonb, 'bulk', 'finish_analysis')",
+                    (project_id, payloads))
+        batch_id, created, join_id = cur.fetchone()
+        assert created
+        cur.execute(f"SELECT COUNT(*) FROM {SCHEMA}.jobs WHERE batch_id = %s AND status = 'pending'", (batch_id,))
+        assert cur.fetchone()[0] == CLIPS
+        cur.execute(f"SELECT status FROM {SCHEMA}.jobs WHERE id = %s", (join_id,))
+        assert cur.fetchone()[0] == "waiting", "The join is queued up front but not claimable yet"
+
+        # 2. Workers claim and complete clips concurrently; the last completion enqueues the join
+        print(f"Step 2: Completing clips from {WORKERS} concurrent workers")
+        start = threading.Barrier(WORKERS)
+        completed = []
+
+        def worker(name):
+            worker_conn = psycopg2.connect(dsn)
+            worker_conn.autocommit = True
+            with worker_conn.cursor() as worker_cur:
+                start.wait()
+                while True:
+                    worker_cur.execute(f"SELECT id FROM {SCHEMA}.claim_jobs(1, ARRAY['analyze'], %s)", (name,))
+                    row = worker_cur.fetchone()
+                    if not row:
+                        break
+                    worker_cur.execute(f"SELECT {SCHEMA}.complete_job(%s, %s)", (row[0], name))
+                    if worker_cur.fetchone()[0]:
+                        completed.append(row[0])
+            worker_conn.close()
+
+        threads = [threading.Thread(target=worker, args=(f"worker-{i}",)) for i in range(WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(completed) == CLIPS
+
+        cur.execute(f"SELECT id, lane, status FROM {SCHEMA}.jobs WHERE type = 'finish_analysis'")
+        joins = cur.fetchall()
+        print(f"Join jobs: {joins}")
+        assert len(joins) == 1, "The join must be enqueued exactly once"
+        assert joins[0] == (join_id, "interactive", "pending"), "The last completion releases the join"
+        cur.execute(f"SELECT remaining, join_job_id FROM {SCHEMA}.job_batches WHERE id = %s", (batch_id,))
+        assert cur.fetchone() == (0, joins[0][0])
+
+        # 3. A duplicate completion (e.g. after a lost lease) changes nothing
+        print("Step 3: Ignoring a duplicate completion")
+        cur.execute(f"SELECT {SCHEMA}.complete_job(%s)", (completed[0],))
+        assert cur.fetchone()[0] is False
+        cur.execute(f"SELECT COUNT(*) FROM {SCHEMA}.jobs WHERE type = 'finish_analysis'")
+        assert cur.fetchone()[0] == 1
+
+        # 4. A clip job that dies fails the join, and the project can be analysed again
+        print("Step 4: Failing the join when a clip job dies")
+        cur.execute(f"UPDATE {SCHEMA}.projects SET status = 'ANALYZING' WHERE id = %s", (project_id,))
+        cur.execute(f"SELECT id, join_job_id FROM {SCHEMA}.enqueue_job_batch(%s, 'analyze', %s::jsonb, 'bulk', 'finish_analysis')",
+                    (project_id, '[{"video_ids": ["a"]}, {"video_ids": ["b"]}]'))
+        failing_batch, failing_join = cur.fetchone()
+        cur.execute(f"UPDATE {SCHEMA}.jobs SET max_attempts = 1 WHERE batch_id = %s", (failing_batch,))
+        cur.execute(f"SELECT id FROM {SCHEMA}.claim_jobs(1, ARRAY['analyze'], 'worker-a')")
+        dying = cur.fetchone()[0]
+        cur.execute(f"SELECT status FROM {SCHEMA}.release_job(%s, 'worker-a', 'exit code -9')", (dying,))
+        assert cur.fetchone()[0] == "dead"
+        cur.execute(f"SELECT status, error FROM {SCHEMA}.jobs WHERE id = %s", (failing_join,))
+        status, error = cur.fetchone()
+        print(f"Join after a dead clip job: {status} ({error})")
+        assert status == "failed" and "exit code -9" in error
+        cur.execute(f"SELECT status FROM {SCHEMA}.projects WHERE id = %s", (project_id,))
+        assert cur.fetchone()[0] == "UPLOADED"
+        cur.execute(f"SELECT id FROM {SCHEMA}.claim_jobs(1, ARRAY['analyze'], 'worker-a')")
+        survivor = cur.fetchone()[0]
+        cur.execute(f"SELECT {SCHEMA}.complete_job(%s, 'worker-a')", (survivor,))
+        cur.execute(f"SELECT status FROM {SCHEMA}.jobs WHERE id = %s", (failing_join,))
+        assert cur.fetchone()[0] == "failed", "A failed join is never released"
+    finally:
+        cur.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+        conn.close()
+
+    print("Job Batch Join Test Passed!")
+
+def test_batch_adopts_queued_jobs():
+    """A batch waits for matching jobs already queued on their own (eager analysis at upload)."""
+    print("Starting Job Batch Adoption Test...")
+    psycopg2 = pytest.importorskip("psycopg2")
+    dsn = os.environ.get("DATABASE_URL")
+    if not dsn:
+        pytest.skip("needs DATABASE_URL")
+
+    import json
+    from benchmark_job_claim import SCHEMA, load_schema_sql
+    from core.utils import payload_hash
+
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+
+    def enqueue_clip(project_id, video_id):
+        payload = {"video_id": video_id}
+        cur.execute(f"SELECT id FROM {SCHEMA}.enqueue_job(%s, 'analyze', %s, 'bulk', 0, %s)",
+                    (project_id, json.dumps(payload), payload_hash(payload)))
+        return cur.fetchone()[0]
+
+    def enqueue_batch(cursor, project_id, video_ids):
+        payloads = [{"video_id": video_id} for video_id in video_ids]
+        cursor.execute(f"SELECT id FROM {SCHEMA}.enqueue_job_batch(%s, 'analyze', %s, 'bulk', 'finish_analysis', "
+                       f"'{{}}', 'interactive', %s, NULL, %s)",
+                       (project_id, json.dumps(payloads), payload_hash(payloads), [payload_hash(p) for p in payloads]))
+        return cursor.fetchone()[0]
+
+    try:
+        cur.execute(load_schema_sql())
+        cur.execute(f"INSERT INTO {SCHEMA}.projects (name) VALUES ('eager') RETURNING id")
+        project_id = cur.fetchone()[0]
+
+        # 1. Clips 0-2 were queued at upload (0 is running); analyze adds only clip 3
+        print("Step 1: Adopting clips queued at upload")
+        eager = [enqueue_clip(project_id, f"clip-{i}") for i in range(3)]
+        cur.execute(f"SELECT id FROM {SCHEMA}.claim_jobs(1, NULL, 'worker-a')")
+        running = cur.fetchone()[0]
+        batch_id = enqueue_batch(cur, project_id, [f"clip-{i}" for i in range(4)])
+        cur.execute(f"SELECT id FROM {SCHEMA}.jobs WHERE batch_id = %s", (batch_id,))
+        batch_jobs = {row[0] for row in cur.fetchall()}
+        assert set(eager) < batch_jobs and len(batch_jobs) == 4, "Queued clips are adopted, not duplicated"
+
+        # 2. Completing them all (the running one included) enqueues the join once
+        print("Step 2: Joining over adopted and new jobs")
+        cur.execute(f"SELECT {SCHEMA}.complete_job(%s, 'worker-a')", (running,))
+        while True:
+            cur.execute(f"SELECT id FROM {SCHEMA}.claim_jobs(1, ARRAY['analyze'], 'worker-b')")
+            row = cur.fetchone()
+            if not row:
+                break
+            cur.execute(f"SELECT {SCHEMA}.complete_job(%s, 'worker-b')", (row[0],))
+        cur.execute(f"SELECT COUNT(*) FROM {SCHEMA}.jobs WHERE type = 'finish_analysis'")
+        assert cur.fetchone()[0] == 1
+
+        # 3. A clip finishing just as analyze is called is either counted off the batch or
+        #    not adopted (and queued again); the batch never waits on a job it can't see finish
+        print("Step 3: Racing adoption against completion")
+        other = psycopg2.connect(dsn)
+        other.autocommit = True
+        other_cur = other.cursor()
+        for i in range(20):
+            cur.execute(f"INSERT INTO {SCHEMA}.projects (name) VALUES ('race') RETURNING id")
+            race_project = cur.fetchone()[0]
+            job_id = enqueue_clip(race_project, "clip")
+            cur.execute(f"UPDATE {SCHEMA}.jobs SET status = 'processing', worker_id = 'w' WHERE id = %s", (job_id,))
+            start = threading.Barrier(2)
+            batch = []
+
+            def complete():
+                start.wait()
+                other_cur.execute(f"SELECT {SCHEMA}.complete_job(%s, 'w')", (job_id,))
+
+            def analyze():
+                start.wait()
+                batch_conn = psycopg2.connect(dsn)
+                batch_conn.autocommit = True
+                batch.append(enqueue_batch(batch_conn.cursor(), race_project, ["clip"]))
+                batch_conn.close()
+
+            threads = [threading.Thread(target=complete), threading.Thread(target=analyze)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            cur.execute(f"SELECT remaining FROM {SCHEMA}.job_batches WHERE id = %s", (batch[0],))
+            remaining = cur.fetchone()[0]
+            cur.execute(f"SELECT COUNT(*) FROM {SCHEMA}.jobs WHERE batch_id = %s AND status <> 'completed'", (batch[0],))
+            assert remaining == cur.fetchone()[0], "Batch count out of step with its jobs"
+        other.close()
+    finally:
+        cur.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+        conn.close()
+
+    print("Job Batch Adoption Test Passed!")
+
+if __name__ == "__main__":
+    try:
+        for test in (test_batch_join, test_batch_adopts_queued_jobs):
+            try:
+                test()
+            except pytest.skip.Exception as e:
+                print(f"Skipped {test.__name__}: {e}")
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,124 @@
+import os
+import sys
+import json
+import threading
+
+import pytest
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from core.utils import payload_hash
+
+CLICKS = 8
+
+def test_payload_hash():
+    print("Starting Payload Hash Test...")
+    a = {"video_ids": ["a", "b"], "is_draft": True, "reference_script": None}
+    b = {"reference_script": None, "is_draft": True, "video_ids": ["a", "b"]}
+    assert payload_hash(a) == payload_hash(b), "Key order must not matter"
+    assert payload_hash(a) != payload_hash(dict(a, is_draft=False))
+    assert payload_hash(a) != payload_hash(dict(a, video_ids=["b", "a"])), "Clip order is part of the request"
+    print("Payload Hash Test Passed!")
+
+def test_enqueue_coalescing():
+    """Runs enqueue_job / enqueue_job_batch from supabase_setup.sql against DATABASE_URL (a scratch schema)."""
+    print("Starting Enqueue Coalescing Test...")
+    psycopg2 = pytest.importorskip("psycopg2")
+    dsn = os.environ.get("DATABASE_URL")
+    if not dsn:
+        pytest.skip("needs DATABASE_URL")
+
+    from benchmark_job_claim import SCHEMA, load_schema_sql
+
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    try:
+        cur.execute(load_schema_sql())
+        cur.execute(f"INSERT INTO {SCHEMA}.projects (name) VALUES ('dedupe') RETURNING id")
+        project_id = cur.fetchone()[0]
+        render = {"video_ids": ["a", "b"], "is_draft": False}
+
+        def enqueue(payload, key=None, cursor=None):
+            (cursor or cur).execute(
+                f"SELECT id, created FROM {SCHEMA}.enqueue_job(%s, 'render', %s, 'final', 0, %s, %s)",
+                (project_id, json.dumps(payload), payload_hash(payload), key)
+            )
+            return (cursor or cur).fetchone()
+
+        # 1. Simultaneous clicks on render queue exactly one job
+        print(f"Step 1: {CLICKS} simultaneous render requests")
+        start = threading.Barrier(CLICKS)
+        results = []
+
+        def click():
+            click_conn = psycopg2.connect(dsn)
+            click_conn.autocommit = True
+            with click_conn.cursor() as click_cur:
+                start.wait()
+                results.append(enqueue(render, cursor=click_cur))
+            click_conn.close()
+
+        threads = [threading.Thread(target=click) for _ in range(CLICKS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len({job_id for job_id, _ in results}) == 1
+        assert sum(created for _, created in results) == 1
+        job_id = results[0][0]
+
+        # 2. Still coalesced while running; a different request is its own job
+        print("Step 2: Coalescing while running, not across different requests")
+        cur.execute(f"UPDATE {SCHEMA}.jobs SET status = 'processing' WHERE id = %s", (job_id,))
+        assert enqueue(render) == (job_id, False)
+        draft_id, created = enqueue(dict(render, is_draft=True))
+        assert created and draft_id != job_id
+
+        # 3. Once finished, the same request renders again; an idempotency key still returns the original
+        print("Step 3: Re-running a finished request, replaying an idempotency key")
+        keyed_id, created = enqueue({"video_ids": ["c"]}, key="client-request-1")
+        assert created
+        cur.execute(f"UPDATE {SCHEMA}.jobs SET status = 'completed' WHERE id IN (%s, %s)", (job_id, keyed_id))
+        rerun_id, created = enqueue(render)
+        assert created and rerun_id != job_id
+        assert enqueue({"video_ids": ["c"]}, key="client-request-1") == (keyed_id, False)
+
+        # 4. Re-triggering analysis returns the batch still running
+        print("Step 4: Coalescing analysis batches")
+        payloads = [{"video_ids": ["a"]}, {"video_ids": ["b"]}]
+        batch_hash = payload_hash({"payloads": payloads})
+
+        def enqueue_batch():
+            cur.execute(f"SELECT id, created FROM {SCHEMA}.enqueue_job_batch(%s, 'analyze', %s, 'bulk', 'finish_analysis', "
+                        f"'{{}}', 'interactive', %s)", (project_id, json.dumps(payloads), batch_hash))
+            return cur.fetchone()
+
+        batch_id, created = enqueue_batch()
+        assert created
+        assert enqueue_batch() == (batch_id, False)
+        cur.execute(f"SELECT COUNT(*) FROM {SCHEMA}.jobs WHERE type = 'analyze'")
+        assert cur.fetchone()[0] == 2
+        cur.execute(f"UPDATE {SCHEMA}.jobs SET status = 'completed' WHERE batch_id = %s OR id = "
+                    f"(SELECT join_job_id FROM {SCHEMA}.job_batches WHERE id = %s)", (batch_id, batch_id))
+        assert enqueue_batch()[1], "A finished batch is not reused"
+    finally:
+        cur.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+        conn.close()
+
+    print("Enqueue Coalescing Test Passed!")
+
+if __name__ == "__main__":
+    try:
+        for test in (test_payload_hash, test_enqueue_coalescing):
+            try:
+                test()
+            except pytest.skip.Exception as e:
+                print(f"Skipped {test.__name__}: {e}")
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
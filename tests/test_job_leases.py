@@ -0,0 +1,181 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.job_slots import ResourceSlots
+from core.job_processes import JobProcessPool
+from core.job_leases import LeaseKeeper
+
+RESOURCES = {"render": {"cores": 1, "memory_mb": 16}}
+
+def sleep_job(job):
+    """Child process target: stand-in for a long job."""
+    time.sleep(job["payload"]["seconds"])
+
+class LeaseTable:
+    """Stand-in for Database: the jobs this worker still holds a lease on."""
+
+    def __init__(self):
+        self.held = set()
+        self.renewals = []
+        self.reachable = True
+
+    def renew_job_leases(self, job_ids, worker_id, lease_seconds=None):
+        self.renewals.append(list(job_ids))
+        if not self.reachable:
+            return None
+        return self.held & set(job_ids)
+
+    def reclaim_expired_jobs(self, backoff_seconds=None, lease_seconds=None):
+        return []
+
+def test_lease_keeper():
+    print("Starting Lease Keeper Test...")
+    db = LeaseTable()
+    pool = JobProcessPool(ResourceSlots(cores=4, memory_mb=64, resources=RESOURCES), sleep_job)
+    keeper = LeaseKeeper(db, pool, "worker-a", lease_seconds=3)
+    jobs = [{"id": f"job-{i}", "type": "render", "payload": {"seconds": 30}} for i in range(2)]
+    for job in jobs:
+        assert pool.start(job)
+    db.held = {"job-0", "job-1"}
+
+    # 1. Running jobs are renewed together
+    print("Step 1: Renewing held leases")
+    assert keeper.heartbeat() == []
+    assert sorted(db.renewals[-1]) == ["job-0", "job-1"]
+
+    # 2. A failed renewal (database unreachable) stops nothing
+    print("Step 2: Riding out an unreachable database")
+    db.reachable = False
+    assert keeper.heartbeat() == []
+    assert len(pool.running_jobs()) == 2
+    db.reachable = True
+
+    # 3. A job reclaimed by the reaper is stopped here, so it never runs twice
+    print("Step 3: Stopping a job whose lease was lost")
+    db.held = {"job-1"}
+    assert keeper.heartbeat() == ["job-0"]
+    deadline = time.monotonic() + 5
+    exited = []
+    while not exited and time.monotonic() < deadline:
+        exited = pool.reap()
+        time.sleep(0.05)
+    assert [job["id"] for job, _ in exited] == ["job-0"]
+    assert exited[0][1] != 0
+
+    pool.terminate("job-1")
+    pool.join()
+    pool.reap()
+    print("Lease Keeper Test Passed!")
+
+def test_lease_sql():
+    """Runs the lease functions from supabase_setup.sql against DATABASE_URL (a scratch schema)."""
+    print("Starting Lease SQL Test...")
+    psycopg2 = pytest.importorskip("psycopg2")
+    dsn = os.environ.get("DATABASE_URL")
+    if not dsn:
+        pytest.skip("needs DATABASE_URL")
+
+    sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+    from benchmark_job_claim import SCHEMA, load_schema_sql
+
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    try:
+        cur.execute(load_schema_sql())
+        cur.execute(f"INSERT INTO {SCHEMA}.jobs (type, payload, max_attempts) VALUES ('render', '{{}}', 2) RETURNING id")
+        job_id = cur.fetchone()[0]
+
+        def claim(worker):
+            cur.execute(f"SELECT id, attempts FROM {SCHEMA}.claim_jobs(1, NULL, %s, 1)", (worker,))
+            return cur.fetchall()
+
+        def job():
+            cur.execute(f"SELECT status, worker_id, attempts, run_after > NOW() FROM {SCHEMA}.jobs WHERE id = %s", (job_id,))
+            return cur.fetchone()
+
+        # 1. Only the lease holder can renew
+        print("Step 1: Claiming and renewing a lease")
+        assert claim("worker-a") == [(job_id, 1)]
+        cur.execute(f"SELECT * FROM {SCHEMA}.renew_job_leases(%s::uuid[], 'worker-b', 1)", ([job_id],))
+        assert cur.fetchall() == []
+        cur.execute(f"SELECT * FROM {SCHEMA}.renew_job_leases(%s::uuid[], 'worker-a', 1)", ([job_id],))
+        assert cur.fetchall() == [(job_id,)]
+
+        # 2. The reaper returns an expired job to the queue with a backoff
+        print("Step 2: Reclaiming an expired lease")
+        cur.execute(f"SELECT id FROM {SCHEMA}.reclaim_expired_jobs(1)")
+        assert cur.fetchall() == [], "A live lease must not be reclaimed"
+        time.sleep(1.2)
+        cur.execute(f"SELECT id, status FROM {SCHEMA}.reclaim_expired_jobs(1)")
+        assert cur.fetchall() == [(job_id, "pending")]
+        assert job() == ("pending", None, 1, True)
+        assert claim("worker-b") == [], "Claimable only after the backoff"
+        time.sleep(1.1)
+
+        # 3. A crash on the last attempt buries the job
+        print("Step 3: Marking a job dead after max_attempts")
+        assert claim("worker-b") == [(job_id, 2)]
+        cur.execute(f"SELECT id FROM {SCHEMA}.release_job(%s, 'worker-a', 'stale')", (job_id,))
+        assert cur.fetchall() == [], "Only the lease holder can release"
+        cur.execute(f"SELECT status, error FROM {SCHEMA}.release_job(%s, 'worker-b', 'exit code -9', 1)", (job_id,))
+        assert cur.fetchall() == [("dead", "exit code -9")]
+        assert claim("worker-c") == []
+
+        # 4. A job handed back unstarted (no capacity) keeps its attempts
+        print("Step 4: Unclaiming a job without using an attempt")
+        cur.execute(f"INSERT INTO {SCHEMA}.jobs (type, payload) VALUES ('render', '{{}}') RETURNING id")
+        job_id = cur.fetchone()[0]
+        assert claim("worker-a") == [(job_id, 1)]
+        cur.execute(f"SELECT id FROM {SCHEMA}.unclaim_job(%s, 'worker-b')", (job_id,))
+        assert cur.fetchall() == [], "Only the lease holder can unclaim"
+        cur.execute(f"SELECT id FROM {SCHEMA}.unclaim_job(%s, 'worker-a', 0)", (job_id,))
+        assert cur.fetchall() == [(job_id,)]
+        cur.execute(f"SELECT status, worker_id, lease_expires_at, claimed_at, attempts FROM {SCHEMA}.jobs WHERE id = %s", (job_id,))
+        assert cur.fetchone() == ("pending", None, None, None, 0)
+        assert claim("worker-b") == [(job_id, 1)]
+
+        # 5. Only the lease holder can fail a job: a reclaimed attempt doesn't fail the retry
+        print("Step 5: Failing a job under its lease")
+        cur.execute(f"SELECT {SCHEMA}.fail_job(%s, 'worker-a', 'stale attempt')", (job_id,))
+        assert cur.fetchone() == (False,)
+        cur.execute(f"SELECT status FROM {SCHEMA}.jobs WHERE id = %s", (job_id,))
+        assert cur.fetchone() == ("processing",)
+        cur.execute(f"SELECT {SCHEMA}.fail_job(%s, 'worker-b', 'boom')", (job_id,))
+        assert cur.fetchone() == (True,)
+        cur.execute(f"SELECT status, error, lease_expires_at FROM {SCHEMA}.jobs WHERE id = %s", (job_id,))
+        assert cur.fetchone() == ("failed", "boom", None)
+
+        # 6. Jobs left 'processing' without a lease are reclaimed once idle for a lease length
+        print("Step 6: Reclaiming jobs that never had a lease")
+        cur.execute(f"""INSERT INTO {SCHEMA}.jobs (type, payload, status, attempts, updated_at)
+                        VALUES ('render', '{{}}', 'processing', 1, NOW() - INTERVAL '10 seconds') RETURNING id""")
+        job_id = cur.fetchone()[0]
+        cur.execute(f"SELECT id FROM {SCHEMA}.reclaim_expired_jobs(1, 60)")
+        assert cur.fetchall() == [], "Touched within the lease length"
+        cur.execute(f"SELECT id, status FROM {SCHEMA}.reclaim_expired_jobs(1, 5)")
+        assert cur.fetchall() == [(job_id, "pending")]
+    finally:
+        cur.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+        conn.close()
+
+    print("Lease SQL Test Passed!")
+
+if __name__ == "__main__":
+    try:
+        for test in (test_lease_keeper, test_lease_sql):
+            try:
+                test()
+            except pytest.skip.Exception as e:
+                print(f"Skipped {test.__name__}: {e}")
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.job_notifier import JobNotifier
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def wake_latency(notifier: JobNotifier, trigger, timeout: float = 5.0) -> float:
+    """Seconds between trigger() and the waiting notifier waking (None if it timed out)."""
+    # Drop wake-ups still in flight from earlier steps (a notify also reaches the sender's own socket)
+    time.sleep(0.1)
+    notifier.wait(0)
+    result = {}
+    def waiter():
+        if notifier.wait(timeout):
+            result["woke_at"] = time.monotonic()
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.2)
+    triggered_at = time.monotonic()
+    trigger()
+    thread.join()
+    return result["woke_at"] - triggered_at if "woke_at" in result else None
+
+def test_job_notifier():
+    print("Starting Job Notifier Test...")
+    notify_dir = tempfile.mkdtemp(prefix="job_notify_test_")
+    database_url = os.environ.get("DATABASE_URL")
+    worker = JobNotifier(notify_dir=notify_dir, database_url=database_url)
+    
+    try:
+        worker.start_listening()
+        if database_url:
+            deadline = time.monotonic() + 5
+            while not worker.listening_remote and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert worker.listening_remote, "Should be listening on Postgres"
+            worker.wait(0)  # Drop the wake-up sent on connect
+        
+        # 1. An idle wait with no enqueue times out
+        print("Step 1: Waiting with an empty queue")
+        started = time.monotonic()
+        assert not worker.wait(0.5)
+        assert time.monotonic() - started >= 0.5
+        
+        # 2. An enqueue in the same process wakes the worker
+        print("Step 2: Enqueue from this process")
+        latency = wake_latency(worker, worker.notify)
+        print(f"Woke after {latency * 1000:.1f}ms")
+        assert latency is not None and latency < 0.1
+        
+        # 3. An enqueue from another process on the host wakes it through the socket
+        print("Step 3: Enqueue from another process")
+        script = f"import sys; sys.path.insert(0, {REPO_ROOT!r}); from core.job_notifier import JobNotifier; JobNotifier(notify_dir={notify_dir!r}).notify()"
+        latency = wake_latency(worker, lambda: subprocess.run([sys.executable, "-c", script], check=True))
+        assert latency is not None, "The worker should have been woken by the other process"
+        print(f"Woke {latency * 1000:.1f}ms after starting the other process")
+        
+        # 4. Sockets left behind by dead workers are cleaned up, not fatal
+        print("Step 4: Notifying with a stale worker socket")
+        stale_path = os.path.join(notify_dir, "worker-0-0.sock")
+        import socket
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        stale.bind(stale_path)
+        stale.close()
+        JobNotifier(notify_dir=notify_dir).notify()
+        assert not os.path.exists(stale_path)
+        assert worker.wait(1.0)
+        
+        # 5. With DATABASE_URL, a Postgres NOTIFY from anywhere wakes it
+        if database_url:
+            print("Step 5: NOTIFY from Postgres")
+            import psycopg2
+            conn = psycopg2.connect(database_url)
+            conn.autocommit = True
+            def pg_notify():
+                with conn.cursor() as cur:
+                    cur.execute("SELECT pg_notify('jobs', 'render')")
+            latency = wake_latency(worker, pg_notify)
+            conn.close()
+            print(f"Woke after {latency * 1000:.1f}ms")
+            assert latency is not None and latency < 0.5
+        
+        print("Job Notifier Test Passed!")
+    finally:
+        worker.stop()
+        shutil.rmtree(notify_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    try:
+        test_job_notifier()
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,123 @@
+import os
+import sys
+import time
+import threading
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.job_slots import ResourceSlots
+from core.job_processes import JobProcessPool, InProcessJobPool
+
+RESOURCES = {
+    "analyze": {"cores": 2, "memory_mb": 64},
+    "render": {"cores": 4, "memory_mb": 32}
+}
+
+def sleep_job(job):
+    """Child process target: stand-in for a job that takes a while, or crashes."""
+    payload = job["payload"]
+    time.sleep(payload.get("seconds", 0))
+    if payload.get("pid_file"):
+        with open(payload["pid_file"], "a") as f:
+            f.write(f"{os.getpid()}\n")
+    if payload.get("exit_code"):
+        os._exit(payload["exit_code"])
+
+def test_resource_slots():
+    print("Starting Resource Slots Test...")
+    slots = ResourceSlots(cores=8, memory_mb=128, resources=RESOURCES)
+    
+    # 1. Reservations fill the box by cores and memory
+    print("Step 1: Admitting jobs up to capacity")
+    assert slots.acquire("render") and slots.acquire("render")
+    assert slots.admissible_types() == []  # 8 of 8 cores reserved
+    assert not slots.acquire("analyze")
+    slots.release("render")
+    assert slots.admissible_types() == ["analyze", "render"]
+    assert slots.acquire("analyze")
+    assert not slots.fits("analyze") and not slots.fits("render")  # 6 cores left 2, 96MB of 128MB
+    
+    # 2. An idle worker always takes a job, even one larger than the box
+    print("Step 2: Admitting an oversized job on an idle worker")
+    slots.release("render")
+    slots.release("analyze")
+    small = ResourceSlots(cores=1, memory_mb=16, resources=RESOURCES)
+    assert small.acquire("analyze")
+    assert not small.fits("render")
+    print(f"Usage: {small.usage()}")
+
+    # 3. max_jobs caps concurrency whatever the capacity (the in-process worker runs one)
+    print("Step 3: Capping jobs at max_jobs")
+    single = ResourceSlots(cores=8, memory_mb=128, resources=RESOURCES, max_jobs=1)
+    assert single.acquire("analyze")
+    assert single.admissible_types() == [] and not single.acquire("analyze")
+    
+    print("Resource Slots Test Passed!")
+
+def test_job_process_pool():
+    print("Starting Job Process Pool Test...")
+    slots = ResourceSlots(cores=8, memory_mb=128, resources=RESOURCES)
+    exits = threading.Event()
+    pool = JobProcessPool(slots, sleep_job, on_exit=exits.set)
+    
+    # 1. Jobs that fit run side by side, each in its own process
+    print("Step 1: Running two render jobs concurrently")
+    started = time.monotonic()
+    for i in range(2):
+        assert pool.start({"id": f"render-{i}", "type": "render", "payload": {"seconds": 2}})
+    assert not pool.start({"id": "render-2", "type": "render", "payload": {}}), "A third render should not fit"
+    pool.join()
+    wall = time.monotonic() - started
+    print(f"Two 2s jobs took {wall:.2f}s")
+    assert wall < 3.5
+    assert exits.is_set()
+    results = pool.reap()
+    assert sorted(job["id"] for job, _ in results) == ["render-0", "render-1"]
+    assert all(exitcode == 0 for _, exitcode in results)
+    assert slots.usage()["running"] == 0
+    
+    # 2. A crashed job is reported with its exit code and frees its slot
+    print("Step 2: Reaping a crashed job")
+    assert pool.start({"id": "crash", "type": "analyze", "payload": {"exit_code": 3}})
+    pool.join()
+    assert pool.reap() == [({"id": "crash", "type": "analyze", "payload": {"exit_code": 3}}, 3)]
+    assert slots.usage()["cores"] == 0 and not pool.running_jobs()
+
+    # 3. A finished job's process runs the next job; a crashed one is replaced
+    print("Step 3: Reusing job processes")
+    import tempfile
+    with tempfile.NamedTemporaryFile("r", suffix=".pids") as pids:
+        for i in range(3):
+            assert pool.start({"id": f"reuse-{i}", "type": "analyze", "payload": {"pid_file": pids.name}})
+            pool.join()
+            assert [exitcode for _, exitcode in pool.reap()] == [0]
+        used = pids.read().split()
+        print(f"Processes used: {used}")
+        assert len(used) == 3 and len(set(used)) == 1, "Sequential jobs should share one process"
+    pool.close()
+
+    # 4. Jobs on the embedded worker's thread report like processes
+    print("Step 4: Running jobs in-process")
+    single = ResourceSlots(cores=8, memory_mb=128, resources=RESOURCES, max_jobs=1)
+    in_process = InProcessJobPool(single, lambda job: job["payload"]["run"](job))
+    granted = []
+    assert in_process.start({"id": "ok", "type": "render", "payload": {"run": lambda job: granted.append(job["cores"])}})
+    assert not in_process.start({"id": "second", "type": "render", "payload": {}}), "One job at a time"
+    in_process.join()
+    assert [(job["id"], exitcode) for job, exitcode in in_process.reap()] == [("ok", 0)]
+    assert granted == [RESOURCES["render"]["cores"]], "The job is told the cores its slot reserved"
+    assert in_process.start({"id": "raises", "type": "render", "payload": {"run": lambda job: 1 / 0}})
+    in_process.join()
+    assert [(job["id"], exitcode) for job, exitcode in in_process.reap()] == [("raises", 1)]
+    assert single.usage()["running"] == 0
+    
+    print("Job Process Pool Test Passed!")
+
+if __name__ == "__main__":
+    try:
+        test_resource_slots()
+        test_job_process_pool()
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,65 @@
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+import pytest
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.loudness_analyzer import LoudnessAnalyzer
+from core.utils import ffmpeg_available
+
+def test_loudness_stats():
+    print("Starting Loudness Stats Test...")
+    
+    # 1. Combining clips weights by duration in the power domain
+    print("Step 1: Verifying combined stats")
+    quiet = {"input_i": -30.0, "input_tp": -12.0, "input_lra": 3.0, "input_thresh": -40.0, "target_offset": 0.5}
+    loud = {"input_i": -20.0, "input_tp": -3.0, "input_lra": 6.0, "input_thresh": -30.0, "target_offset": -0.5}
+    same = LoudnessAnalyzer.combine([(quiet, 5.0), (quiet, 10.0)])
+    assert abs(same["input_i"] - -30.0) < 0.01
+    combined = LoudnessAnalyzer.combine([(quiet, 10.0), (loud, 10.0)])
+    assert -23.5 < combined["input_i"] < -22.5, f"Unexpected combined loudness {combined['input_i']}"
+    assert combined["input_tp"] == -3.0 and combined["input_lra"] == 6.0
+    assert LoudnessAnalyzer.combine([(quiet, 5.0), (None, 5.0)]) is None, "Missing stats must fall back to single-pass"
+    
+    # 2. Filter strings
+    print("Step 2: Verifying loudnorm filter strings")
+    assert "linear=true" in LoudnessAnalyzer.loudnorm_filter(combined)
+    assert "measured_I" not in LoudnessAnalyzer.loudnorm_filter(None)
+    
+    # 3. Measuring a real clip
+    if not ffmpeg_available():
+        pytest.skip("ffmpeg not installed, step 3 (measurement) not run")
+    
+    print("Step 3: Measuring a generated tone")
+    work_dir = tempfile.mkdtemp(prefix="loudness_test_")
+    try:
+        tone_path = os.path.join(work_dir, "tone.mp4")
+        silent_path = os.path.join(work_dir, "silent.mp4")
+        subprocess.run(["ffmpeg", "-y", "-v", "error", "-f", "lavfi", "-i", "sine=frequency=440:duration=5",
+                        "-c:a", "aac", tone_path], check=True)
+        subprocess.run(["ffmpeg", "-y", "-v", "error", "-f", "lavfi", "-i", "color=c=black:s=320x240:d=2",
+                        "-c:v", "libx264", silent_path], check=True)
+        
+        analyzer = LoudnessAnalyzer()
+        stats = analyzer.measure(tone_path)
+        assert stats is not None, "Tone should have loudness stats"
+        assert -30.0 < stats["input_i"] < -15.0, f"Unexpected tone loudness {stats['input_i']}"
+        assert analyzer.measure(silent_path) is None, "Clip without audio should have no stats"
+        
+        print("Loudness Stats Test Passed!")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    try:
+        test_loudness_stats()
+    except pytest.skip.Exception as e:
+        print(f"Skipped: {e}")
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
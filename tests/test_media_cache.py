@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import concurrent.futures
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.media_cache import MediaCache
+
+class LocalStorage:
+    """Stands in for Supabase Storage: serves files from a local directory, slowly."""
+    def __init__(self, root):
+        self.root = root
+        self.downloads = 0
+        self.lock = threading.Lock()
+
+    def download_file(self, bucket, storage_path, local_path):
+        with self.lock:
+            self.downloads += 1
+        source = os.path.join(self.root, storage_path)
+        if not os.path.exists(source):
+            return False
+        time.sleep(0.2)
+        shutil.copyfile(source, local_path)
+        return True
+
+def test_media_cache():
+    print("Starting Media Cache Test...")
+    work_dir = tempfile.mkdtemp(prefix="media_cache_test_")
+    
+    try:
+        uploads_dir = os.path.join(work_dir, "uploads")
+        bucket_dir = os.path.join(work_dir, "bucket", "uploads")
+        os.makedirs(uploads_dir)
+        os.makedirs(bucket_dir)
+        for name, size in (("remote_a.mov", 1000), ("remote_b.mp4", 1000), ("remote_c.mp4", 1000)):
+            with open(os.path.join(bucket_dir, name), "wb") as f:
+                f.write(os.urandom(size))
+        with open(os.path.join(uploads_dir, "local_clip.mkv"), "wb") as f:
+            f.write(b"\0" * 500)
+        
+        storage = LocalStorage(os.path.join(work_dir, "bucket"))
+        paths = {"remote_a": "uploads/remote_a.mov", "remote_b": "uploads/remote_b.mp4", "remote_c": "uploads/remote_c.mp4"}
+        cache = MediaCache(os.path.join(work_dir, "cache"), uploads_dir=uploads_dir, storage=storage,
+                           storage_path_resolver=paths.get, max_bytes=2500)
+        
+        # 1. Local uploads are found by their real extension and indexed
+        print("Step 1: Resolving a local upload")
+        assert cache.get_path("local_clip").endswith("local_clip.mkv")
+        assert cache.get_path("local_clip").endswith("local_clip.mkv")
+        assert storage.downloads == 0
+        
+        # 2. Concurrent requests for one missing clip share a single download
+        print("Step 2: Deduplicating concurrent fetches")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: cache.get_path("remote_a"), range(8)))
+        assert len(set(results)) == 1 and results[0].endswith("remote_a.mov"), f"Unexpected paths: {set(results)}"
+        assert storage.downloads == 1, f"Expected 1 download, got {storage.downloads}"
+        
+        # 3. LRU eviction under the disk budget; uploads never count or get evicted
+        print("Step 3: Verifying LRU eviction")
+        cache.get_path("remote_b")
+        time.sleep(0.01)
+        cache.get_path("remote_a")  # remote_a is now more recent than remote_b
+        time.sleep(0.01)
+        cache.get_path("remote_c")  # 3000 bytes > 2500: evicts remote_b
+        assert not os.path.exists(os.path.join(work_dir, "cache", "remote_b.mp4")), "remote_b should have been evicted"
+        assert os.path.exists(os.path.join(work_dir, "cache", "remote_a.mov"))
+        assert os.path.exists(os.path.join(uploads_dir, "local_clip.mkv"))
+        
+        # 4. Missing clips and stats
+        print("Step 4: Verifying misses and stats")
+        assert cache.get_path("nowhere") is None
+        stats = cache.stats()
+        print(f"Stats: {stats}")
+        assert stats["entries"] == 2 and stats["bytes"] == 2000
+        assert stats["hits"] >= 2 and stats["misses"] >= 4
+        
+        # 5. The index survives a new instance (e.g. another worker process)
+        print("Step 5: Verifying persistent index")
+        reopened = MediaCache(os.path.join(work_dir, "cache"), storage=storage)
+        assert reopened.get_path("remote_a").endswith("remote_a.mov")
+        assert reopened.hits == 1 and storage.downloads == 4
+        
+        # 6. Clips pinned by a running render are kept over budget until it releases them
+        print("Step 6: Verifying pinned clips")
+        assert cache.get_path("remote_a", pin="render-1")
+        cache.get_path("remote_c", pin="render-1")
+        time.sleep(0.01)
+        cache.get_path("remote_b", pin="render-1")  # 3000 bytes, but every clip is pinned
+        assert cache.stats()["bytes"] == 3000, "Pinned clips must not be evicted"
+        cache.release("render-1")
+        assert cache.stats()["bytes"] <= 2500, "Releasing the pin must evict down to the budget"
+        assert os.path.exists(os.path.join(work_dir, "cache", "remote_b.mp4"))
+        
+        print("Media Cache Test Passed!")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    try:
+        test_media_cache()
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
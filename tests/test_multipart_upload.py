@@ -0,0 +1,139 @@
+import os
+import re
+import sys
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.transfer import s3_client, upload_multipart
+
+MiB = 1024 * 1024
+PART_LATENCY = 0.25  # Simulated network time per part request
+
+class S3Handler(BaseHTTPRequestHandler):
+    """Minimal S3-compatible stand-in: PutObject and the multipart upload calls, with injectable part failures."""
+    protocol_version = "HTTP/1.1"
+    objects = {}
+    uploads = {}
+    fail_parts = set()  # part numbers that fail once with a 500
+    part_requests = []
+    lock = threading.Lock()
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _reply(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_PUT(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        body = self._body()
+        if "partNumber" in query:
+            part_number = int(query["partNumber"][0])
+            time.sleep(PART_LATENCY)
+            with self.lock:
+                self.part_requests.append(part_number)
+                if part_number in self.fail_parts:
+                    self.fail_parts.discard(part_number)
+                    self._reply(500, b"<Error><Code>InternalError</Code></Error>")
+                    return
+                self.uploads[query["uploadId"][0]][part_number] = body
+        else:
+            self.objects[url.path] = body
+        self._reply(200, headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query, keep_blank_values=True)
+        body = self._body()
+        if "uploads" in query:
+            upload_id = f"upload-{len(self.uploads)}"
+            self.uploads[upload_id] = {}
+            xml = f"<InitiateMultipartUploadResult><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+            self._reply(200, xml.encode())
+        else:
+            parts = self.uploads.pop(query["uploadId"][0])
+            order = [int(n) for n in re.findall(rb"<PartNumber>(\d+)</PartNumber>", body)]
+            self.objects[url.path] = b"".join(parts[n] for n in order)
+            self._reply(200, b'<CompleteMultipartUploadResult><ETag>"done"</ETag></CompleteMultipartUploadResult>')
+
+    def do_DELETE(self):
+        self.uploads.pop(parse_qs(urlparse(self.path).query)["uploadId"][0], None)
+        self._reply(204)
+
+    def log_message(self, *args):
+        pass
+
+def test_multipart_upload():
+    print("Starting Multipart Upload Test...")
+    pytest.importorskip("boto3")
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), S3Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = s3_client(f"http://127.0.0.1:{server.server_address[1]}", "test", "test")
+    work_dir = tempfile.mkdtemp(prefix="multipart_test_")
+    
+    try:
+        path = os.path.join(work_dir, "render.mp4")
+        data = os.urandom(40 * MiB)
+        with open(path, "wb") as f:
+            f.write(data)
+        
+        # 1. Throughput scales with the number of parts in flight
+        print("Step 1: Uploading 8 parts at concurrency 1 and 4")
+        timings = {}
+        for concurrency in (1, 4):
+            started = time.monotonic()
+            upload_multipart(client, "videos", f"renders/c{concurrency}.mp4", path, chunk_size=5 * MiB, concurrency=concurrency)
+            timings[concurrency] = time.monotonic() - started
+            assert S3Handler.objects[f"/videos/renders/c{concurrency}.mp4"] == data
+            print(f"Concurrency {concurrency}: {timings[concurrency]:.2f}s ({40 / timings[concurrency]:.1f} MiB/s)")
+        assert timings[4] < timings[1] / 2, "Parallel parts should be at least twice as fast"
+        
+        # 2. A failed part is retried on its own
+        print("Step 2: Retrying a failed part")
+        S3Handler.part_requests.clear()
+        S3Handler.fail_parts = {3}
+        upload_multipart(client, "videos", "renders/retry.mp4", path, chunk_size=5 * MiB, concurrency=4)
+        assert S3Handler.objects["/videos/renders/retry.mp4"] == data
+        print(f"Part requests: {sorted(S3Handler.part_requests)}")
+        assert sorted(S3Handler.part_requests) == [1, 2, 3, 3, 4, 5, 6, 7, 8]
+        
+        # 3. Small files skip the multipart calls
+        print("Step 3: Uploading a file smaller than one chunk")
+        small_path = os.path.join(work_dir, "small.mp4")
+        with open(small_path, "wb") as f:
+            f.write(b"x" * 1000)
+        S3Handler.part_requests.clear()
+        upload_multipart(client, "videos", "uploads/small.mp4", small_path, chunk_size=5 * MiB)
+        assert S3Handler.objects["/videos/uploads/small.mp4"] == b"x" * 1000
+        assert not S3Handler.part_requests
+        
+        print("Multipart Upload Test Passed!")
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    try:
+        test_multipart_upload()
+    except pytest.skip.Exception as e:
+        print(f"Skipped: {e}")
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
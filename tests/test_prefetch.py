@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+
+import pytest
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.media_cache import MediaCache
+from core.video_renderer import VideoRenderer
+from core.utils import ffmpeg_available, probe_media
+
+# Later takes take longer to download, so the first can encode while they arrive
+DOWNLOAD_SECONDS = {"uploads/take_0.mp4": 0.2, "uploads/take_1.mp4": 1.0, "uploads/take_2.mp4": 2.0}
+
+class SlowStorage:
+    """Stands in for Supabase Storage: serves files from a local directory with a fixed delay."""
+    def __init__(self, root):
+        self.root = root
+        self.events = []
+        self.lock = threading.Lock()
+
+    def download_file(self, bucket, storage_path, local_path):
+        with self.lock:
+            self.events.append(("download_start", storage_path, time.monotonic()))
+        time.sleep(DOWNLOAD_SECONDS[storage_path])
+        shutil.copyfile(os.path.join(self.root, storage_path), local_path)
+        with self.lock:
+            self.events.append(("download_end", storage_path, time.monotonic()))
+        return True
+
+def test_prefetch():
+    print("Starting Source Prefetch Test...")
+    if not ffmpeg_available():
+        pytest.skip("ffmpeg not installed")
+    
+    work_dir = tempfile.mkdtemp(prefix="prefetch_test_")
+    try:
+        bucket_dir = os.path.join(work_dir, "bucket", "uploads")
+        os.makedirs(bucket_dir)
+        edl = []
+        for i in range(3):
+            path = os.path.join(bucket_dir, f"take_{i}.mp4")
+            subprocess.run([
+                "ffmpeg", "-v", "error", "-f", "lavfi", "-i", f"testsrc=duration=3:size=640x360:rate=24",
+                "-c:v", "libx264", "-pix_fmt", "yuv420p", "-y", path
+            ], check=True)
+            info = probe_media(path)
+            edl.append({
+                "video_id": f"take_{i}", "start_time": 0.0, "end_time": None,
+                "source_info": {field: info[field] for field in ("duration", "width", "height", "has_audio")}
+            })
+        
+        storage = SlowStorage(os.path.join(work_dir, "bucket"))
+        media_cache = MediaCache(os.path.join(work_dir, "media_cache"), storage=storage)
+        renderer = VideoRenderer(output_dir=os.path.join(work_dir, "renders"), uploads_dir=os.path.join(work_dir, "uploads"),
+                                 backend="ffmpeg", cache_dir=os.path.join(work_dir, "cache"), media_cache=media_cache)
+        
+        encode_starts = []
+        render_segment = renderer.ffmpeg_renderer.render_segment
+        def recording_render_segment(*args, **kwargs):
+            encode_starts.append(time.monotonic())
+            return render_segment(*args, **kwargs)
+        renderer.ffmpeg_renderer.render_segment = recording_render_segment
+        
+        # 1. Missing sources download concurrently
+        print("Step 1: Rendering with three missing sources")
+        started = time.monotonic()
+        output_path = renderer.render_video(edl, "prefetch_test.mp4")
+        download_ends = [t for kind, _, t in storage.events if kind == "download_end"]
+        download_starts = [t for kind, _, t in storage.events if kind == "download_start"]
+        print(f"Downloads finished after {max(download_ends) - started:.2f}s, render took {time.monotonic() - started:.2f}s")
+        assert len(download_ends) == 3
+        assert max(download_starts) < min(download_ends), "All downloads should be in flight at once"
+        assert max(download_ends) - started < sum(DOWNLOAD_SECONDS.values()), "Downloads should not run back to back"
+        
+        # 2. The first segment encodes while other sources are still downloading (planned from source_info)
+        print("Step 2: Verifying encode/download overlap")
+        assert min(encode_starts) < max(download_ends), "First encode should start before the last download ends"
+        assert abs(probe_media(output_path)["duration"] - 9.0) < 0.2
+        
+        # 3. Without source_info the render still works, from the now-cached sources
+        print("Step 3: Rendering without source info")
+        for clip_data in edl:
+            del clip_data["source_info"]
+        output_path = renderer.render_video(edl, "prefetch_test_2.mp4")
+        assert abs(probe_media(output_path)["duration"] - 9.0) < 0.2
+        assert renderer.last_render_stats["media"]["hits"] == 3
+        
+        print("Source Prefetch Test Passed!")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    try:
+        test_prefetch()
+    except pytest.skip.Exception as e:
+        print(f"Skipped: {e}")
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,50 @@
+import os
+import sys
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.video_renderer import VideoRenderer, map_timeline_windows
+
+def test_preview_window_mapping():
+    print("Starting Preview Window Mapping Test...")
+    
+    # Timeline: take A 10s..70s (60s) followed by take B 0s..60s (60s) = 120s
+    spans = [(10.0, 70.0), (0.0, 60.0)]
+    renderer = VideoRenderer(output_dir="outputs/test_renders", uploads_dir=".")
+    windows = renderer._preview_windows(120.0)
+    
+    print(f"Step 1: {len(windows)} preview windows over a 120s timeline")
+    assert len(windows) == 12
+    assert windows[0] == (0.0, 5.0)
+    assert abs(windows[-1][1] - 120.0) < 1e-6
+    
+    print("Step 2: Mapping windows back to source offsets")
+    pieces = map_timeline_windows(spans, windows)
+    for index, start, end in pieces:
+        print(f"  take {index}: {start:.2f}s -> {end:.2f}s")
+    
+    # First window comes from take A, offset by its in-point
+    assert pieces[0] == (0, 10.0, 15.0)
+    # Last window ends at the end of take B
+    assert pieces[-1][0] == 1 and abs(pieces[-1][2] - 60.0) < 1e-6
+    # Every source piece stays inside its span
+    for index, start, end in pieces:
+        assert spans[index][0] <= start < end <= spans[index][1] + 1e-6
+    # Windows that straddle the cut are split, but the total stays 60s
+    total = sum(end - start for _, start, end in pieces)
+    assert abs(total - 60.0) < 1e-6, f"Expected 60s of preview, got {total}s"
+    
+    print("Step 3: Window straddling a cut")
+    straddle = map_timeline_windows(spans, [(58.0, 63.0)])
+    print(f"  {straddle}")
+    assert straddle == [(0, 68.0, 70.0), (1, 0.0, 3.0)]
+    
+    print("Preview Window Mapping Test Passed!")
+
+if __name__ == "__main__":
+    try:
+        test_preview_window_mapping()
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
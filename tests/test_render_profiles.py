@@ -0,0 +1,71 @@
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+import pytest
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.render_profiles import get_render_profile, profile_for_job, output_height
+from core.video_renderer import VideoRenderer
+from core.utils import ffmpeg_available, probe_media
+
+def test_render_profiles():
+    print("Starting Render Profiles Test...")
+    
+    # 1. Job flags pick the profile
+    print("Step 1: Verifying profile selection")
+    assert profile_for_job(is_draft=True, is_paid=True) == "draft"
+    assert profile_for_job(is_draft=False, is_paid=False) == "preview"
+    assert profile_for_job(is_draft=False, is_paid=True) == "final"
+    try:
+        get_render_profile("cinema")
+        assert False, "Unknown profiles should be rejected"
+    except ValueError:
+        pass
+    
+    # 2. PRD 12: free tier is always 720p, paid finals go up to 1080p but never upscale past the sources
+    print("Step 2: Verifying output heights")
+    draft, preview, final = (get_render_profile(name) for name in ("draft", "preview", "final"))
+    assert output_height(draft, [{"height": 1080}]) == 360
+    assert output_height(preview, [{"height": 480}]) == 720
+    assert output_height(final, [{"height": 2160}]) == 1080
+    assert output_height(final, [{"height": 900}, {"height": 720}]) == 900
+    assert output_height(final, [{"height": 480}]) == 720
+    
+    # 3. An encoded draft comes out at 360p
+    if not ffmpeg_available():
+        pytest.skip("ffmpeg not installed, step 3 (render) not run")
+    
+    print("Step 3: Rendering a draft with the draft profile")
+    work_dir = tempfile.mkdtemp(prefix="render_profiles_test_")
+    try:
+        take_path = os.path.join(work_dir, "profile_take.mp4")
+        subprocess.run([
+            "ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=duration=3:size=1920x1080:rate=24",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", "-y", take_path
+        ], check=True)
+        
+        renderer = VideoRenderer(output_dir=os.path.join(work_dir, "renders"), uploads_dir=work_dir,
+                                 backend="ffmpeg", cache_dir=os.path.join(work_dir, "cache"))
+        edl = [{"video_id": "profile_take", "start_time": 0.0, "end_time": None}]
+        output_path = renderer.render_video(edl, "draft.mp4", is_draft=True)
+        info = probe_media(output_path)
+        print(f"Draft: {info['width']}x{info['height']} ({renderer.last_render_stats['profile']})")
+        assert info["height"] == 360 and renderer.last_render_stats["profile"] == "draft"
+        
+        print("Render Profiles Test Passed!")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    try:
+        test_render_profiles()
+    except pytest.skip.Exception as e:
+        print(f"Skipped: {e}")
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
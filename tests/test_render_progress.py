@@ -0,0 +1,79 @@
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+import pytest
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.render_progress import RenderProgress
+from core.video_renderer import VideoRenderer
+from core.utils import ffmpeg_available
+
+def test_render_progress():
+    print("Starting Render Progress Test...")
+    
+    # 1. Parallel encodes and cache hits add up to one frame count
+    print("Step 1: Verifying aggregation and throttling")
+    reports = []
+    progress = RenderProgress(total_seconds=10.0, fps=24, callback=reports.append, min_interval=3600)
+    first = progress.task("a", 4.0)
+    second = progress.task("b", 4.0)
+    progress.task("c", 2.0)
+    progress.drop("c", reused=True)  # A cache hit: counted as done, never encoded
+    first(2.0)
+    second(9.0)  # Clamped to the task length
+    snapshot = progress.snapshot()
+    assert snapshot["frames_encoded"] == 192, f"Expected 192 frames, got {snapshot['frames_encoded']}"
+    assert snapshot["total_frames"] == 240
+    assert snapshot["eta_seconds"] is not None and snapshot["encode_fps"] > 0
+    assert len(reports) == 1, "Updates inside the interval should be throttled"
+    
+    progress.finish({"wall_time": 1.0, "realtime_factor": 0.1, "backend": "ffmpeg"})
+    assert reports[-1]["phase"] == "done" and reports[-1]["percent"] == 100.0
+    assert reports[-1]["realtime_factor"] == 0.1
+    
+    # 2. A failing callback never fails the render
+    failing = RenderProgress(total_seconds=1.0, fps=24, callback=lambda p: 1 / 0, min_interval=0)
+    failing.task("a", 1.0)(0.5)
+    
+    # 3. Live reports from a real ffmpeg render
+    if not ffmpeg_available():
+        pytest.skip("ffmpeg not installed, step 3 (render) not run")
+    
+    print("Step 3: Rendering with a progress callback")
+    work_dir = tempfile.mkdtemp(prefix="render_progress_test_")
+    try:
+        take_path = os.path.join(work_dir, "progress_take.mp4")
+        subprocess.run([
+            "ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=duration=8:size=640x360:rate=24",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", "-y", take_path
+        ], check=True)
+        
+        renderer = VideoRenderer(output_dir=os.path.join(work_dir, "renders"), uploads_dir=work_dir,
+                                 backend="ffmpeg", cache_dir=os.path.join(work_dir, "cache"))
+        edl = [{"video_id": "progress_take", "start_time": 0.0, "end_time": 4.0},
+               {"video_id": "progress_take", "start_time": 4.0, "end_time": 8.0}]
+        
+        reports = []
+        renderer.render_video(edl, "progress_test.mp4", progress_callback=reports.append)
+        print(f"Reports: {[(r['phase'], r['frames_encoded']) for r in reports]}")
+        assert reports, "Expected progress reports"
+        assert reports[-1]["phase"] == "done" and reports[-1]["frames_encoded"] == 192
+        assert all(r["frames_encoded"] <= r["total_frames"] for r in reports)
+        
+        print("Render Progress Test Passed!")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    try:
+        test_render_progress()
+    except pytest.skip.Exception as e:
+        print(f"Skipped: {e}")
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
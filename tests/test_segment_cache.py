@@ -0,0 +1,90 @@
+import os
+import sys
+import shutil
+import tempfile
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.segment_cache import SegmentCache
+
+def write_segment(cache, key, size, pin=None):
+    temp_path = cache.temp_path(key)
+    with open(temp_path, "wb") as f:
+        f.write(b"\0" * size)
+    return cache.put(key, temp_path, pin=pin)
+
+def test_segment_cache():
+    print("Starting Segment Cache Test...")
+    cache_dir = tempfile.mkdtemp(prefix="segment_cache_test_")
+    
+    try:
+        cache = SegmentCache(cache_dir, max_bytes=3000)
+        
+        # 1. Keys depend on source content, cut points and encoder profile
+        print("Step 1: Verifying cache keys")
+        source_path = os.path.join(cache_dir, "source.mp4")
+        with open(source_path, "wb") as f:
+            f.write(os.urandom(4096))
+        source_hash = cache.source_hash(source_path)
+        profile = {"height": 720, "fps": 24, "preset": "ultrafast"}
+        key = cache.segment_key(source_hash, 0.0, 5.0, profile)
+        assert key == cache.segment_key(source_hash, 0.0, 5.0, dict(profile))
+        assert key != cache.segment_key(source_hash, 0.0, 5.5, profile)
+        assert key != cache.segment_key(source_hash, 0.0, 5.0, dict(profile, height=360))
+        with open(source_path, "r+b") as f:
+            f.write(b"changed")
+        assert cache.source_hash(source_path) != source_hash, "Editing the source must change its hash"
+        
+        # 2. Hits and misses
+        print("Step 2: Verifying hits and misses")
+        assert cache.get("a") is None
+        write_segment(cache, "a", 1000)
+        write_segment(cache, "b", 1000)
+        assert cache.get("a") is not None  # 'a' is now more recently used than 'b'
+        
+        # 3. LRU eviction under the disk budget
+        print("Step 3: Verifying LRU eviction")
+        write_segment(cache, "c", 1500)
+        stats = cache.stats()
+        print(f"Cache stats: {stats}")
+        assert stats["bytes"] <= 3000
+        assert cache.get("b") is None, "Least recently used segment should be evicted first"
+        assert cache.get("a") is not None and cache.get("c") is not None
+        
+        # 4. Index survives a new cache instance (e.g. another worker process)
+        print("Step 4: Verifying persistent index")
+        reopened = SegmentCache(cache_dir, max_bytes=3000)
+        assert reopened.get("c") is not None
+        
+        # 5. Segments pinned by a running render are kept over budget until it releases them
+        print("Step 5: Verifying pinned segments")
+        assert cache.get("a", pin="render-1") is not None
+        for key in ("d", "e", "f"):
+            write_segment(cache, key, 1000, pin="render-1")
+        stats = cache.stats()
+        print(f"Cache stats while pinned: {stats}")
+        assert stats["bytes"] == 4000, "Pinned segments must not be evicted"
+        assert cache.get("c") is None, "Unpinned segments are still evicted"
+        cache.release("render-1")
+        assert cache.stats()["bytes"] <= 3000, "Releasing the pin must evict down to the budget"
+        assert cache.get("a") is None and cache.get("f") is not None
+        
+        # 6. Pins of a process that died don't hold anything
+        print("Step 6: Verifying pins of dead processes")
+        with cache._locked_index() as index:
+            index["segments"]["e"]["pins"] = {"crashed-render": 2 ** 22 + 1}  # Above any pid_max
+        cache.max_bytes = 0
+        write_segment(cache, "g", 1000, pin="render-2")
+        assert cache.get("e") is None and cache.get("g") is not None
+        
+        print("Segment Cache Test Passed!")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    try:
+        test_segment_cache()
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,98 @@
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+import pytest
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.video_renderer import VideoRenderer
+from core.utils import ffmpeg_available
+
+def make_take(path, size, tone):
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-f", "lavfi", "-i", f"testsrc=duration=3:size={size}:rate=24",
+        "-f", "lavfi", "-i", f"sine=frequency={tone}:duration=3", "-shortest",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", "-y", path
+    ], check=True)
+
+def draft_edl(video_id):
+    """The draft EDL: one whole take (EDLGenerator)."""
+    return [{"video_id": video_id, "start_time": 0.0, "end_time": None}]
+
+def test_speculative_render():
+    print("Starting Speculative Draft Render Test...")
+    if not ffmpeg_available():
+        pytest.skip("ffmpeg not installed")
+
+    work_dir = tempfile.mkdtemp(prefix="speculative_test_")
+    try:
+        uploads_dir = os.path.join(work_dir, "uploads")
+        os.makedirs(uploads_dir)
+        for i in range(4):
+            # Above the stream-copy height, so drafts of these are encoded
+            make_take(os.path.join(uploads_dir, f"take_{i}.mp4"), "1920x1080", 440 + 110 * i)
+        make_take(os.path.join(uploads_dir, "phone.mp4"), "640x360", 440)
+
+        renderer = VideoRenderer(output_dir=os.path.join(work_dir, "renders"), uploads_dir=uploads_dir,
+                                 backend="ffmpeg", cache_dir=os.path.join(work_dir, "cache"))
+        cache = renderer.segment_cache
+        encodes = []
+        render_segment = renderer.ffmpeg_renderer.render_segment
+        def recording_render_segment(*args, **kwargs):
+            encodes.append(args[0]["path"])
+            return render_segment(*args, **kwargs)
+        renderer.ffmpeg_renderer.render_segment = recording_render_segment
+
+        # 1. Each take is encoded ahead as its analysis finishes
+        print("Step 1: Encoding every take's draft segments ahead")
+        for i in range(3):
+            stats = renderer.prerender(draft_edl(f"take_{i}"))
+            assert stats["encoded"] == stats["segments"] == 1
+        assert len(encodes) == 3
+        assert renderer.prerender(draft_edl("take_1"))["encoded"] == 0, "Encoded takes are not encoded again"
+        assert cache.speculation_stats()["used"]["count"] == 0, "A speculative lookup is not a use"
+
+        # 2. The draft of the winning take only assembles
+        print("Step 2: Rendering the draft from speculative segments")
+        output_path = renderer.render_video(draft_edl("take_1"), "draft.mp4", is_draft=True)
+        assert output_path and os.path.exists(output_path)
+        assert len(encodes) == 3, "The draft must not encode anything"
+        cache_stats = renderer.last_render_stats["cache"]
+        assert cache_stats["hits"] == cache_stats["segments"] == 1
+        speculation = cache_stats["speculation"]
+        print(f"Speculation after the draft: {speculation}")
+        assert speculation["encoded"]["count"] == 3
+        assert speculation["used"]["count"] == 1
+        assert speculation["pending"]["count"] == 2
+
+        # 3. Takes that lost are reported as wasted once evicted unused
+        print("Step 3: Measuring wasted speculation")
+        cache.max_bytes = 1
+        # A late take encoded ahead pushes the cache over budget
+        renderer.prerender(draft_edl("take_3"))
+        speculation = cache.speculation_stats()
+        print(f"Speculation after eviction: {speculation}")
+        assert speculation["wasted"]["count"] == 3 and speculation["pending"]["count"] == 0
+        assert speculation["wasted"]["seconds"] > 0 and speculation["wasted"]["encode_time"] > 0
+        assert 0 < speculation["wasted_ratio"] < 1
+
+        # 4. A draft that will be stream-copied has nothing to encode ahead
+        print("Step 4: Skipping stream-copyable drafts")
+        assert renderer.prerender(draft_edl("phone")) is None
+
+        print("Speculative Draft Render Test Passed!")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    try:
+        test_speculative_render()
+    except pytest.skip.Exception as e:
+        print(f"Skipped: {e}")
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
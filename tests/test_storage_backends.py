@@ -0,0 +1,89 @@
+import os
+import sys
+import shutil
+import tempfile
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.storage_backends import StorageBackend, LocalStorageBackend, create_storage
+from core.media_cache import MediaCache
+
+def test_local_storage_backend():
+    print("Starting Local Storage Backend Test...")
+    work_dir = tempfile.mkdtemp(prefix="storage_backend_test_")
+    # A second filesystem for the copy fallback, where the sandbox has one
+    other_fs_dir = tempfile.mkdtemp(prefix="storage_backend_test_", dir="/dev/shm") if os.path.isdir("/dev/shm") else None
+    
+    try:
+        clip_path = os.path.join(work_dir, "clip.mp4")
+        with open(clip_path, "wb") as f:
+            f.write(os.urandom(100000))
+        storage = LocalStorageBackend(os.path.join(work_dir, "storage"), public_url="http://localhost:8000/storage")
+        
+        # 1. Upload on the same filesystem is a hardlink, not a copy
+        print("Step 1: Uploading on one filesystem")
+        assert storage.upload_file("videos", "uploads/clip.mp4", clip_path) == "uploads/clip.mp4"
+        object_path = os.path.join(work_dir, "storage", "videos", "uploads", "clip.mp4")
+        assert os.stat(object_path).st_ino == os.stat(clip_path).st_ino
+        assert storage.get_public_url("videos", "uploads/clip.mp4") == "http://localhost:8000/storage/videos/uploads/clip.mp4"
+        
+        # 2. The media cache fetches through the backend without copying either
+        print("Step 2: Fetching into the media cache")
+        cache = MediaCache(os.path.join(work_dir, "media_cache"), storage=storage)
+        cached_path = cache.get_path("clip")
+        assert cached_path and os.stat(cached_path).st_ino == os.stat(clip_path).st_ino
+        assert cache.stats()["downloaded_bytes"] == 100000
+        
+        # 3. Across filesystems the backend falls back to a copy
+        if other_fs_dir:
+            print("Step 3: Downloading to another filesystem")
+            copy_path = os.path.join(other_fs_dir, "clip.mp4")
+            assert storage.download_file("videos", "uploads/clip.mp4", copy_path)
+            with open(copy_path, "rb") as f, open(clip_path, "rb") as original:
+                assert f.read() == original.read()
+            assert not [name for name in os.listdir(other_fs_dir) if name.endswith(".tmp")]
+        
+        # 4. Missing objects and paths outside the root fail cleanly
+        print("Step 4: Rejecting missing objects and traversal")
+        assert not storage.download_file("videos", "uploads/missing.mp4", os.path.join(work_dir, "missing.mp4"))
+        assert storage.upload_file("videos", "../../escape.mp4", clip_path) is None
+        assert not os.path.exists(os.path.join(work_dir, "escape.mp4"))
+        
+        # 5. The factory picks the backend from STORAGE_BACKEND
+        print("Step 5: Selecting the backend from the environment")
+        os.environ["STORAGE_BACKEND"] = "local"
+        os.environ["LOCAL_STORAGE_ROOT"] = os.path.join(work_dir, "env_storage")
+        assert isinstance(create_storage(), LocalStorageBackend)
+        try:
+            create_storage("ftp")
+            raise AssertionError("Unknown backends should be rejected")
+        except ValueError:
+            pass
+        
+        # 6. A backend must implement the whole interface
+        print("Step 6: Rejecting incomplete backends")
+        class UploadOnlyBackend(StorageBackend):
+            def upload_file(self, bucket, storage_path, local_path):
+                return storage_path
+        for backend_class in (StorageBackend, UploadOnlyBackend):
+            try:
+                backend_class()
+                raise AssertionError(f"{backend_class.__name__} should not be instantiable")
+            except TypeError:
+                pass
+        
+        print("Local Storage Backend Test Passed!")
+    finally:
+        os.environ.pop("STORAGE_BACKEND", None)
+        os.environ.pop("LOCAL_STORAGE_ROOT", None)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if other_fs_dir:
+            shutil.rmtree(other_fs_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    try:
+        test_local_storage_backend()
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
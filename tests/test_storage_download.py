@@ -0,0 +1,149 @@
+import os
+import re
+import sys
+import shutil
+import hashlib
+import tempfile
+import threading
+import types
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path to import core
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import transfer
+from core.transfer import download_to_file
+
+class ObjectHandler(BaseHTTPRequestHandler):
+    """Stands in for the Supabase Storage object endpoint: Range requests, MD5 ETags, and injectable faults."""
+    objects = {}
+    drop_after = {}  # path -> bytes to send before cutting the connection (once)
+    bad_etag = set()
+    server_errors = {}  # path -> 503 responses to send before serving it
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get("Range")))
+        data = self.objects.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+        if self.server_errors.get(self.path):
+            self.server_errors[self.path] -= 1
+            self.send_error(503)
+            return
+
+        start = 0
+        match = re.match(r"bytes=(\d+)-", self.headers.get("Range") or "")
+        if match:
+            start = int(match.group(1))
+            if start >= len(data):
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        etag = "0" * 32 if self.path in self.bad_etag else hashlib.md5(data).hexdigest()
+        self.send_header("ETag", f'"{etag}"')
+        self.send_header("Content-Length", str(len(data) - start))
+        self.end_headers()
+
+        body = memoryview(data)[start:]
+        limit = self.drop_after.pop(self.path, None)
+        if limit is not None:
+            body = body[:limit]
+        for i in range(0, len(body), 256 * 1024):
+            self.wfile.write(body[i:i + 256 * 1024])
+        if limit is not None:
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+def test_storage_download():
+    print("Starting Streaming Download Test...")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ObjectHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    work_dir = tempfile.mkdtemp(prefix="download_test_")
+    
+    try:
+        large = os.urandom(64 * 1024 * 1024)
+        ObjectHandler.objects = {"/large.mp4": large, "/flaky.mp4": large[:8 * 1024 * 1024], "/corrupt.mp4": b"x" * 1000}
+        
+        # 1. Peak memory stays around one chunk, not the object size
+        print("Step 1: Streaming a 64MB object")
+        path = os.path.join(work_dir, "large.mp4")
+        tracemalloc.start()
+        size = download_to_file(f"{base_url}/large.mp4", path, retries=0)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"Peak traced memory: {peak / 1e6:.1f}MB")
+        assert size == len(large) and os.path.getsize(path) == len(large)
+        assert peak < 8 * 1024 * 1024, f"Peak memory grew with the object: {peak}"
+        assert not os.path.exists(f"{path}.part")
+        del large
+        
+        # 2. A dropped connection resumes with a Range request
+        print("Step 2: Resuming after a dropped connection")
+        ObjectHandler.drop_after["/flaky.mp4"] = 3 * 1024 * 1024
+        ObjectHandler.requests.clear()
+        path = os.path.join(work_dir, "flaky.mp4")
+        download_to_file(f"{base_url}/flaky.mp4", path, retry_delay=0)
+        with open(path, "rb") as f:
+            assert hashlib.md5(f.read()).digest() == hashlib.md5(ObjectHandler.objects["/flaky.mp4"]).digest()
+        ranges = [range_header for _, range_header in ObjectHandler.requests]
+        print(f"Requests: {ranges}")
+        assert ranges == [None, f"bytes={3 * 1024 * 1024}-"]
+        
+        # 3. A part file left by an earlier, failed call is resumed too
+        print("Step 3: Resuming from an earlier part file")
+        path = os.path.join(work_dir, "resumed.mp4")
+        with open(f"{path}.part", "wb") as f:
+            f.write(ObjectHandler.objects["/flaky.mp4"][:1000])
+        ObjectHandler.requests.clear()
+        download_to_file(f"{base_url}/flaky.mp4", path, retries=0)
+        assert ObjectHandler.requests[0][1] == "bytes=1000-"
+        assert os.path.getsize(path) == len(ObjectHandler.objects["/flaky.mp4"])
+        
+        # 4. Checksum mismatches and missing objects fail without leaving a file behind
+        print("Step 4: Rejecting corrupt and missing objects")
+        ObjectHandler.bad_etag.add("/corrupt.mp4")
+        for name in ("corrupt.mp4", "missing.mp4"):
+            path = os.path.join(work_dir, name)
+            try:
+                download_to_file(f"{base_url}/{name}", path, retry_delay=0)
+                raise AssertionError(f"{name} should have failed")
+            except IOError as e:
+                print(f"{name}: {e}")
+            assert not os.path.exists(path) and not os.path.exists(f"{path}.part")
+        
+        # 5. Server errors are retried with exponential backoff
+        print("Step 5: Backing off on server errors")
+        ObjectHandler.server_errors["/corrupt.mp4"] = 3
+        ObjectHandler.bad_etag.discard("/corrupt.mp4")
+        delays = []
+        real_time = transfer.time
+        transfer.time = types.SimpleNamespace(sleep=delays.append)
+        try:
+            download_to_file(f"{base_url}/corrupt.mp4", os.path.join(work_dir, "backoff.mp4"), retries=3, retry_delay=1.0)
+        finally:
+            transfer.time = real_time
+        print(f"Retry delays: {[round(delay, 2) for delay in delays]}")
+        assert len(delays) == 3
+        assert 0.5 <= delays[0] <= 1.0 and 1.0 <= delays[1] <= 2.0 and 2.0 <= delays[2] <= 4.0
+        assert transfer._retry_backoff(1.0, 20) <= transfer.RETRY_MAX_DELAY
+        
+        print("Streaming Download Test Passed!")
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    try:
+        test_storage_download()
+    except Exception as e:
+        print(f"Test Failed: {e}")
+        sys.exit(1)
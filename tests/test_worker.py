@@ -40,29 +40,37 @@ def test_worker_flow():
     clip.write_videofile(video_path, fps=10, logger=None)
         
     result = brain.start_analysis(project_id, [video_id])
-    job_id = result["job_id"]
-    print(f"Job enqueued: {job_id}")
+    batch_id = result["batch_id"]
+    print(f"Analysis batch enqueued: {batch_id}")
     
     # 3. Wait for Worker to pick it up and process
     print("Step 3: Waiting for worker to process job...")
     
-    # Simulation: Fetch the specific job we just created
-    response = brain.db.client.table("jobs").select("*").eq("id", job_id).execute()
-    if response.data:
-        job = response.data[0]
-        print(f"Worker picked up job {job_id}")
+    # Simulation: Fetch the per-clip jobs we just created
+    response = brain.db.client.table("jobs").select("*").eq("batch_id", batch_id).execute()
+    if not response.data:
+        print(f"Failed to fetch batch {batch_id} from queue")
+        sys.exit(1)
+    for job in response.data:
+        print(f"Worker picked up job {job['id']}")
         # Lock it
-        brain.db.client.table("jobs").update({"status": "processing"}).eq("id", job_id).execute()
+        brain.db.client.table("jobs").update({"status": "processing"}).eq("id", job["id"]).execute()
         try:
-            brain.process_analysis_job(project_id, [video_id])
-            brain.db.update_job_status(job_id, "completed")
+            brain.process_analysis_job(project_id, [job["payload"]["video_id"]], finish=False)
+            assert brain.db.complete_job(job["id"])
             print("Job completed by simulated worker")
         except Exception as e:
-            brain.db.update_job_status(job_id, "failed", error=str(e))
+            brain.db.fail_job(job["id"], error=str(e))
             print(f"Job failed: {e}")
-    else:
-        print(f"Failed to fetch job {job_id} from queue")
-        sys.exit(1)
+    
+    # Completing the last clip enqueued the join step
+    response = brain.db.client.table("jobs").select("*").eq("project_id", project_id).eq("type", "finish_analysis").execute()
+    assert len(response.data) == 1, "Exactly one join job per batch"
+    join_job = response.data[0]
+    assert join_job["id"] == result["job_id"], "analyze returns the join job to poll"
+    brain.db.client.table("jobs").update({"status": "processing"}).eq("id", join_job["id"]).execute()
+    brain.finish_analysis_job(project_id)
+    brain.db.complete_job(join_job["id"])
         
     # 4. Verify Final State
     status = brain.db.get_project_status(project_id)
@@ -5,6 +5,11 @@ import signal
 import sys
 import threading
 from core.brain_controller import BrainController
+from core.database import Database
+from core.job_leases import LeaseKeeper, default_worker_id
+from core.job_notifier import get_job_notifier
+from core.job_processes import JobProcessPool, InProcessJobPool
+from core.job_slots import ResourceSlots
 from core.utils import get_logger
 
 # Configure logging
@@ -13,10 +18,96 @@ logger = get_logger("worker")
 
 running = True
 
+# Idle poll interval: starts at the minimum and doubles while the queue stays empty.
+# Enqueues wake the worker immediately (core/job_notifier.py), so polling is only a fallback.
+JOB_POLL_MIN_SECONDS = float(os.environ.get("JOB_POLL_MIN_SECONDS", "1"))
+JOB_POLL_MAX_SECONDS = os.environ.get("JOB_POLL_MAX_SECONDS")
+
+# Job processes are reused (core/job_processes.py): the brain, and the models it loads
+# lazily (Whisper, ...), are kept for the next job the process runs
+_brain = None
+
 def signal_handler(sig, frame):
     global running
     logger.info("Shutdown signal received. Stopping worker...")
     running = False
+    get_job_notifier().wake()
+
+def max_poll_interval(notifier) -> float:
+    """
+    Longest idle poll. When enqueues are sure to reach us (same process, or Postgres
+    notifications) polling can back off to a minute; otherwise stay at the old 5 seconds.
+    """
+    if JOB_POLL_MAX_SECONDS:
+        return float(JOB_POLL_MAX_SECONDS)
+    internal = threading.current_thread() is not threading.main_thread()
+    return 60.0 if internal or notifier.listening_remote else 5.0
+
+def process_job(brain: BrainController, job: dict):
+    """Run one claimed job to completion. Raises on failure."""
+    job_id = job["id"]
+    job_type = job["type"]
+    project_id = job["project_id"]
+    payload = job.get("payload") or {}
+    
+    logger.info(f"Processing job {job_id} (Type: {job_type}, Project: {project_id})")
+    
+    if job_type == "analyze":
+        if "video_id" in payload:
+            # Per-clip job (of a batch, or eager from upload): finish_analysis completes the project
+            brain.process_analysis_job(project_id, [payload["video_id"]], finish=False)
+        else:
+            video_ids = payload.get("video_ids", [])
+            brain.process_analysis_job(project_id, video_ids, finish=not job.get("batch_id"))
+    elif job_type == "finish_analysis":
+        brain.finish_analysis_job(project_id)
+    elif job_type == "prerender":
+        brain.process_prerender_job(project_id, payload["video_id"], payload.get("is_paid", False))
+    elif job_type == "render":
+        video_ids = payload.get("video_ids", [])
+        reference_script = payload.get("reference_script")
+        bg_music_path = payload.get("bg_music_path")
+        is_draft = payload.get("is_draft", False)
+        is_paid = payload.get("is_paid", False)
+        brain.process_render_job(project_id, video_ids, reference_script, bg_music_path, is_draft, is_paid, job_id=job_id)
+    else:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+def job_brain() -> BrainController:
+    """This process's BrainController, with the per-request caches of the previous job dropped."""
+    global _brain
+    if _brain is None:
+        _brain = BrainController(base_dir=".")
+    else:
+        # Other workers may have re-analysed clips since; only the loaded models carry over
+        _brain.results.clear()
+        _brain.processing_status.clear()
+    return _brain
+
+def run_job(job: dict):
+    """Job process entry point: run the job and record its outcome."""
+    brain = job_brain()
+    # Render encoders share the cores this job's slot reserved (core/job_slots.py)
+    brain.video_renderer.core_budget = job.get("cores")
+    try:
+        process_job(brain, job)
+        # Only while we still hold the lease; for a batch job this may enqueue the join
+        if brain.db.complete_job(job["id"], job.get("worker_id")):
+            logger.info(f"Job {job['id']} completed successfully")
+    except Exception as e:
+        logger.error(f"Job {job['id']} failed: {e}")
+        # Lease-checked like complete_job: a reclaimed job's retry must not be failed by this attempt
+        brain.db.fail_job(job["id"], job.get("worker_id"), error=str(e))
+
+def record_exits(db: Database, pool: JobProcessPool, worker_id: str = None):
+    """
+    Release finished jobs. One whose process died before reporting (crash, OOM kill)
+    goes back to the queue for a retry with backoff, or is marked dead after max_attempts.
+    """
+    for job, exitcode in pool.reap():
+        if exitcode != 0:
+            logger.error(f"Job {job['id']} process exited with code {exitcode}")
+            db.release_job(job["id"], worker_id, reason=f"Job process exited with code {exitcode}")
 
 def run_worker():
     global running
@@ -27,59 +118,71 @@ def run_worker():
         signal.signal(signal.SIGINT, signal_handler)
         signal.signal(signal.SIGTERM, signal_handler)
     
-    # Initialize BrainController
-    # Ensure env vars are set for local testing
+    # Ensure env vars are set for local testing (job processes inherit them)
     if not os.environ.get("SUPABASE_URL"):
         os.environ["SUPABASE_URL"] = "https://bebcwczcdpvrgmhzeyos.supabase.co"
     if not os.environ.get("SUPABASE_KEY"):
         os.environ["SUPABASE_KEY"] = "sb_publishable_WhyhXpfQ0ZJuZsqJYrJtLw_48Crs5RE"
-        
-    brain = BrainController(base_dir=".")
+    
+    # The worker itself only claims jobs; each job runs in a job process (core/job_processes.py).
+    # Embedded in the API process (main.py, MVP mode) it runs one job at a time on a thread
+    # instead, so a small instance never holds a second interpreter and its models.
+    db = Database()
+    worker_id = default_worker_id()
+    notifier = get_job_notifier()
+    notifier.start_listening()
+    embedded = threading.current_thread() is not threading.main_thread()
+    if os.environ.get("WORKER_IN_PROCESS", "true" if embedded else "false").lower() == "true":
+        slots = ResourceSlots(max_jobs=1)
+        pool = InProcessJobPool(slots, run_job, on_exit=notifier.wake)
+    else:
+        slots = ResourceSlots()
+        pool = JobProcessPool(slots, run_job, on_exit=notifier.wake)
+    # Keeps our jobs' leases alive and reclaims jobs from workers that died (core/job_leases.py)
+    leases = LeaseKeeper(db, pool, worker_id)
+    leases.start()
+    logger.info(f"Worker {worker_id} capacity: {slots.cores:g} cores, {slots.memory_mb:.0f}MB")
+    poll_interval = JOB_POLL_MIN_SECONDS
     
     while running:
         try:
-            # 1. Fetch next pending job
-            job = brain.db.fetch_next_job()
+            # 1. Record jobs whose process died without reporting (crash, OOM kill)
+            record_exits(db, pool, worker_id)
             
-            if not job:
-                # No jobs, sleep for a bit
-                time.sleep(5)
+            # 2. Claim a job of a type there is capacity for
+            job_types = slots.admissible_types()
+            if not job_types:
+                # Full: wait for a job to finish (or shutdown)
+                notifier.wait(max_poll_interval(notifier))
                 continue
-                
-            job_id = job["id"]
-            job_type = job["type"]
-            project_id = job["project_id"]
-            payload = job.get("payload", {})
-            
-            logger.info(f"Processing job {job_id} (Type: {job_type}, Project: {project_id})")
+            job = db.fetch_next_job(job_types=None if set(job_types) >= set(slots.resources) else job_types, worker_id=worker_id)
             
-            try:
-                if job_type == "analyze":
-                    video_ids = payload.get("video_ids", [])
-                    brain.process_analysis_job(project_id, video_ids)
-                elif job_type == "render":
-                    video_ids = payload.get("video_ids", [])
-                    reference_script = payload.get("reference_script")
-                    bg_music_path = payload.get("bg_music_path")
-                    is_draft = payload.get("is_draft", False)
-                    is_paid = payload.get("is_paid", False)
-                    brain.process_render_job(project_id, video_ids, reference_script, bg_music_path, is_draft, is_paid)
+            if not job:
+                # No jobs: wait for an enqueue notification, backing off the fallback poll
+                if notifier.wait(poll_interval):
+                    poll_interval = JOB_POLL_MIN_SECONDS
                 else:
-                    logger.warning(f"Unknown job type: {job_type}")
-                    brain.db.update_job_status(job_id, "failed", error=f"Unknown job type: {job_type}")
-                    continue
-                
-                # 2. Mark job as completed
-                brain.db.update_job_status(job_id, "completed")
-                logger.info(f"Job {job_id} completed successfully")
-                
-            except Exception as e:
-                logger.error(f"Job {job_id} failed: {e}")
-                brain.db.update_job_status(job_id, "failed", error=str(e))
+                    poll_interval = min(poll_interval * 2, max_poll_interval(notifier))
+                continue
+            poll_interval = JOB_POLL_MIN_SECONDS
+            
+            # 3. Start it; if free memory dropped since admission, hand it back to the queue
+            if not pool.start(job):
+                logger.info(f"No capacity left for job {job['id']}, returning it to the queue")
+                db.unclaim_job(job["id"], worker_id)
+                notifier.wait(JOB_POLL_MIN_SECONDS)
                 
         except Exception as e:
             logger.error(f"Worker loop error: {e}")
             time.sleep(10) # Wait longer on system error
+    
+    if pool.running_jobs():
+        logger.info(f"Waiting for {len(pool.running_jobs())} running job(s) to finish...")
+        pool.join()
+        record_exits(db, pool, worker_id)
+    pool.close()
+    leases.stop()
+    notifier.stop()
 
 if __name__ == "__main__":
     run_worker()